@@ -56,6 +56,10 @@ class MarketDataProvider:
         """获取某日的股票价格"""
         return self.db.get_stock_price_on_date(symbol, date)
     
+    def get_prices_on_date(self, symbols: List[str], date: str) -> Dict[str, float]:
+        """批量获取多只股票某日的收盘价（一次查询），当日无数据的股票不包含在结果中"""
+        return self.db.get_prices_on_date(symbols, date)
+    
     def get_technical_indicators(self, symbol: str, current_date: str, days: int = 60) -> Dict:
         """
         计算技术指标
@@ -132,6 +136,18 @@ class MarketDataProvider:
             }
         return None
     
+    def get_stock_names(self, symbols: List[str]) -> Dict[str, str]:
+        """批量获取股票名称（一次查询），未找到的股票不包含在结果中"""
+        if not symbols:
+            return {}
+        
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        
+        placeholders = ','.join('?' * len(symbols))
+        cursor.execute(f'SELECT symbol, name FROM stock_info WHERE symbol IN ({placeholders})', tuple(symbols))
+        return {symbol: name for symbol, name in cursor.fetchall()}
+    
     def get_available_stocks(self, stock_pool: List[str]) -> List[Dict]:
         """获取可用股票列表信息"""
         stocks = []
@@ -167,10 +167,12 @@ class TradingSimulator:
     
     def _update_portfolio_prices(self, current_date: str):
         """更新持仓价格"""
-        for symbol in list(self.portfolio.positions.keys()):
+        prices = {}
+        for symbol in self.portfolio.positions.keys():
             price_info = self.data_provider.get_stock_price_on_date(symbol, current_date)
             if price_info:
-                self.portfolio.update_price(symbol, price_info['close'])
+                prices[symbol] = price_info['close']
+        self.portfolio.update_prices(prices)
         
         self.portfolio.current_date = current_date
     
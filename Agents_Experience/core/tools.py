@@ -143,15 +143,16 @@ class TradingTools:
                 
                 # 转换为简洁格式
                 history = []
-                for _, row in df.tail(10).iterrows():  # 只返回最近10天
+                recent = df.tail(10)[['date', 'open', 'high', 'low', 'close', 'volume', 'pct_change']]  # 只返回最近10天
+                for date, open_, high, low, close, volume, pct_change in recent.itertuples(index=False, name=None):
                     history.append({
-                        "date": row['date'],
-                        "open": round(float(row['open']), 2),
-                        "high": round(float(row['high']), 2),
-                        "low": round(float(row['low']), 2),
-                        "close": round(float(row['close']), 2),
-                        "volume": int(row['volume']),
-                        "pct_change": round(float(row['pct_change']), 2) if row['pct_change'] else 0
+                        "date": date,
+                        "open": round(float(open_), 2),
+                        "high": round(float(high), 2),
+                        "low": round(float(low), 2),
+                        "close": round(float(close), 2),
+                        "volume": int(volume),
+                        "pct_change": round(float(pct_change), 2) if pct_change else 0
                     })
                 
                 return json.dumps({
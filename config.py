@@ -22,6 +22,11 @@ MIN_COMMISSION = 5         # 最低佣金：5元
 # 数据下载配置
 DEFAULT_START_DATE = '20100101'  # 默认起始日期
 
+# 下载缓存（akshare响应落盘，重复下载时直接读取）
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+CACHE_TTL_HISTORY = 24 * 3600  # 历史区间缓存有效期：24小时
+CACHE_TTL_TODAY = 3600         # 包含当日K线的缓存有效期：1小时
+
 # MVP测试配置
 MVP_START_DATE = '2020-01-02'  # MVP测试起始日期
 MVP_END_DATE = '2020-12-31'    # MVP测试结束日期
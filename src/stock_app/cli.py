@@ -16,6 +16,9 @@ from src.stock_app.trading_engine import TradingEngine
 
 console = Console()
 
+# 导出日线数据时每块读取的行数
+EXPORT_CHUNK_SIZE = 200000
+
 
 @click.group()
 def cli():
@@ -40,14 +43,26 @@ def download_stocks(start_date, end_date, limit):
         db.save_stock_info(stock_list)
         console.print(f"[green]股票列表已保存到数据库[/green]")
     
-    # 下载股票数据
-    result = downloader.download_all_stocks(start_date, end_date, limit)
+    # 下载股票数据（库中已有的股票只下载最后交易日之后的增量部分）
+    try:
+        last_dates = db.get_last_trade_date_map()
+    except Exception as e:
+        console.print(f"[yellow]读取已有数据的最后交易日失败，将全量下载: {e}[/yellow]")
+        last_dates = {}
+    
+    result = downloader.download_all_stocks(
+        start_date, end_date, limit,
+        last_dates=last_dates
+    )
     
     # 保存到数据库
     if result['data']:
         console.print("\n[cyan]正在保存数据到数据库...[/cyan]")
-        for symbol, df in result['data'].items():
-            db.save_stock_daily_data(symbol, df)
+        # 只有首次或大批量导入才删除并重建索引，少量增量数据直接写入
+        expected_rows = sum(len(df) for df in result['data'].values())
+        with db.bulk_load_context(expected_rows):
+            for symbol, df in result['data'].items():
+                db.save_stock_daily_data(symbol, df)
         console.print("[green]数据已保存到数据库[/green]")
     
     db.close()
@@ -102,15 +117,12 @@ def query_stock(symbol, start_date, end_date):
         table.add_column("最低", justify="right")
         table.add_column("成交量", justify="right")
         
-        for _, row in display_df.iterrows():
-            table.add_row(
-                row['date'],
-                f"{row['open']:.2f}",
-                f"{row['close']:.2f}",
-                f"{row['high']:.2f}",
-                f"{row['low']:.2f}",
-                f"{row['volume']:,.0f}"
-            )
+        rows = [
+            (r.date, f"{r.open:.2f}", f"{r.close:.2f}", f"{r.high:.2f}", f"{r.low:.2f}", f"{r.volume:,.0f}")
+            for r in display_df.itertuples(index=False)
+        ]
+        for r in rows:
+            table.add_row(*r)
         
         console.print(table)
     
@@ -137,12 +149,12 @@ def list_stocks():
         table.add_column("股票名称", style="cyan")
         table.add_column("数据条数", justify="right")
         
-        for _, row in df.head(50).iterrows():
-            table.add_row(
-                row['symbol'],
-                row['name'],
-                str(row['data_count'])
-            )
+        rows = [
+            (r.symbol, r.name, str(r.data_count))
+            for r in df.head(50).itertuples(index=False)
+        ]
+        for r in rows:
+            table.add_row(*r)
         
         console.print(table)
         
@@ -162,17 +174,22 @@ def list_stocks():
 def export_stock_data(output):
     """导出所有股票日线数据到CSV"""
     db = Database()
-    df = db.get_all_stock_daily()
     
-    if df.empty:
+    output_dir = os.path.dirname(os.path.abspath(output))
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 分块读取并追加写入，避免一次性把整张日线表载入内存
+    total = 0
+    for chunk in db.get_all_stock_daily(chunksize=EXPORT_CHUNK_SIZE):
+        chunk.to_csv(output, mode='w' if total == 0 else 'a', header=(total == 0), index=False)
+        total += len(chunk)
+    
+    if total == 0:
         console.print('[yellow]数据库中暂无股票日线数据[/yellow]')
         db.close()
         return
     
-    output_dir = os.path.dirname(os.path.abspath(output))
-    os.makedirs(output_dir, exist_ok=True)
-    df.to_csv(output, index=False)
-    console.print(f"[green]已导出 {len(df)} 条记录到 {output}[/green]")
+    console.print(f"[green]已导出 {total} 条记录到 {output}[/green]")
     db.close()
 
 
@@ -9,9 +9,53 @@ from typing import List
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 import config
+from src.stock_app.database import PRICE_COLUMNS, is_price_integer, is_trade_date_integer, trade_date_sql
 
 console = Console()
 
+# CSV字段映射（从原始字段名到数据库字段名）
+_COLUMN_MAPPING = {
+    'Stkcd': 'symbol',
+    'Trddt': 'trade_date',
+    'Opnprc': 'open_price',
+    'Hiprc': 'high_price',
+    'Loprc': 'low_price',
+    'Clsprc': 'close_price',
+    'Dnshrtrd': 'volume',
+    'Dnvaltrd': 'amount',
+    'Dsmvosd': 'market_cap_float',
+    'Dsmvtll': 'market_cap_total',
+    'Dretwd': 'return_with_dividend',
+    'Dretnd': 'return_no_dividend',
+    'Adjprcwd': 'adj_price_with_dividend',
+    'Adjprcnd': 'adj_price_no_dividend',
+    'Markettype': 'market_type',
+    'Capchgdt': 'cap_change_date',
+    'Trdsta': 'trade_status',
+    'Ahshrtrd_D': 'after_hours_volume',
+    'Ahvaltrd_D': 'after_hours_amount',
+    'PreClosePrice': 'pre_close_price',
+    'ChangeRatio': 'change_ratio',
+    'LimitDown': 'limit_down',
+    'LimitUp': 'limit_up',
+    'LimitStatus': 'limit_status'
+}
+
+# 需要读取的CSV列（集合形式交给pandas在C解析器内做成员判断）
+_USECOLS = frozenset(_COLUMN_MAPPING.keys())
+
+# stock_daily插入字段顺序
+_INSERT_COLS = (
+    'symbol', 'trade_date', 'open_price', 'high_price', 'low_price', 'close_price',
+    'volume', 'amount', 'market_cap_float', 'market_cap_total',
+    'return_with_dividend', 'return_no_dividend',
+    'adj_price_with_dividend', 'adj_price_no_dividend',
+    'market_type', 'cap_change_date', 'trade_status',
+    'after_hours_volume', 'after_hours_amount',
+    'pre_close_price', 'change_ratio',
+    'limit_down', 'limit_up', 'limit_status'
+)
+
 
 class CSVImporter:
     """CSV数据导入器"""
@@ -27,32 +71,7 @@ class CSVImporter:
         ]
         
         # CSV字段映射（从原始字段名到数据库字段名）
-        self.column_mapping = {
-            'Stkcd': 'symbol',
-            'Trddt': 'trade_date',
-            'Opnprc': 'open_price',
-            'Hiprc': 'high_price',
-            'Loprc': 'low_price',
-            'Clsprc': 'close_price',
-            'Dnshrtrd': 'volume',
-            'Dnvaltrd': 'amount',
-            'Dsmvosd': 'market_cap_float',
-            'Dsmvtll': 'market_cap_total',
-            'Dretwd': 'return_with_dividend',
-            'Dretnd': 'return_no_dividend',
-            'Adjprcwd': 'adj_price_with_dividend',
-            'Adjprcnd': 'adj_price_no_dividend',
-            'Markettype': 'market_type',
-            'Capchgdt': 'cap_change_date',
-            'Trdsta': 'trade_status',
-            'Ahshrtrd_D': 'after_hours_volume',
-            'Ahvaltrd_D': 'after_hours_amount',
-            'PreClosePrice': 'pre_close_price',
-            'ChangeRatio': 'change_ratio',
-            'LimitDown': 'limit_down',
-            'LimitUp': 'limit_up',
-            'LimitStatus': 'limit_status'
-        }
+        self.column_mapping = _COLUMN_MAPPING
     
     def get_csv_files(self, folder_name: str) -> List[str]:
         """获取指定文件夹中的所有CSV文件"""
@@ -83,14 +102,11 @@ class CSVImporter:
             
             for enc in encodings:
                 try:
-                    # 只读取需要的列
-                    usecols = list(self.column_mapping.keys())
-                    
                     df = pd.read_csv(
                         file_path, 
                         encoding=enc, 
                         low_memory=False,
-                        usecols=lambda x: x in usecols  # 只读取需要的列
+                        usecols=_USECOLS  # 只读取需要的列
                     )
                     
                     # 重命名列
@@ -111,7 +127,7 @@ class CSVImporter:
                     df = df.where(pd.notnull(df), None)
                     
                     return df
-                    
+                
                 except UnicodeDecodeError:
                     continue
                 except Exception as e:
@@ -136,7 +152,7 @@ class CSVImporter:
             
             console.print(f"[red]无法读取文件（编码错误）: {file_path}[/red]")
             return pd.DataFrame()
-            
+        
         except Exception as e:
             console.print(f"[red]读取文件失败 {file_path}: {e}[/red]")
             return pd.DataFrame()
@@ -166,56 +182,38 @@ class CSVImporter:
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
         
-        total_rows = len(df)
-        batch_data = []
+        # 按插入字段顺序重排列（缺失列补None），转为object后NaN统一替换为None
+        data = df.reindex(columns=list(_INSERT_COLS))
+        if is_trade_date_integer(conn):
+            # 新表结构中trade_date以整数YYYYMMDD存储
+            data['trade_date'] = pd.to_numeric(
+                data['trade_date'].astype(str).str.replace('-', '', regex=False),
+                errors='coerce'
+            ).astype('Int64')
+        if is_price_integer(conn):
+            # 新表结构中开高低收价格以整数“分”存储
+            for col in PRICE_COLUMNS:
+                data[col] = (pd.to_numeric(data[col], errors='coerce') * 100).round().astype('Int64')
+        data = data.astype(object)
+        data = data.where(pd.notnull(data), None)
+        
+        # 通过numpy记录数组一次性生成元组列表，避免逐行iterrows
+        records = data.to_records(index=False).tolist()
+        
+        total_rows = len(records)
         inserted_count = 0
         
         # 分批处理数据
-        for idx, row in df.iterrows():
-            batch_data.append((
-                row.get('symbol'),
-                row.get('trade_date'),
-                row.get('open_price'),
-                row.get('high_price'),
-                row.get('low_price'),
-                row.get('close_price'),
-                row.get('volume'),
-                row.get('amount'),
-                row.get('market_cap_float'),
-                row.get('market_cap_total'),
-                row.get('return_with_dividend'),
-                row.get('return_no_dividend'),
-                row.get('adj_price_with_dividend'),
-                row.get('adj_price_no_dividend'),
-                row.get('market_type'),
-                row.get('cap_change_date'),
-                row.get('trade_status'),
-                row.get('after_hours_volume'),
-                row.get('after_hours_amount'),
-                row.get('pre_close_price'),
-                row.get('change_ratio'),
-                row.get('limit_down'),
-                row.get('limit_up'),
-                row.get('limit_status')
-            ))
-            
-            # 达到批次大小时执行插入
-            if len(batch_data) >= batch_size:
-                cursor.executemany(insert_query, batch_data)
-                conn.commit()
-                inserted_count += len(batch_data)
-                batch_data = []
-                
-                # 显示进度（每批）
-                progress_pct = (inserted_count / total_rows) * 100
-                if inserted_count % (batch_size * 5) == 0:  # 每5批显示一次
-                    console.print(f"  [cyan]已插入 {inserted_count:,}/{total_rows:,} 条记录 ({progress_pct:.1f}%)[/cyan]")
-        
-        # 插入剩余数据
-        if batch_data:
+        for start in range(0, total_rows, batch_size):
+            batch_data = records[start:start + batch_size]
             cursor.executemany(insert_query, batch_data)
             conn.commit()
             inserted_count += len(batch_data)
+            
+            # 显示进度（每5批显示一次）
+            if inserted_count % (batch_size * 5) == 0:
+                progress_pct = (inserted_count / total_rows) * 100
+                console.print(f"  [cyan]已插入 {inserted_count:,}/{total_rows:,} 条记录 ({progress_pct:.1f}%)[/cyan]")
         
         return inserted_count
     
@@ -229,8 +227,6 @@ class CSVImporter:
         """
         from datetime import datetime
         
-        cursor = conn.cursor()
-        
         # 获取唯一的股票代码和市场类型
         stocks = df[['symbol', 'market_type', 'trade_date']].copy()
         stocks = stocks.groupby('symbol').agg({
@@ -240,17 +236,15 @@ class CSVImporter:
         
         update_time = datetime.now().isoformat()
         
-        for _, row in stocks.iterrows():
-            cursor.execute('''
-                INSERT OR REPLACE INTO stock_info 
-                (symbol, market_type, first_seen_date, last_updated)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                row['symbol'],
-                row['market_type'],
-                row['trade_date'],
-                update_time
-            ))
+        rows = [
+            (symbol, market_type, trade_date, update_time)
+            for symbol, market_type, trade_date in stocks[['symbol', 'market_type', 'trade_date']].itertuples(index=False, name=None)
+        ]
+        conn.executemany('''
+            INSERT OR REPLACE INTO stock_info 
+            (symbol, market_type, first_seen_date, last_updated)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
         
         conn.commit()
     
@@ -346,7 +340,11 @@ class CSVImporter:
         console.print(f"[cyan]总记录数: {record_count:,}[/cyan]")
         
         # 日期范围
-        cursor.execute('SELECT MIN(trade_date), MAX(trade_date) FROM stock_daily')
+        is_int = is_trade_date_integer(conn)
+        cursor.execute(
+            f"SELECT {trade_date_sql('MIN(trade_date)', is_int)}, "
+            f"{trade_date_sql('MAX(trade_date)', is_int)} FROM stock_daily"
+        )
         date_range = cursor.fetchone()
         console.print(f"[cyan]日期范围: {date_range[0]} 至 {date_range[1]}[/cyan]")
         
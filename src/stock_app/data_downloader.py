@@ -1,21 +1,157 @@
 """
 数据下载模块 - 使用akshare下载A股历史数据
 """
+import os
+import time
+import asyncio
+import hashlib
+import threading
 import akshare as ak
 import pandas as pd
-from datetime import datetime
-from typing import Optional, List
+import requests
+try:
+    import aiohttp
+except ImportError:  # 未安装aiohttp时退回线程池 + akshare
+    aiohttp = None
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
+import config
+
 console = Console()
 
+# akshare历史行情接口的中文列名 -> 标准列名
+_HIST_COLUMN_MAPPING = {
+    '日期': 'date',
+    '开盘': 'open',
+    '收盘': 'close',
+    '最高': 'high',
+    '最低': 'low',
+    '成交量': 'volume',
+    '成交额': 'amount',
+    '振幅': 'amplitude',
+    '涨跌幅': 'pct_change',
+    '涨跌额': 'change',
+    '换手率': 'turnover'
+}
+
+# 日线数据的统一列顺序（akshare与东方财富接口两条下载路径都标准化为该格式后再缓存和返回）
+_DAILY_COLUMNS = ['date', 'open', 'close', 'high', 'low', 'volume', 'amount',
+                  'amplitude', 'pct_change', 'change', 'turnover']
+
+# 日线缓存格式版本，写入缓存键中；格式变化后旧缓存自动失效
+_DAILY_CACHE_VERSION = 2
+
+# 失败重试：指数退避，遇到限流(429)和服务端错误时重试
+_HTTP_RETRY = dict(total=5, backoff_factor=1.5, status_forcelist=[429, 500, 502, 503, 504])
+
+
+class _TokenBucket:
+    """令牌桶限流器：平均每秒最多rate次请求，允许burst次突发"""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _try_acquire(self) -> float:
+        """尝试取一个令牌：成功返回0，否则返回还需等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+    
+    def acquire(self):
+        """获取一个令牌，不足时休眠等待"""
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """获取一个令牌，不足时在事件循环中等待（不阻塞其他协程）"""
+        while (wait := self._try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+
+# 东方财富日K线接口（akshare.stock_zh_a_hist底层使用的同一接口）
+_EM_KLINE_URL = 'https://push2his.eastmoney.com/api/qt/stock/kline/get'
+_EM_KLINE_PARAMS = {
+    'fields1': 'f1,f2,f3,f4,f5,f6',
+    'fields2': 'f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61',
+    'ut': '7eea3edcaed734bea9cbfc24409ed989',
+    'klt': '101',  # 日线
+    'fqt': '0',    # 不复权
+}
+# klines中每行逗号分隔字段的顺序（与akshare返回的中文列一一对应）
+_EM_KLINE_COLUMNS = _DAILY_COLUMNS
+
+
+def _em_secid(symbol: str) -> str:
+    """股票代码转换为东方财富secid（沪市为1，深市/北交所为0）"""
+    market = '1' if symbol.startswith(('6', '9')) else '0'
+    return f"{market}.{symbol}"
+
+
+def _next_day(date: str) -> str:
+    """YYYYMMDD格式日期的下一天"""
+    return (datetime.strptime(date, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+
+
+def _normalize_daily_frame(symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    把日线数据标准化为统一格式：_DAILY_COLUMNS + symbol，
+    日期为 'YYYY-MM-DD' 字符串，数值列为float64
+    """
+    df = df.rename(columns=_HIST_COLUMN_MAPPING).reindex(columns=_DAILY_COLUMNS)
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    numeric_cols = _DAILY_COLUMNS[1:]
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce').astype('float64')
+    df['symbol'] = symbol
+    return df.reset_index(drop=True)
+
+
+def _parse_kline_json(symbol: str, payload: dict) -> pd.DataFrame:
+    """解析东方财富K线JSON为标准化的日线DataFrame"""
+    klines = ((payload or {}).get('data') or {}).get('klines') or []
+    if not klines:
+        return pd.DataFrame()
+    
+    df = pd.DataFrame([line.split(',') for line in klines], columns=_EM_KLINE_COLUMNS)
+    return _normalize_daily_frame(symbol, df)
+
 
 class DataDownloader:
     """A股数据下载器"""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 7, request_interval: float = 0.01, rate_limit: float = 7.0):
         self.console = console
+        # 并发下载线程数（受akshare接口限流约束）
+        self.max_workers = max_workers
+        # 每个线程两次请求之间的间隔（秒）
+        self.request_interval = request_interval
+        
+        # 全局限速rate_limit次/秒，线程池（akshare）与asyncio两种下载方式共用同一个限流器
+        self._limiter = _TokenBucket(rate_limit)
+    
+    def _call_akshare(self, func, **kwargs):
+        """调用akshare接口：每次调用前经过限流器，网络错误或返回内容无法解析时指数退避重试"""
+        for attempt in range(_HTTP_RETRY['total'] + 1):
+            self._limiter.acquire()
+            try:
+                return func(**kwargs)
+            except (requests.RequestException, ValueError):
+                # ValueError：返回内容不是JSON（如限流时的HTML错误页）
+                if attempt == _HTTP_RETRY['total']:
+                    raise
+                time.sleep(_HTTP_RETRY['backoff_factor'] * (2 ** attempt))
     
     def get_stock_list(self) -> pd.DataFrame:
         """
@@ -27,17 +163,49 @@ class DataDownloader:
         try:
             self.console.print("[cyan]正在获取A股股票列表...[/cyan]")
             # 获取沪深A股列表
-            stock_list = ak.stock_info_a_code_name()
+            stock_list = self._call_akshare(ak.stock_info_a_code_name)
             self.console.print(f"[green]成功获取 {len(stock_list)} 只股票信息[/green]")
             return stock_list
         except Exception as e:
             self.console.print(f"[red]获取股票列表失败: {e}[/red]")
             return pd.DataFrame()
     
+    def _get_cache_path(self, symbol: str, start_date: str, end_date: str) -> str:
+        """根据请求参数生成缓存文件路径"""
+        raw = f"{_DAILY_CACHE_VERSION}|{symbol}|{start_date}|{end_date}"
+        key = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+        return os.path.join(config.CACHE_DIR, f"{key}.pkl")
+    
+    def _load_cache(self, cache_path: str, end_date: str) -> Optional[pd.DataFrame]:
+        """读取未过期的缓存（包含今日K线的请求使用更短的有效期）"""
+        if not os.path.exists(cache_path):
+            return None
+        
+        today = datetime.now().strftime('%Y%m%d')
+        ttl = config.CACHE_TTL_TODAY if end_date >= today else config.CACHE_TTL_HISTORY
+        if time.time() - os.path.getmtime(cache_path) > ttl:
+            return None
+        
+        try:
+            return pd.read_pickle(cache_path)
+        except Exception:
+            return None
+    
+    def _save_cache(self, cache_path: str, df: pd.DataFrame):
+        """写入缓存（先写临时文件再替换，避免并发线程读到半个文件）"""
+        try:
+            os.makedirs(config.CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            self.console.print(f"[yellow]写入缓存失败: {e}[/yellow]")
+    
     def get_stock_daily_data(self, 
                             symbol: str, 
                             start_date: str = '20100101',
-                            end_date: Optional[str] = None) -> pd.DataFrame:
+                            end_date: Optional[str] = None,
+                            cache: bool = True) -> pd.DataFrame:
         """
         获取个股日线数据
         
@@ -45,6 +213,7 @@ class DataDownloader:
             symbol: 股票代码（如：000001）
             start_date: 开始日期（格式：YYYYMMDD）
             end_date: 结束日期（格式：YYYYMMDD），默认为今天
+            cache: 是否使用本地磁盘缓存
             
         Returns:
             DataFrame: 包含日期、开盘价、最高价、最低价、收盘价、成交量等
@@ -53,29 +222,25 @@ class DataDownloader:
             if end_date is None:
                 end_date = datetime.now().strftime('%Y%m%d')
             
+            cache_path = self._get_cache_path(symbol, start_date, end_date) if cache else None
+            if cache_path:
+                cached = self._load_cache(cache_path, end_date)
+                if cached is not None:
+                    return cached
+            
             # 获取A股日线数据 - 注意：日期格式为YYYYMMDD，adjust参数使用空字符串
-            df = ak.stock_zh_a_hist(symbol=symbol, 
-                                   period="daily", 
-                                   start_date=start_date, 
-                                   end_date=end_date,
-                                   adjust="")  # 不复权（空字符串）
+            df = self._call_akshare(ak.stock_zh_a_hist,
+                                    symbol=symbol,
+                                    period="daily",
+                                    start_date=start_date,
+                                    end_date=end_date,
+                                    adjust="")  # 不复权（空字符串）
             
             if df is not None and not df.empty:
-                # 标准化列名
-                df = df.rename(columns={
-                    '日期': 'date',
-                    '开盘': 'open',
-                    '收盘': 'close',
-                    '最高': 'high',
-                    '最低': 'low',
-                    '成交量': 'volume',
-                    '成交额': 'amount',
-                    '振幅': 'amplitude',
-                    '涨跌幅': 'pct_change',
-                    '涨跌额': 'change',
-                    '换手率': 'turnover'
-                })
-                df['symbol'] = symbol
+                # 标准化为与异步下载路径相同的列和类型
+                df = _normalize_daily_frame(symbol, df)
+                if cache_path:
+                    self._save_cache(cache_path, df)
                 return df
             return pd.DataFrame()
         except Exception as e:
@@ -121,15 +286,20 @@ class DataDownloader:
             if end_date is None:
                 end_date = datetime.now().strftime('%Y%m%d')
             
-            # 转换日期格式
+            # 优先使用支持服务端日期范围的接口，只下载需要的区间
+            df = self._get_index_hist_range(symbol, start_date, end_date)
+            if df is not None:
+                return df
+            
+            # 回退：下载全部历史后在本地筛选日期范围
             start = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
             end = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
             
             # 根据不同指数使用不同接口
             if symbol.startswith('000') or symbol.startswith('sh'):
-                df = ak.stock_zh_index_daily(symbol=f"sh{symbol}")
+                df = self._call_akshare(ak.stock_zh_index_daily, symbol=f"sh{symbol}")
             elif symbol.startswith('399') or symbol.startswith('sz'):
-                df = ak.stock_zh_index_daily(symbol=f"sz{symbol}")
+                df = self._call_akshare(ak.stock_zh_index_daily, symbol=f"sz{symbol}")
             else:
                 return pd.DataFrame()
             
@@ -145,10 +315,124 @@ class DataDownloader:
             self.console.print(f"[red]获取指数 {symbol} 数据失败: {e}[/red]")
             return pd.DataFrame()
     
+    def _get_index_hist_range(self, symbol: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        通过ak.index_zh_a_hist按日期区间获取指数日线（YYYYMMDD）
+        
+        Returns:
+            DataFrame；接口不可用或无数据时返回None，由调用方回退到全量下载
+        """
+        if not hasattr(ak, 'index_zh_a_hist'):
+            return None
+        
+        try:
+            df = self._call_akshare(ak.index_zh_a_hist, symbol=symbol, period='daily',
+                                    start_date=start_date, end_date=end_date)
+        except Exception:
+            return None
+        
+        if df is None or df.empty:
+            return None
+        
+        df = df.rename(columns=_HIST_COLUMN_MAPPING)
+        df['date'] = df['date'].astype(str)
+        df['symbol'] = symbol
+        return df
+    
+    def _download_stock_throttled(self,
+                                  symbol: str,
+                                  start_date: str,
+                                  end_date: Optional[str]) -> pd.DataFrame:
+        """线程池中执行的单只股票下载（每次请求前短暂休眠，避免触发接口限流）"""
+        time.sleep(self.request_interval)
+        return self.get_stock_daily_data(symbol, start_date, end_date)
+    
+    def _download_threaded(self, download_tasks: List[tuple], end_date: str, on_done):
+        """线程池 + akshare 下载（未安装aiohttp或已处于事件循环中时使用）"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._download_stock_throttled, code, symbol_start, end_date): (code, name)
+                for code, name, symbol_start in download_tasks
+            }
+            
+            for future in as_completed(futures):
+                symbol, name = futures[future]
+                on_done(symbol, name, future.result())
+    
+    @staticmethod
+    def _can_use_async() -> bool:
+        """是否可以走asyncio下载（需要aiohttp，且当前线程没有正在运行的事件循环）"""
+        if aiohttp is None:
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return True
+        return False
+    
+    async def _fetch_symbol(self,
+                            session: 'aiohttp.ClientSession',
+                            semaphore: asyncio.Semaphore,
+                            symbol: str,
+                            start_date: str,
+                            end_date: str) -> pd.DataFrame:
+        """异步下载单只股票日线（直接请求东方财富接口，失败时指数退避重试）"""
+        cache_path = self._get_cache_path(symbol, start_date, end_date)
+        cached = self._load_cache(cache_path, end_date)
+        if cached is not None:
+            return cached
+        
+        params = dict(_EM_KLINE_PARAMS, secid=_em_secid(symbol), beg=start_date, end=end_date)
+        async with semaphore:
+            for attempt in range(_HTTP_RETRY['total'] + 1):
+                try:
+                    await asyncio.sleep(self.request_interval)
+                    await self._limiter.acquire_async()
+                    async with session.get(_EM_KLINE_URL, params=params) as resp:
+                        if resp.status in _HTTP_RETRY['status_forcelist']:
+                            raise aiohttp.ClientResponseError(
+                                resp.request_info, resp.history, status=resp.status
+                            )
+                        payload = await resp.json(content_type=None)
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    # ValueError：返回内容不是JSON（如限流时的HTML错误页）
+                    if attempt == _HTTP_RETRY['total']:
+                        self.console.print(f"[red]获取股票 {symbol} 数据失败: {e}[/red]")
+                        return pd.DataFrame()
+                    await asyncio.sleep(_HTTP_RETRY['backoff_factor'] * (2 ** attempt))
+        
+        df = _parse_kline_json(symbol, payload)
+        if not df.empty:
+            self._save_cache(cache_path, df)
+        return df
+    
+    async def _download_async(self, download_tasks: List[tuple], end_date: str, on_done):
+        """asyncio并发下载所有股票，连接数与并发数都限制为max_workers"""
+        semaphore = asyncio.Semaphore(self.max_workers)
+        connector = aiohttp.TCPConnector(limit=self.max_workers)
+        timeout = aiohttp.ClientTimeout(total=30)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def fetch(code: str, name: str, symbol_start: str):
+                # 单只股票失败只记录并跳过，不中断整批下载
+                try:
+                    df = await self._fetch_symbol(session, semaphore, code, symbol_start, end_date)
+                except Exception as e:
+                    self.console.print(f"[red]获取股票 {code} 数据失败: {e}[/red]")
+                    df = pd.DataFrame()
+                on_done(code, name, df)
+            
+            await asyncio.gather(*(
+                fetch(code, name, symbol_start)
+                for code, name, symbol_start in download_tasks
+            ))
+    
     def download_all_stocks(self, 
                           start_date: str = '20100101',
                           end_date: Optional[str] = None,
-                          limit: Optional[int] = None) -> dict:
+                          limit: Optional[int] = None,
+                          last_dates: Optional[Dict[str, str]] = None) -> dict:
         """
         批量下载所有A股数据
         
@@ -156,21 +440,38 @@ class DataDownloader:
             start_date: 开始日期
             end_date: 结束日期
             limit: 限制下载数量（用于测试）
+            last_dates: {股票代码: 库中最后交易日(YYYYMMDD)}，提供时只下载增量部分
             
         Returns:
-            dict: {'success': 成功数量, 'failed': 失败数量, 'data': 数据字典}
+            dict: {'success': 成功数量, 'failed': 失败数量, 'skipped': 已是最新的数量, 'data': 数据字典}
         """
         stock_list = self.get_stock_list()
         if stock_list.empty:
-            return {'success': 0, 'failed': 0, 'data': {}}
+            return {'success': 0, 'failed': 0, 'skipped': 0, 'data': {}}
         
         if limit:
             stock_list = stock_list.head(limit)
         
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y%m%d')
+        last_dates = last_dates or {}
+        
         success_count = 0
         failed_count = 0
+        skipped_count = 0
         all_data = {}
         
+        # 计算每只股票的下载起点（库中最后交易日的下一天），起点晚于结束日期的股票直接跳过
+        download_tasks = []
+        for code, name in stock_list[['code', 'name']].itertuples(index=False, name=None):
+            symbol_start = start_date
+            if code in last_dates:
+                symbol_start = max(start_date, _next_day(last_dates[code]))
+                if symbol_start > end_date:
+                    skipped_count += 1
+                    continue
+            download_tasks.append((code, name, symbol_start))
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -178,30 +479,34 @@ class DataDownloader:
         ) as progress:
             task = progress.add_task(
                 f"[cyan]下载股票数据...", 
-                total=len(stock_list)
+                total=len(download_tasks)
             )
             
-            for idx, row in stock_list.iterrows():
-                symbol = row['code']
-                name = row['name']
-                
+            def on_done(symbol: str, name: str, df: pd.DataFrame):
+                nonlocal success_count, failed_count
                 progress.update(
                     task, 
                     description=f"[cyan]下载 {symbol} {name}...",
                     advance=1
                 )
-                
-                df = self.get_stock_daily_data(symbol, start_date, end_date)
                 if not df.empty:
                     all_data[symbol] = df
                     success_count += 1
                 else:
                     failed_count += 1
+            
+            if self._can_use_async():
+                asyncio.run(self._download_async(download_tasks, end_date, on_done))
+            else:
+                self._download_threaded(download_tasks, end_date, on_done)
         
-        self.console.print(f"\n[green]下载完成！成功: {success_count}, 失败: {failed_count}[/green]")
+        self.console.print(
+            f"\n[green]下载完成！成功: {success_count}, 失败: {failed_count}, 已是最新: {skipped_count}[/green]"
+        )
         return {
             'success': success_count,
             'failed': failed_count,
+            'skipped': skipped_count,
             'data': all_data
         }
     
@@ -3,39 +3,291 @@
 """
 import sqlite3
 import pandas as pd
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterable, Iterator, Union
 from datetime import datetime
+from contextlib import contextmanager
+from itertools import islice
+import queue
 import threading
 import config
 
 
+# 每个新连接执行的PRAGMA（cache_size为负数时单位为KiB，每个连接约16MB页缓存）
+_CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA mmap_size=268435456',
+)
+
+# 写连接只有一个，单独使用较大的页缓存（约64MB）加速批量写入和建索引
+_WRITER_CACHE_PRAGMA = 'PRAGMA cache_size=-64000'
+
+# 以整数“分”存储的价格列（新表结构）
+PRICE_COLUMNS = ('open_price', 'high_price', 'low_price', 'close_price')
+
+# 表结构版本号（记录在PRAGMA user_version中，匹配时跳过建表/建索引DDL）
+_SCHEMA_VERSION = 2
+
+# 待写入行数不少于表中现有行数的该比例（或表为空）时，批量导入才删除并重建索引
+_BULK_LOAD_MIN_FRACTION = 0.2
+
+# 批量导入期间被删除的索引定义记录在该表中，进程中途退出时下次启动据此重建
+_PENDING_INDEX_TABLE = 'bulk_load_pending_indexes'
+
+# 读连接池大小（WAL模式下多个读连接可与写连接并行）
+_READ_POOL_SIZE = 4
+
+# 日线数据写入时的数值列顺序（与INSERT语句字段顺序一致）
+_STOCK_DAILY_VALUE_COLS = ['open', 'close', 'high', 'low', 'volume', 'amount', 'pct_change']
+_INDEX_DAILY_VALUE_COLS = ['open', 'close', 'high', 'low', 'volume']
+_STOCK_DAILY_INSERT_COLS = ['symbol', 'date'] + _STOCK_DAILY_VALUE_COLS
+_INDEX_DAILY_INSERT_COLS = ['symbol', 'date'] + _INDEX_DAILY_VALUE_COLS
+
+# 指数代码在index_daily中的前缀（避免与股票代码冲突）
+_INDEX_SYMBOL_PREFIX = '99'
+
+# 固定SQL语句只构造一次，保证sqlite3语句缓存命中
+_SAVE_STOCK_DAILY_SQL = (
+    f"INSERT OR REPLACE INTO stock_daily ({', '.join(_STOCK_DAILY_INSERT_COLS)}) "
+    f"VALUES ({', '.join('?' * len(_STOCK_DAILY_INSERT_COLS))})"
+)
+_SAVE_INDEX_SQL = (
+    f"INSERT OR REPLACE INTO index_daily ({', '.join(_INDEX_DAILY_INSERT_COLS)}) "
+    f"VALUES ({', '.join('?' * len(_INDEX_DAILY_INSERT_COLS))})"
+)
+_GET_INDEX_SQL_BASE = '''
+            SELECT 
+                date,
+                open,
+                close,
+                high,
+                low,
+                volume
+            FROM index_daily
+            WHERE symbol = ?
+        '''
+# {date_col} 和价格列按存储格式替换一次（见Database.__init__）
+_GET_STOCK_SQL_BASE = '''
+            SELECT 
+                {date_col} as date,
+                {open_price} as open,
+                {high_price} as high,
+                {low_price} as low,
+                {close_price} as close,
+                volume,
+                amount,
+                return_with_dividend as pct_change,
+                market_cap_float,
+                market_cap_total,
+                adj_price_with_dividend,
+                market_type,
+                trade_status,
+                change_ratio,
+                limit_status
+            FROM stock_daily 
+            WHERE symbol = ?
+        '''
+
+
+def _has_column(conn: sqlite3.Connection, column: str) -> bool:
+    """判断stock_daily中是否存在某列"""
+    return any(row[1] == column for row in conn.execute('PRAGMA table_info(stock_daily)').fetchall())
+
+
+def _is_integer_column(conn: sqlite3.Connection, column: str) -> bool:
+    """判断stock_daily中某列的声明类型是否为INTEGER"""
+    for row in conn.execute('PRAGMA table_info(stock_daily)').fetchall():
+        if row[1] == column:
+            return (row[2] or '').upper() == 'INTEGER'
+    return False
+
+
+def is_trade_date_integer(conn: sqlite3.Connection) -> bool:
+    """判断stock_daily.trade_date是否为INTEGER(YYYYMMDD)存储（旧库为TEXT 'YYYY-MM-DD'）"""
+    return _is_integer_column(conn, 'trade_date')
+
+
+def is_price_integer(conn: sqlite3.Connection) -> bool:
+    """判断stock_daily的开高低收价格是否以INTEGER（分）存储（旧库为REAL元）"""
+    return _is_integer_column(conn, 'open_price')
+
+
+def price_sql(expr: str, is_int: bool) -> str:
+    """生成把价格表达式统一输出为“元”的SQL片段"""
+    return f"({expr} / 100.0)" if is_int else expr
+
+
+def trade_date_to_int(date) -> int:
+    """将 'YYYY-MM-DD' / 'YYYYMMDD' / 整数形式的日期转换为整数YYYYMMDD"""
+    if isinstance(date, int):
+        return date
+    return int(str(date).replace('-', '')[:8])
+
+
+def int_to_trade_date(value: int) -> str:
+    """将整数YYYYMMDD转换为 'YYYY-MM-DD'"""
+    value = int(value)
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+
+def trade_date_sql(expr: str, is_int: bool) -> str:
+    """生成把trade_date表达式统一输出为 'YYYY-MM-DD' 文本的SQL片段"""
+    if not is_int:
+        return expr
+    return f"printf('%04d-%02d-%02d', {expr} / 10000, {expr} / 100 % 100, {expr} % 100)"
+
+
+def _build_daily_rows(symbol: str, df: pd.DataFrame, value_cols: List[str]) -> List[tuple]:
+    """将日线DataFrame整体转换为executemany所需的元组列表（缺失列按0处理）"""
+    dates = df['date'] if 'date' in df.columns else pd.Series('', index=df.index)
+    values = df.reindex(columns=value_cols, fill_value=0).astype(float)
+    return [
+        (symbol, date, *vals)
+        for date, vals in zip(dates, values.itertuples(index=False, name=None))
+    ]
+
+
 class Database:
     """数据库管理类"""
     
     def __init__(self, db_path: str = config.DATABASE_PATH):
         self.db_path = db_path
         self._local = threading.local()
+        
+        # 读连接池 + 单个写连接（写连接由锁串行化）
+        self._read_pool: queue.Queue = queue.Queue(maxsize=_READ_POOL_SIZE)
+        self._read_created = 0
+        self._pool_lock = threading.Lock()
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        
         self.init_database()
+        # trade_date存储格式（INTEGER YYYYMMDD 或 TEXT YYYY-MM-DD），决定查询参数和输出的转换方式
+        with self.reader() as conn:
+            self.trade_date_is_int = is_trade_date_integer(conn)
+            # 价格存储格式（INTEGER 分 或 REAL 元），读取时统一换算为元
+            self.price_is_int = is_price_integer(conn)
+            # 日期列名：迁移后的库为trade_date，init_database新建的库为date
+            self.daily_date_col = 'trade_date' if _has_column(conn, 'trade_date') else 'date'
+        self._get_stock_sql_base = _GET_STOCK_SQL_BASE.format(
+            date_col=self._date_column(),
+            **{col: self._price_column(col) for col in PRICE_COLUMNS}
+        )
+    
+    def _new_connection(self) -> sqlite3.Connection:
+        """创建新连接，并只设置一次PRAGMA（WAL + 较大缓存，降低写入时的fsync开销）"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=30.0
+        )
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
     
     def connect(self):
-        """连接数据库 - 每个线程使用独立的连接"""
+        """连接数据库 - 每个线程使用独立的连接（供外部模块直接执行SQL）"""
         if not hasattr(self._local, 'conn') or self._local.conn is None:
-            self._local.conn = sqlite3.connect(
-                self.db_path,
-                check_same_thread=False,
-                timeout=30.0
-            )
+            self._local.conn = self._new_connection()
         return self._local.conn
     
+    @contextmanager
+    def transaction(self, conn: Optional[sqlite3.Connection] = None) -> Iterator[sqlite3.Connection]:
+        """
+        执行一个显式事务：正常退出时COMMIT，异常时ROLLBACK
+        
+        支持嵌套，只有最外层负责提交，多次写入只需一次落盘
+        
+        Args:
+            conn: 使用的连接，默认为当前线程的连接（connect()）
+        """
+        if conn is None:
+            conn = self.connect()
+        depth = getattr(self._local, 'tx_depth', 0)
+        if depth > 0:
+            self._local.tx_depth = depth + 1
+            try:
+                yield conn
+            finally:
+                self._local.tx_depth = depth
+            return
+        
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN')
+        self._local.tx_depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._local.tx_depth = 0
+    
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """从读连接池借出一个连接，用完归还；池满时等待其他线程归还"""
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                create = self._read_created < _READ_POOL_SIZE
+                if create:
+                    self._read_created += 1
+            if create:
+                conn = self._new_connection()
+                conn.execute('PRAGMA query_only=ON')
+            else:
+                conn = self._read_pool.get()
+        
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+    
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """获取唯一的写连接（持有写锁期间其他线程的写操作需等待）"""
+        with self._write_lock:
+            if self._write_conn is None:
+                self._write_conn = self._new_connection()
+                self._write_conn.execute(_WRITER_CACHE_PRAGMA)
+            yield self._write_conn
+    
     def close(self):
-        """关闭当前线程的数据库连接"""
+        """关闭当前线程的数据库连接，以及读连接池和写连接"""
         if hasattr(self._local, 'conn') and self._local.conn is not None:
             self._local.conn.close()
             self._local.conn = None
+        
+        with self._pool_lock:
+            while True:
+                try:
+                    self._read_pool.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._read_created -= 1
+        
+        with self._write_lock:
+            if self._write_conn is not None:
+                self._write_conn.close()
+                self._write_conn = None
     
     def init_database(self):
-        """初始化数据库表结构"""
-        conn = self.connect()
+        """初始化数据库表结构（已初始化过的数据库直接跳过）"""
+        with self.writer() as conn:
+            # 上次批量导入中途退出时索引仍处于删除状态，先按记录重建
+            self._restore_pending_indexes(conn)
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= _SCHEMA_VERSION:
+                return
+            self._create_tables(conn)
+            conn.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+    
+    def _create_tables(self, conn: sqlite3.Connection):
+        """在写连接上执行建表语句"""
         cursor = conn.cursor()
         
         # 股票基本信息表
@@ -134,50 +386,167 @@ class Database:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_index_daily_symbol ON index_daily(symbol)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_index_daily_date ON index_daily(date)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions(account_id)')
+        # 交易记录查询（按账户、时间倒序取最近N条）的覆盖索引，只扫描索引即可返回结果
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_txn_acct_time ON transactions(
+                account_id, created_at DESC,
+                trade_date, symbol, trade_type, quantity, price, commission, stamp_tax, total_amount
+            )
+        ''')
         
         conn.commit()
     
+    @contextmanager
+    def bulk_load_context(self, expected_rows: Optional[int] = None):
+        """
+        批量导入上下文：进入时删除stock_daily上的二级索引，退出时按原定义重建
+        
+        避免每条INSERT都去维护多棵索引B树，导入完成后一次性建索引。
+        重建索引需要扫描全表，只有表为空或待写入行数占现有行数较大比例时才值得，
+        增量写入少量数据时直接保留索引
+        
+        Args:
+            expected_rows: 预计写入的行数，None表示总是进入批量导入模式
+        """
+        with self.writer() as conn:
+            indexes = []
+            if expected_rows is None or self._worth_dropping_indexes(conn, expected_rows):
+                # 记录现有索引定义（自动索引的sql为NULL，不受影响）
+                indexes = conn.execute('''
+                    SELECT name, sql FROM sqlite_master
+                    WHERE type = 'index' AND tbl_name = 'stock_daily' AND sql IS NOT NULL
+                ''').fetchall()
+            
+            if indexes:
+                # 索引定义与删除操作在同一事务中落盘，中途退出时下次启动可以重建
+                with conn:
+                    conn.execute(f'''
+                        CREATE TABLE IF NOT EXISTS {_PENDING_INDEX_TABLE} (
+                            name TEXT PRIMARY KEY,
+                            sql TEXT NOT NULL
+                        )
+                    ''')
+                    conn.executemany(
+                        f'INSERT OR REPLACE INTO {_PENDING_INDEX_TABLE} (name, sql) VALUES (?, ?)',
+                        indexes
+                    )
+                    for name, _ in indexes:
+                        conn.execute(f'DROP INDEX IF EXISTS {name}')
+        
+        try:
+            yield self
+        finally:
+            if indexes:
+                with self.writer() as conn:
+                    self._restore_pending_indexes(conn)
+    
+    def _worth_dropping_indexes(self, conn: sqlite3.Connection, expected_rows: int) -> bool:
+        """表为空或待写入行数占现有行数的比例足够大时，删除索引后重建才比逐行维护索引划算"""
+        # MAX(rowid)走B树最右路径，无需COUNT(*)扫描全表即可估算行数
+        existing = conn.execute('SELECT MAX(rowid) FROM stock_daily').fetchone()[0] or 0
+        return expected_rows >= existing * _BULK_LOAD_MIN_FRACTION
+    
+    def _restore_pending_indexes(self, conn: sqlite3.Connection):
+        """重建批量导入期间删除的索引，并清除记录"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (_PENDING_INDEX_TABLE,)
+        ).fetchone()
+        if not exists:
+            return
+        
+        with conn:
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            for name, sql in conn.execute(f'SELECT name, sql FROM {_PENDING_INDEX_TABLE}').fetchall():
+                if name not in existing:
+                    conn.execute(sql)
+            conn.execute(f'DROP TABLE {_PENDING_INDEX_TABLE}')
+    
+    def _date_param(self, date: str):
+        """将查询日期转换为与trade_date存储格式一致的参数"""
+        return trade_date_to_int(date) if self.trade_date_is_int else date
+    
+    def _date_column(self, expr: str = 'trade_date') -> str:
+        """trade_date输出为 'YYYY-MM-DD' 的SQL表达式"""
+        return trade_date_sql(expr, self.trade_date_is_int)
+    
+    def _price_column(self, expr: str) -> str:
+        """价格输出为“元”的SQL表达式"""
+        return price_sql(expr, self.price_is_int)
+    
+    def bulk_insert(self,
+                    table: str,
+                    columns: List[str],
+                    rows: Iterable[tuple],
+                    chunk: int = 20000,
+                    replace: bool = True) -> int:
+        """
+        批量写入数据：整个过程在一个BEGIN IMMEDIATE事务中完成，
+        同一条预编译语句按chunk分块executemany
+        
+        Args:
+            table: 表名
+            columns: 字段列表（与rows中元组顺序一致）
+            rows: 元组可迭代对象
+            chunk: 每次executemany的行数
+            replace: 是否使用INSERT OR REPLACE
+        
+        Returns:
+            写入的行数
+        """
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+        placeholders = ', '.join('?' * len(columns))
+        sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        return self._bulk_execute(sql, rows, chunk)
+    
+    def _bulk_execute(self, sql: str, rows: Iterable[tuple], chunk: int = 20000) -> int:
+        """在一个BEGIN IMMEDIATE事务中按chunk分块executemany同一条语句，返回写入行数"""
+        iterator = iter(rows)
+        count = 0
+        with self.writer() as conn:
+            cursor = conn.cursor()
+            if conn.in_transaction:
+                conn.commit()
+            
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                while True:
+                    batch = list(islice(iterator, chunk))
+                    if not batch:
+                        break
+                    cursor.executemany(sql, batch)
+                    count += len(batch)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        return count
+    
     def save_stock_info(self, stock_list: pd.DataFrame):
         """保存股票基本信息"""
-        conn = self.connect()
-        
-        for _, row in stock_list.iterrows():
-            conn.execute('''
+        now = datetime.now().isoformat()
+        rows = [
+            (code, name, 'A股', now)
+            for code, name in zip(stock_list['code'].to_numpy(), stock_list['name'].to_numpy())
+        ]
+        
+        with self.writer() as conn, conn:
+            conn.executemany('''
                 INSERT OR REPLACE INTO stock_info (symbol, name, market, updated_at)
                 VALUES (?, ?, ?, ?)
-            ''', (row['code'], row['name'], 'A股', datetime.now().isoformat()))
-        
-        conn.commit()
+            ''', rows)
     
     def save_stock_daily_data(self, symbol: str, df: pd.DataFrame):
         """保存股票日线数据"""
         if df.empty:
             return
         
-        conn = self.connect()
-        
-        for _, row in df.iterrows():
-            try:
-                conn.execute('''
-                    INSERT OR REPLACE INTO stock_daily 
-                    (symbol, date, open, close, high, low, volume, amount, pct_change)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    symbol,
-                    row.get('date', ''),
-                    float(row.get('open', 0)),
-                    float(row.get('close', 0)),
-                    float(row.get('high', 0)),
-                    float(row.get('low', 0)),
-                    float(row.get('volume', 0)),
-                    float(row.get('amount', 0)),
-                    float(row.get('pct_change', 0))
-                ))
-            except Exception as e:
-                print(f"保存数据失败 {symbol} {row.get('date')}: {e}")
-                continue
-        
-        conn.commit()
+        try:
+            rows = _build_daily_rows(symbol, df, _STOCK_DAILY_VALUE_COLS)
+            self._bulk_execute(_SAVE_STOCK_DAILY_SQL, rows)
+        except Exception as e:
+            print(f"保存数据失败 {symbol}: {e}")
     
     def save_index_daily_data(self, symbol: str, df: pd.DataFrame):
         """
@@ -188,31 +557,14 @@ class Database:
         if df.empty:
             return
         
-        conn = self.connect()
-        
         # 添加99前缀避免与股票代码冲突
-        index_symbol = f"99{symbol}"
-        
-        for _, row in df.iterrows():
-            try:
-                conn.execute('''
-                    INSERT OR REPLACE INTO index_daily 
-                    (symbol, date, open, close, high, low, volume)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    index_symbol,  # 使用添加前缀后的代码
-                    row.get('date', ''),
-                    float(row.get('open', 0)),
-                    float(row.get('close', 0)),
-                    float(row.get('high', 0)),
-                    float(row.get('low', 0)),
-                    float(row.get('volume', 0))
-                ))
-            except Exception as e:
-                print(f"保存指数数据失败 {index_symbol} {row.get('date')}: {e}")
-                continue
+        index_symbol = _INDEX_SYMBOL_PREFIX + symbol
         
-        conn.commit()
+        try:
+            rows = _build_daily_rows(index_symbol, df, _INDEX_DAILY_VALUE_COLS)
+            self._bulk_execute(_SAVE_INDEX_SQL, rows)
+        except Exception as e:
+            print(f"保存指数数据失败 {index_symbol}: {e}")
     
     def get_stock_data(self, 
                        symbol: str, 
@@ -229,56 +581,33 @@ class Database:
         Returns:
             DataFrame with columns: date, open, high, low, close, volume, amount, etc.
         """
-        conn = self.connect()
-        
         # 使用新的字段名，并重命名为兼容的格式
-        query = '''
-            SELECT 
-                trade_date as date,
-                open_price as open,
-                high_price as high,
-                low_price as low,
-                close_price as close,
-                volume,
-                amount,
-                return_with_dividend as pct_change,
-                market_cap_float,
-                market_cap_total,
-                adj_price_with_dividend,
-                market_type,
-                trade_status,
-                change_ratio,
-                limit_status
-            FROM stock_daily 
-            WHERE symbol = ?
-        '''
+        query = self._get_stock_sql_base
         params = [symbol]
         
         if start_date:
             query += ' AND trade_date >= ?'
-            params.append(start_date)
+            params.append(self._date_param(start_date))
         
         if end_date:
             query += ' AND trade_date <= ?'
-            params.append(end_date)
+            params.append(self._date_param(end_date))
         
         query += ' ORDER BY trade_date'
         
-        df = pd.read_sql_query(query, conn, params=params)
-        return df
+        with self.reader() as conn:
+            return pd.read_sql_query(query, conn, params=params)
     
     def get_stock_price_on_date(self, symbol: str, date: str) -> Optional[dict]:
         """获取某只股票在特定日期的价格信息"""
-        conn = self.connect()
-        cursor = conn.cursor()
+        with self.reader() as conn:
+            result = conn.execute(f'''
+                SELECT {self._price_column('open_price')}, {self._price_column('close_price')},
+                       {self._price_column('high_price')}, {self._price_column('low_price')}, volume
+                FROM stock_daily
+                WHERE symbol = ? AND trade_date = ?
+            ''', (symbol, self._date_param(date))).fetchone()
         
-        cursor.execute('''
-            SELECT open_price, close_price, high_price, low_price, volume
-            FROM stock_daily
-            WHERE symbol = ? AND trade_date = ?
-        ''', (symbol, date))
-        
-        result = cursor.fetchone()
         if result:
             return {
                 'open': result[0],
@@ -289,41 +618,69 @@ class Database:
             }
         return None
     
+    def get_prices_on_date(self, symbols: List[str], date: str) -> Dict[str, float]:
+        """
+        批量获取多只股票在特定日期的收盘价（一次查询）
+        
+        Returns:
+            {股票代码: 收盘价}，当日无数据的股票不包含在结果中
+        """
+        if not symbols:
+            return {}
+        
+        placeholders = ','.join('?' * len(symbols))
+        with self.reader() as conn:
+            cursor = conn.execute(f'''
+                SELECT symbol, {self._price_column('close_price')}
+                FROM stock_daily
+                WHERE trade_date = ? AND symbol IN ({placeholders})
+            ''', (self._date_param(date), *symbols))
+            
+            return {symbol: close for symbol, close in cursor if close is not None}
+    
     def get_available_dates(self, symbol: str) -> List[str]:
         """获取某只股票的所有可用交易日期"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT DISTINCT trade_date FROM stock_daily
-            WHERE symbol = ?
-            ORDER BY trade_date
-        ''', (symbol,))
-        
-        return [row[0] for row in cursor.fetchall()]
+        with self.reader() as conn:
+            cursor = conn.execute(f'''
+                SELECT DISTINCT {self._date_column()} FROM stock_daily
+                WHERE symbol = ?
+                ORDER BY trade_date
+            ''', (symbol,))
+            
+            # 直接迭代游标逐行取值，不先用fetchall物化整个结果集
+            return [row[0] for row in cursor]
+    
+    def get_last_trade_date_map(self) -> Dict[str, str]:
+        """获取每只股票在库中的最后交易日，格式为 {symbol: 'YYYYMMDD'}（用于增量下载）"""
+        with self.reader() as conn:
+            rows = conn.execute(
+                f'SELECT symbol, MAX({self.daily_date_col}) FROM stock_daily GROUP BY symbol'
+            ).fetchall()
+        
+        return {
+            symbol: str(last_date).replace('-', '')
+            for symbol, last_date in rows
+            if last_date
+        }
     
     def get_all_stocks(self) -> pd.DataFrame:
         """获取所有股票列表"""
-        conn = self.connect()
-        return pd.read_sql_query('SELECT * FROM stock_info', conn)
+        with self.reader() as conn:
+            return pd.read_sql_query('SELECT * FROM stock_info', conn)
     
     def get_stock_list_for_download(self) -> pd.DataFrame:
         """获取股票列表（用于下载页面，格式与API一致：code, name）"""
-        conn = self.connect()
-        df = pd.read_sql_query('SELECT symbol as code, name FROM stock_info ORDER BY symbol', conn)
-        return df
+        with self.reader() as conn:
+            return pd.read_sql_query('SELECT symbol as code, name FROM stock_info ORDER BY symbol', conn)
     
     def get_stock_list_count(self) -> int:
         """获取股票列表数量"""
-        conn = self.connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM stock_info')
-        result = cursor.fetchone()
+        with self.reader() as conn:
+            result = conn.execute('SELECT COUNT(*) FROM stock_info').fetchone()
         return result[0] if result else 0
     
     def get_stocks_with_data_count(self) -> pd.DataFrame:
         """获取股票列表及其数据条数"""
-        conn = self.connect()
         query = '''
             SELECT si.symbol, si.name, COUNT(sd.id) as data_count
             FROM stock_info si
@@ -331,20 +688,25 @@ class Database:
             GROUP BY si.symbol, si.name
             ORDER BY data_count DESC
         '''
-        return pd.read_sql_query(query, conn)
-
-    def get_all_stock_daily(self) -> pd.DataFrame:
-        """获取所有股票的日线数据（包含名称）"""
-        conn = self.connect()
-        query = '''
+        with self.reader() as conn:
+            return pd.read_sql_query(query, conn)
+    
+    def get_all_stock_daily(self, chunksize: Optional[int] = None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        获取所有股票的日线数据（包含名称）
+        
+        Args:
+            chunksize: 分块行数；指定时返回按symbol排序的DataFrame迭代器，避免一次性载入整张表
+        """
+        query = f'''
             SELECT 
                 sd.symbol,
                 COALESCE(si.name, sd.symbol) AS name,
-                sd.trade_date as date,
-                sd.open_price as open,
-                sd.close_price as close,
-                sd.high_price as high,
-                sd.low_price as low,
+                {self._date_column('sd.trade_date')} as date,
+                {self._price_column('sd.open_price')} as open,
+                {self._price_column('sd.close_price')} as close,
+                {self._price_column('sd.high_price')} as high,
+                {self._price_column('sd.low_price')} as low,
                 sd.volume,
                 sd.amount,
                 sd.return_with_dividend as pct_change
@@ -352,7 +714,15 @@ class Database:
             LEFT JOIN stock_info si ON sd.symbol = si.symbol
             ORDER BY sd.symbol, sd.trade_date
         '''
-        return pd.read_sql_query(query, conn)
+        if chunksize is None:
+            with self.reader() as conn:
+                return pd.read_sql_query(query, conn)
+        return self._iter_query_chunks(query, chunksize)
+    
+    def _iter_query_chunks(self, query: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """分块读取查询结果；迭代期间一直占用同一个读连接，迭代结束后归还"""
+        with self.reader() as conn:
+            yield from pd.read_sql_query(query, conn, chunksize=chunksize)
     
     def get_index_data(self,
                       symbol: str,
@@ -369,22 +739,10 @@ class Database:
         Returns:
             DataFrame with columns: date, open, high, low, close, volume
         """
-        conn = self.connect()
-        
         # 添加99前缀以匹配数据库中的存储格式
-        index_symbol = f"99{symbol}"
+        index_symbol = _INDEX_SYMBOL_PREFIX + symbol
         
-        query = '''
-            SELECT 
-                date,
-                open,
-                close,
-                high,
-                low,
-                volume
-            FROM index_daily
-            WHERE symbol = ?
-        '''
+        query = _GET_INDEX_SQL_BASE
         params = [index_symbol]
         
         if start_date:
@@ -397,5 +755,5 @@ class Database:
         
         query += ' ORDER BY date'
         
-        df = pd.read_sql_query(query, conn, params=params)
-        return df
+        with self.reader() as conn:
+            return pd.read_sql_query(query, conn, params=params)
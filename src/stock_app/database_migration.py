@@ -88,16 +88,17 @@ class DatabaseMigration:
         ''')
         console.print("[green]✓ 创建 stock_info 表[/green]")
         
-        # 创建股票日线数据表 - 包含所有CSV字段
+        # 创建股票日线数据表 - 包含所有CSV字段（trade_date以整数YYYYMMDD存储，索引更小、比较更快；
+        # 开高低收价格以整数“分”存储，缩小热点表的行宽）
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS stock_daily (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 symbol TEXT NOT NULL,
-                trade_date TEXT NOT NULL,
-                open_price REAL,
-                high_price REAL,
-                low_price REAL,
-                close_price REAL,
+                trade_date INTEGER NOT NULL,
+                open_price INTEGER,
+                high_price INTEGER,
+                low_price INTEGER,
+                close_price INTEGER,
                 volume REAL,
                 amount REAL,
                 market_cap_float REAL,
@@ -1,45 +1,97 @@
 """
 持仓管理模块
 """
-from dataclasses import dataclass
-from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Mapping, Optional, Union
 from datetime import datetime
 
 
-@dataclass
+# 列式存储的初始容量（不足时按2倍扩容）
+_INITIAL_CAPACITY = 16
+
+
 class Position:
-    """持仓信息"""
-    symbol: str
-    name: str
-    quantity: int
-    avg_cost: float
-    current_price: float = 0.0
+    """持仓信息（Portfolio列式存储中某一行的只读视图）"""
+    
+    __slots__ = ('symbol', 'name', '_portfolio', '_idx',
+                 '_version', '_market_value', '_cost_value', '_profit', '_profit_rate')
+    
+    def __init__(self, portfolio: 'Portfolio', symbol: str, name: str, idx: int):
+        self.symbol = symbol
+        self.name = name
+        self._portfolio = portfolio
+        self._idx = idx
+        self._version = -1
+    
+    def _refresh(self):
+        """组合数据变化后重新计算派生指标（一次算出四个值并缓存）"""
+        quantity = self.quantity
+        cost_value = quantity * self.avg_cost
+        market_value = quantity * self.current_price
+        profit = market_value - cost_value
+        
+        self._cost_value = cost_value
+        self._market_value = market_value
+        self._profit = profit
+        self._profit_rate = 0.0 if cost_value == 0 else (profit / cost_value) * 100
+        self._version = self._portfolio._version
+    
+    @property
+    def quantity(self) -> int:
+        """持仓数量"""
+        return int(self._portfolio._qty[self._idx])
+    
+    @property
+    def avg_cost(self) -> float:
+        """成本价"""
+        return float(self._portfolio._cost[self._idx])
+    
+    @property
+    def current_price(self) -> float:
+        """当前价"""
+        return float(self._portfolio._px[self._idx])
     
     @property
     def market_value(self) -> float:
         """市值"""
-        return self.quantity * self.current_price
+        if self._version != self._portfolio._version:
+            self._refresh()
+        return self._market_value
     
     @property
     def cost_value(self) -> float:
         """成本"""
-        return self.quantity * self.avg_cost
+        if self._version != self._portfolio._version:
+            self._refresh()
+        return self._cost_value
     
     @property
     def profit(self) -> float:
         """盈亏金额"""
-        return self.market_value - self.cost_value
+        if self._version != self._portfolio._version:
+            self._refresh()
+        return self._profit
     
     @property
     def profit_rate(self) -> float:
         """盈亏比例"""
-        if self.cost_value == 0:
-            return 0.0
-        return (self.profit / self.cost_value) * 100
+        if self._version != self._portfolio._version:
+            self._refresh()
+        return self._profit_rate
+    
+    def __repr__(self) -> str:
+        return (f"Position(symbol={self.symbol!r}, name={self.name!r}, quantity={self.quantity}, "
+                f"avg_cost={self.avg_cost}, current_price={self.current_price})")
 
 
 class Portfolio:
-    """投资组合管理"""
+    """
+    投资组合管理
+    
+    持仓的数量、成本价、当前价以列式NumPy数组存储（SoA），
+    positions字典中的Position对象只是对应行的只读视图
+    """
     
     def __init__(self, account_name: str, initial_capital: float):
         self.account_name = account_name
@@ -47,45 +99,134 @@ class Portfolio:
         self.cash = initial_capital
         self.positions: Dict[str, Position] = {}
         self.current_date = None
+        
+        # 列式持仓数据，前self._n行有效
+        self._qty = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._cost = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._px = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._n = 0
+        self._symbols: List[str] = []
+        self._symbol_to_idx: Dict[str, int] = {}
+        # 数据版本号，每次修改持仓数据时递增，Position据此判断缓存是否失效
+        self._version = 0
+    
+    def _grow(self):
+        """扩容列式存储"""
+        capacity = len(self._qty) * 2
+        for attr in ('_qty', '_cost', '_px'):
+            old = getattr(self, attr)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, attr, new)
+    
+    def _append(self, symbol: str, name: str, quantity: int, avg_cost: float, current_price: float):
+        """追加一行持仓"""
+        if self._n == len(self._qty):
+            self._grow()
+        
+        idx = self._n
+        self._qty[idx] = quantity
+        self._cost[idx] = avg_cost
+        self._px[idx] = current_price
+        self._n += 1
+        
+        self._symbols.append(symbol)
+        self._symbol_to_idx[symbol] = idx
+        self.positions[symbol] = Position(self, symbol, name, idx)
+    
+    def _remove(self, symbol: str):
+        """删除一行持仓（用最后一行填补空位）"""
+        idx = self._symbol_to_idx.pop(symbol)
+        del self.positions[symbol]
+        
+        last = self._n - 1
+        if idx != last:
+            self._qty[idx] = self._qty[last]
+            self._cost[idx] = self._cost[last]
+            self._px[idx] = self._px[last]
+            
+            moved_symbol = self._symbols[last]
+            self._symbols[idx] = moved_symbol
+            self._symbol_to_idx[moved_symbol] = idx
+            self.positions[moved_symbol]._idx = idx
+        
+        self._symbols.pop()
+        self._n -= 1
+    
+    def set_position(self, symbol: str, name: str, quantity: int, avg_cost: float, current_price: float):
+        """直接设置持仓（用于从数据库恢复账户）"""
+        self._version += 1
+        idx = self._symbol_to_idx.get(symbol)
+        if idx is None:
+            self._append(symbol, name, quantity, avg_cost, current_price)
+        else:
+            self._qty[idx] = quantity
+            self._cost[idx] = avg_cost
+            self._px[idx] = current_price
+            self.positions[symbol].name = name
     
     def add_position(self, symbol: str, name: str, quantity: int, price: float):
         """添加持仓"""
-        if symbol in self.positions:
+        self._version += 1
+        idx = self._symbol_to_idx.get(symbol)
+        if idx is not None:
             # 更新持仓
-            pos = self.positions[symbol]
-            total_cost = pos.cost_value + (quantity * price)
-            total_quantity = pos.quantity + quantity
-            pos.avg_cost = total_cost / total_quantity
-            pos.quantity = total_quantity
+            total_cost = self._qty[idx] * self._cost[idx] + (quantity * price)
+            total_quantity = self._qty[idx] + quantity
+            self._cost[idx] = total_cost / total_quantity
+            self._qty[idx] = total_quantity
         else:
             # 新建持仓
-            self.positions[symbol] = Position(
-                symbol=symbol,
-                name=name,
-                quantity=quantity,
-                avg_cost=price,
-                current_price=price
-            )
+            self._append(symbol, name, quantity, price, price)
     
     def reduce_position(self, symbol: str, quantity: int) -> bool:
         """减少持仓"""
-        if symbol not in self.positions:
+        idx = self._symbol_to_idx.get(symbol)
+        if idx is None:
             return False
         
-        pos = self.positions[symbol]
-        if pos.quantity < quantity:
+        if self._qty[idx] < quantity:
             return False
         
-        pos.quantity -= quantity
-        if pos.quantity == 0:
-            del self.positions[symbol]
+        self._version += 1
+        self._qty[idx] -= quantity
+        if self._qty[idx] == 0:
+            self._remove(symbol)
         
         return True
     
     def update_price(self, symbol: str, price: float):
         """更新持仓价格"""
-        if symbol in self.positions:
-            self.positions[symbol].current_price = price
+        idx = self._symbol_to_idx.get(symbol)
+        if idx is not None:
+            self._px[idx] = price
+            self._version += 1
+    
+    def update_prices(self, price_map: Union[Mapping[str, float], pd.Series]):
+        """
+        批量更新持仓价格（每日刷新行情时使用，单只股票的update_price仅用于零散更新）
+        
+        Args:
+            price_map: {股票代码: 价格} 字典，或以股票代码为索引的Series；未持有的股票会被忽略
+        """
+        if len(price_map) == 0:
+            return
+        
+        if hasattr(price_map, 'to_numpy'):
+            symbols = price_map.index
+            prices = price_map.to_numpy(dtype=np.float64)
+        else:
+            symbols = list(price_map.keys())
+            prices = np.fromiter(price_map.values(), dtype=np.float64, count=len(price_map))
+        
+        idx = np.fromiter(
+            (self._symbol_to_idx.get(symbol, -1) for symbol in symbols),
+            dtype=np.int64,
+            count=len(symbols)
+        )
+        held = idx >= 0
+        self._px[idx[held]] = prices[held]
+        self._version += 1
     
     def get_position(self, symbol: str) -> Optional[Position]:
         """获取持仓"""
@@ -94,7 +235,8 @@ class Portfolio:
     @property
     def total_market_value(self) -> float:
         """总市值"""
-        return sum(pos.market_value for pos in self.positions.values())
+        n = self._n
+        return float((self._qty[:n] * self._px[:n]).sum())
     
     @property
     def total_asset(self) -> float:
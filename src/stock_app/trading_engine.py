@@ -2,23 +2,83 @@
 交易引擎模块
 """
 from datetime import datetime
+from operator import attrgetter
 from typing import Optional, List, Tuple
 from rich.console import Console
 from rich.table import Table
 
 import config
 from src.stock_app.database import Database
-from src.stock_app.portfolio import Portfolio, Position
+from src.stock_app.portfolio import Portfolio
 
 
 console = Console()
 
+# 持仓展示所需字段（attrgetter在C层一次取出全部属性）
+_POS_GET = attrgetter('symbol', 'name', 'quantity', 'avg_cost', 'current_price',
+                      'market_value', 'profit', 'profit_rate')
+
+# 交易方向 -> (费用符号, 印花税系数)：买入时费用加到成交金额上且不收印花税，卖出时费用从成交金额中扣除
+_TRADE_SIGN = {
+    'buy': (1.0, 0.0),
+    'sell': (-1.0, 1.0),
+}
+
+# 交易引擎使用的SQL语句（模块级常量，保证sqlite3语句缓存命中）
+_SQL_SELECT_ACCOUNT_ID = 'SELECT id FROM account WHERE name = ?'
+_SQL_INSERT_ACCOUNT = '''
+    INSERT INTO account (name, initial_capital, current_capital, current_date, created_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+_SQL_SELECT_ACCOUNT = '''
+    SELECT id, initial_capital, current_capital, current_date
+    FROM account WHERE name = ?
+'''
+_SQL_SELECT_POSITIONS = '''
+    SELECT p.symbol, p.quantity, p.avg_cost, p.current_price, s.name
+    FROM positions p
+    LEFT JOIN stock_info s ON s.symbol = p.symbol
+    WHERE p.account_id = ?
+'''
+_SQL_SELECT_STOCK_NAME = 'SELECT name FROM stock_info WHERE symbol = ?'
+_SQL_INSERT_TXN = '''
+    INSERT INTO transactions 
+    (account_id, symbol, trade_date, trade_type, quantity, price, 
+     commission, stamp_tax, total_amount, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_UPDATE_ACCT = '''
+    UPDATE account 
+    SET current_capital = ?, current_date = ?
+    WHERE id = ?
+'''
+_SQL_UPSERT_POSITION = '''
+    INSERT OR REPLACE INTO positions 
+    (account_id, symbol, quantity, avg_cost, current_price, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+_SQL_DELETE_POSITION = '''
+    DELETE FROM positions 
+    WHERE account_id = ? AND symbol = ?
+'''
+_SQL_SELECT_TXNS = '''
+    SELECT trade_date, symbol, trade_type, quantity, price, 
+           commission, stamp_tax, total_amount
+    FROM transactions
+    WHERE account_id = ?
+    ORDER BY created_at DESC
+    LIMIT ?
+'''
+
 
 class TradingEngine:
     """模拟交易引擎"""
     
     def __init__(self, db: Database):
         self.db = db
+        # 整个引擎复用同一个连接和游标
+        self.conn = db.connect()
+        self.cursor = self.conn.cursor()
         self.portfolio: Optional[Portfolio] = None
         self.account_id: Optional[int] = None
         
@@ -28,20 +88,16 @@ class TradingEngine:
             initial_capital = config.INITIAL_CAPITAL
         
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
+            cursor = self.cursor
             
             # 检查账户是否已存在
-            cursor.execute('SELECT id FROM account WHERE name = ?', (account_name,))
+            cursor.execute(_SQL_SELECT_ACCOUNT_ID, (account_name,))
             if cursor.fetchone():
                 console.print(f"[red]账户 '{account_name}' 已存在[/red]")
                 return False
             
             # 创建账户
-            cursor.execute('''
-                INSERT INTO account (name, initial_capital, current_capital, current_date, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
+            cursor.execute(_SQL_INSERT_ACCOUNT, (
                 account_name,
                 initial_capital,
                 initial_capital,
@@ -49,7 +105,7 @@ class TradingEngine:
                 datetime.now().isoformat()
             ))
             
-            conn.commit()
+            self.conn.commit()
             console.print(f"[green]账户 '{account_name}' 创建成功！初始资金: {initial_capital:,.2f}元[/green]")
             return True
         except Exception as e:
@@ -59,14 +115,10 @@ class TradingEngine:
     def load_account(self, account_name: str) -> bool:
         """加载账户"""
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
+            cursor = self.cursor
             
             # 获取账户信息
-            cursor.execute('''
-                SELECT id, initial_capital, current_capital, current_date
-                FROM account WHERE name = ?
-            ''', (account_name,))
+            cursor.execute(_SQL_SELECT_ACCOUNT, (account_name,))
             
             result = cursor.fetchone()
             if not result:
@@ -81,21 +133,13 @@ class TradingEngine:
             self.portfolio.current_date = current_date
             self.account_id = account_id
             
-            # 加载持仓
-            cursor.execute('''
-                SELECT symbol, quantity, avg_cost, current_price
-                FROM positions WHERE account_id = ?
-            ''', (account_id,))
+            # 加载持仓（JOIN一次性取出股票名称，避免逐只查询stock_info）
+            cursor.execute(_SQL_SELECT_POSITIONS, (account_id,))
             
-            for symbol, quantity, avg_cost, current_price in cursor.fetchall():
-                # 获取股票名称
-                cursor.execute('SELECT name FROM stock_info WHERE symbol = ?', (symbol,))
-                name_result = cursor.fetchone()
-                name = name_result[0] if name_result else symbol
-                
-                self.portfolio.positions[symbol] = Position(
+            for symbol, quantity, avg_cost, current_price, name in cursor.fetchall():
+                self.portfolio.set_position(
                     symbol=symbol,
-                    name=name,
+                    name=name or symbol,
                     quantity=quantity,
                     avg_cost=avg_cost,
                     current_price=current_price or avg_cost
@@ -122,14 +166,14 @@ class TradingEngine:
         
         self.portfolio.current_date = date
         
-        # 更新所有持仓的当前价格
-        for symbol in self.portfolio.positions.keys():
-            price_info = self.db.get_stock_price_on_date(symbol, date)
-            if price_info:
-                self.portfolio.update_price(symbol, price_info['close'])
+        # 更新所有持仓的当前价格（一次查询取回全部持仓的收盘价）
+        prices = self.db.get_prices_on_date(list(self.portfolio.positions), date)
+        self.portfolio.update_prices(prices)
         
-        # 保存到数据库
-        self._save_account_state()
+        # 保存到数据库（账户状态和刷新后的持仓价格在同一事务中写入）
+        with self.db.transaction(self.conn):
+            self._save_account_state()
+            self._save_positions_bulk(list(self.portfolio.positions))
         
         console.print(f"[green]模拟日期已设置为: {date}[/green]")
         return True
@@ -145,10 +189,8 @@ class TradingEngine:
             return False
         
         # 获取股票信息
-        conn = self.db.connect()
-        cursor = conn.cursor()
-        cursor.execute('SELECT name FROM stock_info WHERE symbol = ?', (symbol,))
-        result = cursor.fetchone()
+        self.cursor.execute(_SQL_SELECT_STOCK_NAME, (symbol,))
+        result = self.cursor.fetchone()
         if not result:
             console.print(f"[red]股票 {symbol} 不存在[/red]")
             return False
@@ -176,20 +218,21 @@ class TradingEngine:
         self.portfolio.cash -= total_cost
         self.portfolio.add_position(symbol, stock_name, quantity, price)
         
-        # 记录交易
-        self._record_transaction(
-            symbol=symbol,
-            trade_type='buy',
-            quantity=quantity,
-            price=price,
-            commission=commission,
-            stamp_tax=stamp_tax,
-            total_amount=total_cost
-        )
-        
-        # 保存状态
-        self._save_account_state()
-        self._save_position(symbol)
+        # 记录交易并保存状态（同一个事务，一次提交；整笔交易共用一个时间戳）
+        ts = datetime.now().isoformat()
+        with self.db.transaction(self.conn):
+            self._record_transaction(
+                symbol=symbol,
+                trade_type='buy',
+                quantity=quantity,
+                price=price,
+                commission=commission,
+                stamp_tax=stamp_tax,
+                total_amount=total_cost,
+                ts=ts
+            )
+            self._save_account_state()
+            self._save_position(symbol, ts)
         
         console.print(f"[green]买入成功！{stock_name}({symbol}) {quantity}股 @ {price:.2f}元[/green]")
         console.print(f"[cyan]成交金额: {quantity * price:,.2f}元, 手续费: {commission:.2f}元, 总计: {total_cost:,.2f}元[/cyan]")
@@ -228,23 +271,24 @@ class TradingEngine:
         self.portfolio.cash += total_amount
         self.portfolio.reduce_position(symbol, quantity)
         
-        # 记录交易
-        self._record_transaction(
-            symbol=symbol,
-            trade_type='sell',
-            quantity=quantity,
-            price=price,
-            commission=commission,
-            stamp_tax=stamp_tax,
-            total_amount=total_amount
-        )
-        
-        # 保存状态
-        self._save_account_state()
-        if symbol in self.portfolio.positions:
-            self._save_position(symbol)
-        else:
-            self._delete_position(symbol)
+        # 记录交易并保存状态（同一个事务，一次提交；整笔交易共用一个时间戳）
+        ts = datetime.now().isoformat()
+        with self.db.transaction(self.conn):
+            self._record_transaction(
+                symbol=symbol,
+                trade_type='sell',
+                quantity=quantity,
+                price=price,
+                commission=commission,
+                stamp_tax=stamp_tax,
+                total_amount=total_amount,
+                ts=ts
+            )
+            self._save_account_state()
+            if symbol in self.portfolio.positions:
+                self._save_position(symbol, ts)
+            else:
+                self._delete_position(symbol)
         
         console.print(f"[green]卖出成功！{position.name}({symbol}) {quantity}股 @ {price:.2f}元[/green]")
         console.print(f"[cyan]成交金额: {quantity * price:,.2f}元, 手续费: {commission:.2f}元, 印花税: {stamp_tax:.2f}元, 实收: {total_amount:,.2f}元[/cyan]")
@@ -257,32 +301,27 @@ class TradingEngine:
         Returns:
             (总金额, 佣金, 印花税)
         """
+        sign, tax_mul = _TRADE_SIGN[trade_type]
         trade_amount = price * quantity
         
         # 佣金
-        commission = max(trade_amount * config.COMMISSION_RATE, config.MIN_COMMISSION)
+        commission = trade_amount * config.COMMISSION_RATE
+        if commission < config.MIN_COMMISSION:
+            commission = config.MIN_COMMISSION
         
         # 印花税（只在卖出时收取）
-        stamp_tax = trade_amount * config.STAMP_TAX_RATE if trade_type == 'sell' else 0
+        stamp_tax = trade_amount * config.STAMP_TAX_RATE * tax_mul
         
-        if trade_type == 'buy':
-            total = trade_amount + commission
-        else:  # sell
-            total = trade_amount - commission - stamp_tax
+        # 买入: 成交金额 + 费用；卖出: 成交金额 - 费用
+        total = trade_amount + sign * (commission + stamp_tax)
         
         return total, commission, stamp_tax
     
     def _record_transaction(self, symbol: str, trade_type: str, quantity: int,
                           price: float, commission: float, stamp_tax: float,
-                          total_amount: float):
-        """记录交易"""
-        conn = self.db.connect()
-        conn.execute('''
-            INSERT INTO transactions 
-            (account_id, symbol, trade_date, trade_type, quantity, price, 
-             commission, stamp_tax, total_amount, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+                          total_amount: float, ts: Optional[str] = None):
+        """记录交易（不提交，由调用方的db.transaction()统一提交；ts为本次交易操作的时间戳）"""
+        self.cursor.execute(_SQL_INSERT_TXN, (
             self.account_id,
             symbol,
             self.portfolio.current_date,
@@ -292,49 +331,42 @@ class TradingEngine:
             commission,
             stamp_tax,
             total_amount,
-            datetime.now().isoformat()
+            ts or datetime.now().isoformat()
         ))
-        conn.commit()
     
     def _save_account_state(self):
-        """保存账户状态"""
-        conn = self.db.connect()
-        conn.execute('''
-            UPDATE account 
-            SET current_capital = ?, current_date = ?
-            WHERE id = ?
-        ''', (self.portfolio.cash, self.portfolio.current_date, self.account_id))
-        conn.commit()
+        """保存账户状态（不提交，由调用方的db.transaction()统一提交）"""
+        self.cursor.execute(_SQL_UPDATE_ACCT, (self.portfolio.cash, self.portfolio.current_date, self.account_id))
     
-    def _save_position(self, symbol: str):
-        """保存持仓"""
+    def _save_position(self, symbol: str, ts: Optional[str] = None):
+        """保存持仓（不提交，由调用方的db.transaction()统一提交；ts为本次交易操作的时间戳）"""
         position = self.portfolio.get_position(symbol)
         if not position:
             return
         
-        conn = self.db.connect()
-        conn.execute('''
-            INSERT OR REPLACE INTO positions 
-            (account_id, symbol, quantity, avg_cost, current_price, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
+        self.cursor.execute(_SQL_UPSERT_POSITION, (
             self.account_id,
             symbol,
             position.quantity,
             position.avg_cost,
             position.current_price,
-            datetime.now().isoformat()
+            ts or datetime.now().isoformat()
         ))
-        conn.commit()
+    
+    def _save_positions_bulk(self, symbols: List[str], ts: Optional[str] = None):
+        """批量保存多只股票的持仓（一次executemany，不提交，由调用方的db.transaction()统一提交）"""
+        ts = ts or datetime.now().isoformat()
+        rows = [
+            (self.account_id, symbol, p.quantity, p.avg_cost, p.current_price, ts)
+            for symbol in symbols
+            if (p := self.portfolio.get_position(symbol))
+        ]
+        if rows:
+            self.cursor.executemany(_SQL_UPSERT_POSITION, rows)
     
     def _delete_position(self, symbol: str):
-        """删除持仓"""
-        conn = self.db.connect()
-        conn.execute('''
-            DELETE FROM positions 
-            WHERE account_id = ? AND symbol = ?
-        ''', (self.account_id, symbol))
-        conn.commit()
+        """删除持仓（不提交，由调用方的db.transaction()统一提交）"""
+        self.cursor.execute(_SQL_DELETE_POSITION, (self.account_id, symbol))
     
     def show_portfolio(self):
         """显示持仓"""
@@ -370,16 +402,17 @@ class TradingEngine:
             table.add_column("盈亏比例", justify="right")
             
             for pos in self.portfolio.positions.values():
-                profit_color = "green" if pos.profit >= 0 else "red"
+                symbol, name, quantity, avg_cost, current_price, market_value, profit, profit_rate = _POS_GET(pos)
+                profit_color = "green" if profit >= 0 else "red"
                 table.add_row(
-                    pos.symbol,
-                    pos.name,
-                    str(pos.quantity),
-                    f"{pos.avg_cost:.2f}",
-                    f"{pos.current_price:.2f}",
-                    f"{pos.market_value:,.2f}",
-                    f"[{profit_color}]{pos.profit:,.2f}[/{profit_color}]",
-                    f"[{profit_color}]{pos.profit_rate:.2f}%[/{profit_color}]"
+                    symbol,
+                    name,
+                    str(quantity),
+                    f"{avg_cost:.2f}",
+                    f"{current_price:.2f}",
+                    f"{market_value:,.2f}",
+                    f"[{profit_color}]{profit:,.2f}[/{profit_color}]",
+                    f"[{profit_color}]{profit_rate:.2f}%[/{profit_color}]"
                 )
             
             console.print(table)
@@ -392,19 +425,8 @@ class TradingEngine:
             console.print("[red]请先加载账户[/red]")
             return
         
-        conn = self.db.connect()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT trade_date, symbol, trade_type, quantity, price, 
-                   commission, stamp_tax, total_amount
-            FROM transactions
-            WHERE account_id = ?
-            ORDER BY created_at DESC
-            LIMIT ?
-        ''', (self.account_id, limit))
-        
-        results = cursor.fetchall()
+        self.cursor.execute(_SQL_SELECT_TXNS, (self.account_id, limit))
+        results = self.cursor.fetchall()
         
         if not results:
             console.print("[yellow]暂无交易记录[/yellow]")
@@ -421,17 +443,19 @@ class TradingEngine:
         table.add_column("印花税", justify="right")
         table.add_column("总金额", justify="right")
         
-        for row in results:
-            trade_type_text = "[green]买入[/green]" if row[2] == 'buy' else "[red]卖出[/red]"
-            table.add_row(
-                row[0],
-                row[1],
-                trade_type_text,
-                str(row[3]),
-                f"{row[4]:.2f}",
-                f"{row[5]:.2f}",
-                f"{row[6]:.2f}",
-                f"{row[7]:,.2f}"
-            )
+        # 按列一次性格式化，逐行添加时不再做任何格式化
+        dates, symbols, trade_types, quantities, prices, commissions, stamp_taxes, totals = zip(*results)
+        columns = (
+            dates,
+            symbols,
+            ["[green]买入[/green]" if t == 'buy' else "[red]卖出[/red]" for t in trade_types],
+            [str(q) for q in quantities],
+            [f"{p:.2f}" for p in prices],
+            [f"{c:.2f}" for c in commissions],
+            [f"{t:.2f}" for t in stamp_taxes],
+            [f"{t:,.2f}" for t in totals],
+        )
+        for row in zip(*columns):
+            table.add_row(*row)
         
         console.print(table)
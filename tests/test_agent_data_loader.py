@@ -0,0 +1,115 @@
+"""
+AI Agent交易日志数据加载器测试
+"""
+import csv
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from visualization.agent_data_loader import AgentDataLoader
+
+
+def _baseline_transactions(loader, df):
+    """逐行比较前后两天持仓的原始实现（作为向量化实现的参照）"""
+    transactions = []
+    prev_holdings = {}
+    
+    for idx, row in df.iterrows():
+        date = row['日期']
+        current_holdings = {h['symbol']: h for h in loader.parse_holdings_detail(row['持仓详情'])}
+        
+        if idx > 0:
+            for symbol, holding in current_holdings.items():
+                if symbol not in prev_holdings:
+                    transactions.append({
+                        '日期': date, '操作': '买入', '股票代码': symbol,
+                        '数量': holding['shares'], '价格': holding['price'],
+                        '金额': holding['shares'] * holding['price']
+                    })
+                elif holding['shares'] > prev_holdings[symbol]['shares']:
+                    diff_shares = holding['shares'] - prev_holdings[symbol]['shares']
+                    transactions.append({
+                        '日期': date, '操作': '加仓', '股票代码': symbol,
+                        '数量': diff_shares, '价格': holding['price'],
+                        '金额': diff_shares * holding['price']
+                    })
+            
+            for symbol, prev_holding in prev_holdings.items():
+                if symbol not in current_holdings:
+                    quantity = prev_holding['shares']
+                    sell_price = prev_holding['price']
+                    transactions.append({
+                        '日期': date, '操作': '卖出', '股票代码': symbol,
+                        '数量': quantity, '价格': sell_price,
+                        '金额': quantity * sell_price
+                    })
+                elif current_holdings[symbol]['shares'] < prev_holding['shares']:
+                    diff_shares = prev_holding['shares'] - current_holdings[symbol]['shares']
+                    sell_price = (prev_holding['price'] + current_holdings[symbol]['price']) / 2
+                    transactions.append({
+                        '日期': date, '操作': '减仓', '股票代码': symbol,
+                        '数量': diff_shares, '价格': sell_price,
+                        '金额': diff_shares * sell_price
+                    })
+        
+        prev_holdings = current_holdings
+    
+    return pd.DataFrame(transactions)
+
+
+def _write_portfolio_log(path, seed, days=40, symbols=8):
+    """按DualLogger的格式写入随机生成的portfolio日志（含无持仓的交易日）"""
+    rng = random.Random(seed)
+    codes = [f'{600000 + i}' for i in range(symbols)]
+    dates = pd.bdate_range('2024-01-02', periods=days).strftime('%Y-%m-%d')
+    
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['日期', '现金', '市值', '总资产', '收益率(%)', '持仓详情'])
+        shares = {}
+        for date in dates:
+            for code in codes:
+                roll = rng.random()
+                if roll < 0.15:
+                    shares.pop(code, None)
+                elif roll < 0.4:
+                    shares[code] = rng.randint(1, 30) * 100
+            # 持仓顺序随机，检验同一天内多笔操作的先后顺序
+            held = [code for code in codes if code in shares]
+            rng.shuffle(held)
+            details = '; '.join(
+                f"{code}:{shares[code]}股@{rng.uniform(5, 50):.2f}元(收益率{rng.uniform(-20, 20):.2f}%)"
+                for code in held
+            )
+            writer.writerow([date, '1000.00', '0.00', '1000.00', '0.00', details or '无持仓'])
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_load_daily_transactions_matches_baseline(tmp_path, seed):
+    """向量化的每日交易提取与逐行实现结果完全一致"""
+    path = tmp_path / f'agent_test_portfolio_{seed}.csv'
+    _write_portfolio_log(path, seed)
+    loader = AgentDataLoader(str(tmp_path))
+    
+    expected = _baseline_transactions(loader, loader.load_portfolio_data(str(path)))
+    actual = loader.load_daily_transactions(str(path))
+    
+    assert not expected.empty
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_load_daily_transactions_without_holdings(tmp_path):
+    """从未持仓的日志返回空DataFrame"""
+    path = tmp_path / 'agent_test_portfolio_empty.csv'
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['日期', '现金', '市值', '总资产', '收益率(%)', '持仓详情'])
+        writer.writerow(['2024-01-02', '1000.00', '0.00', '1000.00', '0.00', '无持仓'])
+        writer.writerow(['2024-01-03', '1000.00', '0.00', '1000.00', '0.00', '无持仓'])
+    
+    assert AgentDataLoader(str(tmp_path)).load_daily_transactions(str(path)).empty
@@ -0,0 +1,73 @@
+"""
+数据下载模块测试
+"""
+import asyncio
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('akshare')
+hist_em = pytest.importorskip('akshare.stock_feature.stock_hist_em')
+
+import config
+from src.stock_app.data_downloader import DataDownloader
+
+
+# 东方财富日K线接口返回的JSON（两条下载路径使用同一份输入）
+_KLINE_PAYLOAD = {
+    'data': {
+        'code': '600000',
+        'klines': [
+            '2024-01-02,6.60,6.62,6.65,6.55,300000,198600000.00,1.52,0.30,0.02,0.10',
+            '2024-01-03,6.62,6.70,6.72,6.60,350000,234500000.00,1.81,1.21,0.08,0.12',
+        ],
+    },
+}
+
+
+class _FakeResponse:
+    """同时模拟requests与aiohttp的响应对象"""
+    
+    status = 200
+    
+    def json(self, content_type=None):
+        return _KLINE_PAYLOAD
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeAsyncResponse(_FakeResponse):
+    async def json(self, content_type=None):
+        return _KLINE_PAYLOAD
+
+
+class _FakeAsyncSession:
+    def get(self, url, params=None):
+        return _FakeAsyncResponse()
+
+
+def test_akshare_and_async_paths_return_same_frame(tmp_path, monkeypatch):
+    """akshare路径与异步直连路径对同一份K线数据返回完全相同的DataFrame"""
+    monkeypatch.setattr(config, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(hist_em.requests, 'get', lambda *args, **kwargs: _FakeResponse())
+    downloader = DataDownloader(request_interval=0)
+    
+    via_akshare = downloader.get_stock_daily_data('600000', '20240101', '20240105', cache=False)
+    via_async = asyncio.run(downloader._fetch_symbol(
+        _FakeAsyncSession(), asyncio.Semaphore(1), '600000', '20240101', '20240105'
+    ))
+    
+    pd.testing.assert_frame_equal(via_akshare, via_async)
+    assert via_async['date'].tolist() == ['2024-01-02', '2024-01-03']
+    
+    # 异步路径写入的缓存被akshare路径读回时格式不变
+    cached = downloader.get_stock_daily_data('600000', '20240101', '20240105')
+    pd.testing.assert_frame_equal(cached, via_akshare)
@@ -0,0 +1,93 @@
+"""
+数据库模块测试
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.stock_app.database import Database
+
+
+def _daily_frame(dates):
+    """构造指定日期的日线DataFrame"""
+    n = len(dates)
+    return pd.DataFrame({
+        'date': dates,
+        'open': [10.0] * n,
+        'close': [10.5] * n,
+        'high': [10.8] * n,
+        'low': [9.9] * n,
+        'volume': [1000] * n,
+        'amount': [10500.0] * n,
+        'pct_change': [0.0] * n,
+    })
+
+
+def _stock_daily_indexes(db):
+    """stock_daily上显式创建的索引名集合"""
+    with db.reader() as conn:
+        return {row[0] for row in conn.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'stock_daily' AND sql IS NOT NULL
+        ''')}
+
+
+def test_last_trade_date_map_on_fresh_schema(tmp_path):
+    """init_database新建的库（日期列为date）也能读取每只股票的最后交易日"""
+    db = Database(str(tmp_path / 'stock.db'))
+    try:
+        assert db.get_last_trade_date_map() == {}
+        
+        db.save_stock_daily_data('600000', pd.DataFrame({
+            'date': ['2024-01-02', '2024-01-03'],
+            'open': [10.0, 10.5],
+            'close': [10.4, 10.6],
+            'high': [10.5, 10.8],
+            'low': [9.9, 10.3],
+            'volume': [1000, 1200],
+            'amount': [10400.0, 12720.0],
+            'pct_change': [0.0, 1.9],
+        }))
+        
+        assert db.get_last_trade_date_map() == {'600000': '20240103'}
+    finally:
+        db.close()
+
+
+def test_bulk_load_keeps_indexes_for_small_increment(tmp_path):
+    """增量写入的行数远小于现有数据时不删除索引"""
+    db = Database(str(tmp_path / 'stock.db'))
+    try:
+        db.save_stock_daily_data('600000', _daily_frame([f'2024-01-{d:02d}' for d in range(1, 31)]))
+        indexes = _stock_daily_indexes(db)
+        assert indexes
+        
+        with db.bulk_load_context(expected_rows=1):
+            assert _stock_daily_indexes(db) == indexes
+        
+        with db.bulk_load_context(expected_rows=30):
+            assert _stock_daily_indexes(db) == set()
+        assert _stock_daily_indexes(db) == indexes
+    finally:
+        db.close()
+
+
+def test_indexes_restored_after_interrupted_bulk_load(tmp_path):
+    """批量导入中途退出（未执行退出逻辑）后，下次打开数据库时重建被删除的索引"""
+    db_path = str(tmp_path / 'stock.db')
+    db = Database(db_path)
+    indexes = _stock_daily_indexes(db)
+    
+    ctx = db.bulk_load_context()
+    ctx.__enter__()
+    assert _stock_daily_indexes(db) == set()
+    db.close()
+    
+    db = Database(db_path)
+    try:
+        assert _stock_daily_indexes(db) == indexes
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+"""
+轻量INI解析测试
+"""
+import configparser
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from visualization import _fast_ini
+from visualization.agent_config_manager import AgentConfigManager
+
+
+def _configparser_sections(text):
+    """用RawConfigParser（原实现）解析，返回与_fast_ini.parse相同结构的字典"""
+    parser = configparser.RawConfigParser()
+    parser.read_string(text)
+    return {section: dict(parser.items(section)) for section in parser.sections()}
+
+
+def test_single_line_values_match_configparser():
+    """单行值、注释、大小写键名、':'分隔符和值中的'='与configparser解析结果一致"""
+    text = (
+        "# 文件头注释\n"
+        "[API]\n"
+        "api_base = https://example.com/v1?a=1&b=2\n"
+        "API_Key=sk-abc:def\n"
+        "; 分号注释\n"
+        "model : free:Qwen3-30B-A3B\n"
+        "empty =\n"
+        "\n"
+        "[Trading]\n"
+        "initial_capital = 1000000.0\n"
+        "stock_pool = 600519,600036, 000002\n"
+        "  \n"
+        "[Time]\n"
+        "start_date = 2020-01-02\n"
+        "end_date = 2020-12-31   \n"
+    )
+    assert _fast_ini.parse(text) == _configparser_sections(text)
+
+
+def test_plain_multiline_value_matches_configparser():
+    """续行不含缩进和注释符时，多行值与configparser一致"""
+    text = (
+        "[Prompt]\n"
+        "system_prompt = 第一行\n"
+        "\t第二行\n"
+        "\t\n"
+        "\t第四行\n"
+        "\n"
+        "[Model]\n"
+        "temperature = 1.0\n"
+    )
+    assert _fast_ini.parse(text) == _configparser_sections(text)
+
+
+def test_configparser_written_file_round_trips():
+    """configparser.write写出的文件：非提示词键与configparser一致，提示词逐字还原"""
+    prompt = "你是助手\n\n## 重要提醒\n- 第一条\n  缩进的一行\n末尾"
+    writer = configparser.RawConfigParser()
+    writer['API'] = {'api_base': 'https://example.com/v1', 'api_key': 'k', 'model': 'm'}
+    writer['Prompt'] = {'system_prompt': prompt}
+    writer['Trading'] = {'stock_pool': '600519,600036'}
+    buf = io.StringIO()
+    writer.write(buf)
+    text = buf.getvalue()
+    
+    parsed = _fast_ini.parse(text)
+    expected = _configparser_sections(text)
+    
+    # configparser把续行中的'## ...'当作注释丢弃，并去掉续行缩进；轻量解析器保留原文
+    assert parsed['Prompt'].pop('system_prompt') == prompt
+    expected['Prompt'].pop('system_prompt')
+    assert parsed == expected
+
+
+def test_save_and_load_config_round_trip(tmp_path, monkeypatch):
+    """save_config写出的文件由load_config读回后与保存的配置完全一致（含默认多行提示词）"""
+    manager = AgentConfigManager()
+    monkeypatch.setattr(manager, 'agents_dir', str(tmp_path))
+    monkeypatch.setattr(manager, 'config_file', str(tmp_path / 'user_setting.ini'))
+    
+    config = manager.get_default_config()
+    config.update({
+        'api_key': 'sk-test',
+        'api_call_interval': 3.5,
+        'temperature': 0.7,
+        'max_tokens': 1500,
+        'initial_capital': 500000.0,
+        'stock_pool': ['600519', '000001'],
+        'history_window_days': 30,
+        'start_date': '2021-01-04',
+        'end_date': '2021-06-30',
+    })
+    assert '\n' in config['system_prompt']
+    
+    ok, error = manager.save_config(config)
+    assert ok, error
+    assert manager.load_config() == config
+    
+    # 除提示词外，各键的原始字符串与configparser读取结果一致
+    with open(manager.config_file, encoding='utf-8') as f:
+        text = f.read()
+    parsed = _fast_ini.parse(text)
+    expected = _configparser_sections(text)
+    parsed['Prompt'].pop('system_prompt')
+    expected['Prompt'].pop('system_prompt')
+    assert parsed == expected
@@ -0,0 +1,131 @@
+"""
+持仓管理模块测试
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.stock_app.portfolio import Portfolio
+
+
+def _holdings(portfolio):
+    """{股票代码: (数量, 成本价, 当前价)}，通过Position视图读取"""
+    return {
+        symbol: (pos.quantity, pos.avg_cost, pos.current_price)
+        for symbol, pos in portfolio.positions.items()
+    }
+
+
+def test_append_beyond_initial_capacity():
+    """追加超过初始容量的持仓时扩容，已有行的数据不变"""
+    portfolio = Portfolio('test', 1_000_000)
+    for i in range(40):
+        portfolio.add_position(f'{600000 + i}', f'S{i}', 100 * (i + 1), 10.0 + i)
+    
+    assert len(portfolio.positions) == 40
+    for i in range(40):
+        pos = portfolio.get_position(f'{600000 + i}')
+        assert (pos.quantity, pos.avg_cost, pos.current_price) == (100 * (i + 1), 10.0 + i, 10.0 + i)
+    assert portfolio.total_market_value == pytest.approx(sum(100 * (i + 1) * (10.0 + i) for i in range(40)))
+
+
+def test_add_position_averages_cost():
+    """对已有持仓加仓时按数量加权计算成本价"""
+    portfolio = Portfolio('test', 100000)
+    portfolio.add_position('600000', 'A', 100, 10.0)
+    portfolio.add_position('600000', 'A', 300, 14.0)
+    
+    pos = portfolio.get_position('600000')
+    assert pos.quantity == 400
+    assert pos.avg_cost == pytest.approx(13.0)
+    assert pos.current_price == 10.0
+
+
+def test_remove_from_middle_keeps_other_rows():
+    """清仓中间一行后，用最后一行填补空位，其余持仓（包括已取出的Position对象）数据不变"""
+    portfolio = Portfolio('test', 100000)
+    portfolio.add_position('600000', 'A', 100, 10.0)
+    portfolio.add_position('600001', 'B', 200, 20.0)
+    portfolio.add_position('600002', 'C', 300, 30.0)
+    last = portfolio.get_position('600002')
+    
+    assert portfolio.reduce_position('600001', 200)
+    
+    assert 'B' not in [pos.name for pos in portfolio.positions.values()]
+    assert _holdings(portfolio) == {'600000': (100, 10.0, 10.0), '600002': (300, 30.0, 30.0)}
+    assert last.quantity == 300 and last.market_value == 9000.0
+    
+    # 被移动的行仍能正常更新
+    portfolio.update_price('600002', 31.0)
+    assert last.current_price == 31.0
+    assert portfolio.total_market_value == pytest.approx(100 * 10.0 + 300 * 31.0)
+    
+    # 删除后再追加的持仓使用空出来的行
+    portfolio.add_position('600003', 'D', 400, 40.0)
+    assert _holdings(portfolio)['600003'] == (400, 40.0, 40.0)
+    assert _holdings(portfolio)['600002'] == (300, 30.0, 31.0)
+
+
+def test_reduce_position_rejects_oversell_and_unknown_symbol():
+    """卖出数量超过持仓或未持有的股票时返回False且不修改数据"""
+    portfolio = Portfolio('test', 100000)
+    portfolio.add_position('600000', 'A', 100, 10.0)
+    
+    assert not portfolio.reduce_position('600000', 200)
+    assert not portfolio.reduce_position('600001', 100)
+    assert _holdings(portfolio) == {'600000': (100, 10.0, 10.0)}
+    
+    assert portfolio.reduce_position('600000', 40)
+    assert portfolio.get_position('600000').quantity == 60
+
+
+def test_set_position_new_and_existing():
+    """set_position新建持仓，或直接覆盖已有持仓的全部字段"""
+    portfolio = Portfolio('test', 100000)
+    portfolio.set_position('600000', 'A', 100, 10.0, 11.0)
+    pos = portfolio.get_position('600000')
+    assert (pos.quantity, pos.avg_cost, pos.current_price) == (100, 10.0, 11.0)
+    assert pos.profit == pytest.approx(100.0)
+    
+    portfolio.set_position('600000', 'A2', 500, 12.0, 9.0)
+    assert pos.name == 'A2'
+    assert (pos.quantity, pos.avg_cost, pos.current_price) == (500, 12.0, 9.0)
+    # 版本号变化后派生指标重新计算
+    assert pos.profit == pytest.approx(-1500.0)
+    assert pos.profit_rate == pytest.approx(-25.0)
+    assert len(portfolio.positions) == 1
+
+
+@pytest.mark.parametrize('as_series', [False, True])
+def test_update_prices_mapping_and_series(as_series):
+    """批量更新价格：字典与Series结果一致，未持有的股票被忽略"""
+    portfolio = Portfolio('test', 100000)
+    portfolio.add_position('600000', 'A', 100, 10.0)
+    portfolio.add_position('600001', 'B', 200, 20.0)
+    portfolio.add_position('600002', 'C', 300, 30.0)
+    pos = portfolio.get_position('600001')
+    assert pos.market_value == 4000.0
+    
+    prices = {'600001': 25.0, '999999': 1.0, '600002': 33.0}
+    portfolio.update_prices(pd.Series(prices) if as_series else prices)
+    
+    assert _holdings(portfolio) == {
+        '600000': (100, 10.0, 10.0),
+        '600001': (200, 20.0, 25.0),
+        '600002': (300, 30.0, 33.0),
+    }
+    assert pos.market_value == 5000.0
+    assert portfolio.total_market_value == pytest.approx(1000.0 + 5000.0 + 9900.0)
+
+
+def test_update_prices_empty_is_noop():
+    """空的价格表不修改任何数据"""
+    portfolio = Portfolio('test', 100000)
+    portfolio.add_position('600000', 'A', 100, 10.0)
+    portfolio.update_prices({})
+    portfolio.update_prices(pd.Series(dtype=float))
+    assert _holdings(portfolio) == {'600000': (100, 10.0, 10.0)}
@@ -0,0 +1,43 @@
+"""
+轻量INI解析
+用两个预编译正则一次扫描整个文件，替代configparser逐行的状态机解析；
+只覆盖user_setting.ini用到的语法：[节]、键 = 值、以制表符或空格缩进的续行（多行值）、整行注释
+"""
+import re
+from typing import Dict
+
+# 节标题，如 [API]
+_SECTION_RE = re.compile(r'^\[([^\]]+)\]\s*$', re.M)
+
+# 键值对：键位于行首（不以注释符或空白开头），值包括其后所有缩进的续行
+_KV_RE = re.compile(r'^([^=:;#\s\[][^=:\n]*?)\s*[=:][ \t]*(.*(?:\n[ \t].*)*)', re.M)
+
+
+def _join_value(raw: str) -> str:
+    """合并多行值：续行去掉写入时加的一个制表符（其余缩进保留），并去掉末尾空行"""
+    lines = raw.split('\n')
+    parts = [lines[0].strip()]
+    for line in lines[1:]:
+        parts.append(line[1:].rstrip() if line.startswith('\t') else line.strip())
+    return '\n'.join(parts).rstrip()
+
+
+def parse(text: str) -> Dict[str, Dict[str, str]]:
+    """
+    解析INI文本
+    
+    Args:
+        text: INI文件内容
+    
+    Returns:
+        {节名: {键: 值}}，键与configparser一致转为小写，同名节合并
+    """
+    sections: Dict[str, Dict[str, str]] = {}
+    headers = list(_SECTION_RE.finditer(text))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        body = text[header.end():end]
+        section = sections.setdefault(header.group(1).strip(), {})
+        for m in _KV_RE.finditer(body):
+            section[m.group(1).strip().lower()] = _join_value(m.group(2))
+    return sections
@@ -1,10 +1,211 @@
 """
 AI Agent交易结果可视化图表组件
 """
+import copy
+import re
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+try:
+    from numba import njit
+except ImportError:  # 未安装numba时使用NumPy实现
+    njit = None
+try:
+    import orjson  # noqa: F401
+    # 图表序列化为JSON时直接从NumPy缓冲区编码，不逐个转换为Python float
+    pio.json.config.default_engine = 'orjson'
+except ImportError:  # 未安装orjson时使用Plotly默认的json编码
+    pass
+
+
+# 持仓详情字符串中的单条持仓，如 600519:100股@1800.00元(收益率5.20%)
+_HOLDING_RE = re.compile(r'(\d{6}):(\d+)股@([\d.]+)元\(收益率[-\d.]+%\)')
+
+# 持仓详情字符串中各条持仓的分隔符（与Agents_Experience/utils/logger.py写入格式一致）
+_HOLDING_SEP = '; '
+
+# WebGL渲染总开关（关闭后全部使用SVG的go.Scatter）
+_USE_GL = True
+
+# 数据点超过该数量时使用WebGL渲染（Scattergl），以下仍用SVG保证清晰度
+_WEBGL_THRESHOLD = 500
+
+# 日收益率分布直方图的分箱数
+_RETURN_HIST_BINS = 30
+
+# 折线超过该点数时只画线不画数据点标记（标记是逐点几何体，点多时主导渲染和悬停开销）
+_MARKER_MAX_POINTS = 200
+
+# 时间序列超过该点数时用LTTB降采样后再交给Plotly
+_LTTB_POINTS = 2000
+
+# 布局的uirevision取值不变时，Streamlit重新运行生成新图也会保留用户的缩放和图例开关状态
+_UIREVISION = 'stockm1'
+
+# 交易时间线中各操作类型的颜色
+_OPERATION_COLORS = {
+    '买入': 'red',
+    '卖出': 'green',
+    '加仓': 'orange',
+    '减仓': 'blue'
+}
+
+
+@lru_cache(maxsize=32)
+def _empty_figure_template(text: str, title: str, height: int) -> go.Figure:
+    """构建并缓存只含提示文字的空图表（勿直接修改，通过_empty_figure取副本）"""
+    fig = go.Figure()
+    fig.add_annotation(
+        text=text,
+        xref="paper", yref="paper",
+        x=0.5, y=0.5, showarrow=False,
+        font=dict(size=20, color="gray")
+    )
+    fig.update_layout(
+        uirevision=_UIREVISION,
+        title=title,
+        template='plotly_white',
+        height=height
+    )
+    return fig
+
+
+def _empty_figure(text: str, title: str, height: int = 400) -> go.Figure:
+    """返回空数据提示图（从缓存的图表复制，调用方可自由修改）"""
+    return go.Figure(_empty_figure_template(text, title, height))
+
+
+def _scatter_type(n_points: int, multi_trace: bool = False) -> str:
+    """
+    按数据点数量选择折线trace类型名（Scattergl不支持stackgroup，堆叠图仍需scatter）
+    
+    multi_trace为True时（多条对比曲线叠加的图）不论点数都使用scattergl；
+    同一张图中的WebGL trace共用一个WebGL上下文，不会触及浏览器的上下文数量上限
+    """
+    if not _USE_GL:
+        return 'scatter'
+    return 'scattergl' if multi_trace or n_points > _WEBGL_THRESHOLD else 'scatter'
+
+
+def _scatter_cls(n_points: int, multi_trace: bool = False):
+    """按数据点数量选择折线trace类（见_scatter_type）"""
+    return go.Scattergl if _scatter_type(n_points, multi_trace) == 'scattergl' else go.Scatter
+
+
+def _line_mode(n_points: int) -> str:
+    """按数据点数量选择折线的绘制模式"""
+    return 'lines+markers' if n_points <= _MARKER_MAX_POINTS else 'lines'
+
+
+def _normalize_returns(df: pd.DataFrame, col: str = 'close') -> np.ndarray:
+    """以首个值为基准把价格列换算为累计收益率（%），一次NumPy运算"""
+    arr = df[col].to_numpy(dtype=np.float64)
+    return (arr / arr[0] - 1.0) * 100.0
+
+
+def _lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    LTTB（Largest-Triangle-Three-Buckets）降采样，返回保留点的下标
+    
+    横坐标按下标等距处理（日线数据按交易日等间隔），首尾两点始终保留
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    # 中间n-2个点均分为n_out-2个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # 各桶均值，供前一个桶选点时作为第三个顶点
+    sums = np.add.reduceat(y[:n - 1], edges[:-1])
+    counts = np.diff(edges)
+    avg_y = np.append(sums / counts, y[-1])
+    avg_x = np.append((edges[:-1] + edges[1:] - 1) / 2.0, n - 1.0)
+    
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bx = x[lo:hi]
+        by = y[lo:hi]
+        # 三角形面积（省略常数1/2）
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _lttb(x, y, n_out: int = _LTTB_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """按LTTB对(x, y)降采样，点数不超过n_out时原样返回"""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= n_out:
+        return x, y
+    idx = _lttb_indices(y, n_out)
+    return x[idx], y[idx]
+
+
+def _hist_and_mean_kernel(arr: np.ndarray, nbins: int):
+    """单次扫描求最小/最大/均值，再一次扫描分箱计数（供numba编译）"""
+    n = arr.shape[0]
+    lo = arr[0]
+    hi = arr[0]
+    total = 0.0
+    for i in range(n):
+        x = arr[i]
+        if x < lo:
+            lo = x
+        if x > hi:
+            hi = x
+        total += x
+    
+    # 所有值相同时与np.histogram一致，区间取[lo-0.5, hi+0.5]
+    if hi == lo:
+        lo -= 0.5
+        hi += 0.5
+    
+    counts = np.zeros(nbins, dtype=np.int64)
+    scale = nbins / (hi - lo)
+    for i in range(n):
+        j = int((arr[i] - lo) * scale)
+        if j >= nbins:
+            j = nbins - 1
+        counts[j] += 1
+    
+    edges = lo + np.arange(nbins + 1) * ((hi - lo) / nbins)
+    return counts, edges, total / n
+
+
+def _hist_and_mean_numpy(arr: np.ndarray, nbins: int):
+    """NumPy实现的分箱计数与均值"""
+    counts, edges = np.histogram(arr, bins=nbins)
+    return counts, edges, float(arr.mean())
+
+
+_hist_and_mean = (
+    njit(cache=True, fastmath=True)(_hist_and_mean_kernel) if njit is not None else _hist_and_mean_numpy
+)
+
+
+def _daily_return_histogram(returns: np.ndarray, nbins: int = _RETURN_HIST_BINS) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+    """
+    计算日收益率变化的直方图
+    
+    Returns:
+        (counts, edges, mean)；有效数据为空时返回None
+    """
+    daily = np.diff(np.asarray(returns, dtype=np.float64))
+    daily = daily[~np.isnan(daily)]
+    if daily.size == 0:
+        return None
+    return _hist_and_mean(daily, nbins)
 
 
 def create_portfolio_value_chart(df: pd.DataFrame, title: str = "投资组合总资产变化") -> go.Figure:
@@ -16,12 +217,15 @@ def create_portfolio_value_chart(df: pd.DataFrame, title: str = "投资组合总
         title: 图表标题
     """
     fig = go.Figure()
+    scatter = _scatter_cls(len(df))
+    total = df['总资产'].to_numpy()
+    x_ds, y_ds = _lttb(df['日期'], total)
     
     # 总资产曲线
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['总资产'],
-        mode='lines+markers',
+    fig.add_trace(scatter(
+        x=x_ds,
+        y=y_ds,
+        mode=_line_mode(len(y_ds)),
         name='总资产',
         line=dict(color='blue', width=2),
         fill='tozeroy',
@@ -29,8 +233,8 @@ def create_portfolio_value_chart(df: pd.DataFrame, title: str = "投资组合总
     ))
     
     # 添加初始资金参考线
-    if len(df) > 0:
-        initial_value = df['总资产'].iloc[0]
+    if len(total) > 0:
+        initial_value = float(total[0])
         fig.add_hline(
             y=initial_value,
             line_dash="dash",
@@ -40,6 +244,7 @@ def create_portfolio_value_chart(df: pd.DataFrame, title: str = "投资组合总
         )
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=title,
         xaxis_title='日期',
         yaxis_title='总资产（元）',
@@ -52,6 +257,26 @@ def create_portfolio_value_chart(df: pd.DataFrame, title: str = "投资组合总
     return fig
 
 
+def _build_overview_layout() -> dict:
+    """用make_subplots生成综合概览图的三行子图布局（不含模板，标题为占位文字）"""
+    layout = make_subplots(
+        rows=3, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.08,
+        subplot_titles=('1', '2', '3'),
+        row_heights=[0.4, 0.3, 0.3]
+    ).to_dict()['layout']
+    layout.pop('template', None)
+    return layout
+
+
+# 综合概览图的子图布局结构固定，模块加载时生成一次，每次调用深拷贝后填入标题
+_OVERVIEW_LAYOUT = _build_overview_layout()
+
+# 综合概览图各行子图对应的坐标轴
+_OVERVIEW_AXES = {1: ('x', 'y'), 2: ('x2', 'y2'), 3: ('x3', 'y3')}
+
+
 def create_return_rate_chart(df: pd.DataFrame, title: str = "收益率变化曲线") -> go.Figure:
     """
     创建收益率变化曲线图
@@ -61,19 +286,19 @@ def create_return_rate_chart(df: pd.DataFrame, title: str = "收益率变化曲
         title: 图表标题
     """
     fig = go.Figure()
+    scatter = _scatter_cls(len(df))
+    x_ds, y_ds = _lttb(df['日期'], df['收益率'].to_numpy())
     
     # 收益率曲线
-    colors = ['red' if val >= 0 else 'green' for val in df['收益率']]
-    
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['收益率'],
-        mode='lines+markers',
+    fig.add_trace(scatter(
+        x=x_ds,
+        y=y_ds,
+        mode=_line_mode(len(y_ds)),
         name='收益率',
         line=dict(color='orange', width=2),
         marker=dict(
             size=6,
-            color=df['收益率'],
+            color=y_ds,
             colorscale=[[0, 'green'], [0.5, 'yellow'], [1, 'red']],
             showscale=True,
             colorbar=dict(title="收益率(%)")
@@ -86,6 +311,7 @@ def create_return_rate_chart(df: pd.DataFrame, title: str = "收益率变化曲
     fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=title,
         xaxis_title='日期',
         yaxis_title='收益率 (%)',
@@ -107,29 +333,38 @@ def create_cash_position_chart(df: pd.DataFrame, title: str = "现金与持仓
     """
     fig = go.Figure()
     
+    # 在服务端完成堆叠（不使用stackgroup，免去Plotly.js每次重绘时的堆叠计算）
+    market_value = df['市值'].to_numpy(dtype=np.float64)
+    cash = df['现金'].to_numpy(dtype=np.float64)
+    stacked = market_value + cash
+    scatter = _scatter_cls(len(df))
+    
     # 持仓市值
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['市值'],
+    fig.add_trace(scatter(
+        x=df['日期'].to_numpy(),
+        y=market_value,
         mode='lines',
         name='持仓市值',
         line=dict(width=0.5, color='rgb(184, 247, 212)'),
-        stackgroup='one',
+        fill='tozeroy',
         fillcolor='rgb(184, 247, 212)'
     ))
     
-    # 现金
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['现金'],
+    # 现金（叠加在持仓市值之上，悬停时显示现金本身的金额）
+    fig.add_trace(scatter(
+        x=df['日期'].to_numpy(),
+        y=stacked,
+        customdata=cash,
         mode='lines',
         name='现金',
         line=dict(width=0.5, color='rgb(111, 231, 219)'),
-        stackgroup='one',
-        fillcolor='rgb(111, 231, 219)'
+        fill='tonexty',
+        fillcolor='rgb(111, 231, 219)',
+        hovertemplate='%{customdata:,.0f}'
     ))
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=title,
         xaxis_title='日期',
         yaxis_title='金额（元）',
@@ -145,83 +380,89 @@ def create_cash_position_chart(df: pd.DataFrame, title: str = "现金与持仓
 def create_combined_overview_chart(df: pd.DataFrame, 
                                    agent_name: str = "",
                                    index_data_dict: Optional[Dict[str, pd.DataFrame]] = None,
-                                   index_names: Optional[Dict[str, str]] = None) -> go.Figure:
+                                   index_names: Optional[Dict[str, str]] = None,
+                                   hover_mode: str = 'x') -> go.Figure:
     """
     创建综合概览图表（资产、收益率、现金持仓分布）
     
     Args:
         df: 包含完整数据的DataFrame
         agent_name: Agent名称
+        hover_mode: 悬停模式，默认'x'；'x unified'需要在所有trace上按y轴拾取，点数多时会明显卡顿
     """
-    fig = make_subplots(
-        rows=3, cols=1,
-        shared_xaxes=True,
-        vertical_spacing=0.08,
-        subplot_titles=(
-            f'{agent_name} 总资产变化',
-            '收益率变化',
-            '资产配置（现金 vs 持仓）'
-        ),
-        row_heights=[0.4, 0.3, 0.3]
+    layout = copy.deepcopy(_OVERVIEW_LAYOUT)
+    subplot_titles = (
+        f'{agent_name} 总资产变化',
+        '收益率变化',
+        '资产配置（现金 vs 持仓）'
     )
+    for annotation, text in zip(layout['annotations'], subplot_titles):
+        annotation['text'] = text
+    
+    trace_type = _scatter_type(len(df))
+    # 热点路径直接用dict描述trace，最后按所在行指定坐标轴
+    traces = []
+    rows = []
+    # 三行子图共用同一组降采样后的行（以总资产曲线选点），保证堆叠图横坐标一致
+    total = df['总资产'].to_numpy()
+    plot_df = df
+    if len(df) > _LTTB_POINTS:
+        plot_df = df.iloc[_lttb_indices(total, _LTTB_POINTS)]
+    mode = _line_mode(len(plot_df))
     
     # 1. 总资产曲线
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['总资产'],
-        mode='lines+markers',
+    traces.append(dict(
+        type=trace_type,
+        x=plot_df['日期'].to_numpy(),
+        y=plot_df['总资产'].to_numpy(),
+        mode=mode,
         name='总资产',
         line=dict(color='blue', width=2),
         fill='tozeroy',
         fillcolor='rgba(0, 100, 255, 0.1)',
         marker=dict(size=4)
-    ), row=1, col=1)
-    
-    # 初始资金参考线
-    if len(df) > 0:
-        initial_value = df['总资产'].iloc[0]
-        fig.add_hline(
-            y=initial_value,
-            line_dash="dash",
-            line_color="gray",
-            opacity=0.3,
-            row=1, col=1
+    ))
+    rows.append(1)
+    
+    # 2. 收益率曲线（只在画数据点时按收益率着色）
+    returns = plot_df['收益率'].to_numpy()
+    return_marker = dict(size=4)
+    if mode != 'lines':
+        return_marker.update(
+            color=returns,
+            colorscale=[[0, 'green'], [0.5, 'yellow'], [1, 'red']],
+            showscale=False
         )
-    
-    # 2. 收益率曲线
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['收益率'],
-        mode='lines+markers',
+    traces.append(dict(
+        type=trace_type,
+        x=plot_df['日期'].to_numpy(),
+        y=returns,
+        mode=mode,
         name='收益率',
         line=dict(color='orange', width=2),
-        marker=dict(
-            size=4,
-            color=df['收益率'],
-            colorscale=[[0, 'green'], [0.5, 'yellow'], [1, 'red']],
-            showscale=False
-        ),
+        marker=return_marker,
         fill='tozeroy',
         fillcolor='rgba(255, 165, 0, 0.1)'
-    ), row=2, col=1)
-    
-    fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.3, row=2, col=1)
+    ))
+    rows.append(2)
     
     # 添加指数对比（在收益率行）
     if index_data_dict and index_names and len(df) > 0:
-        initial_value = df['总资产'].iloc[0]
         index_colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8']
         
         for i, (symbol, index_df) in enumerate(index_data_dict.items()):
             if not index_df.empty and 'close' in index_df.columns:
                 # 归一化（以第一个值为基准，转换为收益率）
-                normalized = (index_df['close'] / index_df['close'].iloc[0] - 1) * 100
+                normalized = _normalize_returns(index_df)
                 
                 display_name = index_names.get(symbol, symbol)
                 
-                fig.add_trace(go.Scatter(
-                    x=index_df['date'],
-                    y=normalized,
+                x_ds, y_ds = _lttb(index_df['date'], normalized)
+                
+                traces.append(dict(
+                    type=_scatter_type(len(index_df), multi_trace=True),
+                    x=x_ds,
+                    y=y_ds,
                     mode='lines',
                     name=f"{display_name}",
                     line=dict(
@@ -231,34 +472,61 @@ def create_combined_overview_chart(df: pd.DataFrame,
                     ),
                     opacity=0.7,
                     showlegend=True
-                ), row=2, col=1)
+                ))
+                rows.append(2)
     
-    # 3. 资产配置堆叠图
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['市值'],
+    # 3. 资产配置堆叠图（stackgroup只能用scatter）
+    traces.append(dict(
+        type='scatter',
+        x=plot_df['日期'].to_numpy(),
+        y=plot_df['市值'].to_numpy(),
         mode='lines',
         name='持仓市值',
         line=dict(width=0.5),
         stackgroup='assets',
         fillcolor='rgba(184, 247, 212, 0.8)'
-    ), row=3, col=1)
+    ))
+    rows.append(3)
     
-    fig.add_trace(go.Scatter(
-        x=df['日期'],
-        y=df['现金'],
+    traces.append(dict(
+        type='scatter',
+        x=plot_df['日期'].to_numpy(),
+        y=plot_df['现金'].to_numpy(),
         mode='lines',
         name='现金',
         line=dict(width=0.5),
         stackgroup='assets',
         fillcolor='rgba(111, 231, 219, 0.8)'
-    ), row=3, col=1)
+    ))
+    rows.append(3)
+    
+    for trace, row in zip(traces, rows):
+        trace['xaxis'], trace['yaxis'] = _OVERVIEW_AXES[row]
+    
+    # 收益率零轴、初始资金参考线
+    shapes = [dict(
+        type='line',
+        xref='x2 domain', x0=0, x1=1,
+        yref='y2', y0=0, y1=0,
+        line=dict(color='gray', dash='dash'),
+        opacity=0.3
+    )]
+    if len(total) > 0:
+        initial_value = float(total[0])
+        shapes.insert(0, dict(
+            type='line',
+            xref='x domain', x0=0, x1=1,
+            yref='y', y0=initial_value, y1=initial_value,
+            line=dict(color='gray', dash='dash'),
+            opacity=0.3
+        ))
     
-    # 更新布局
-    fig.update_layout(
+    # 布局
+    layout.update(
+        uirevision=agent_name or _UIREVISION,
         height=1000,
         template='plotly_white',
-        hovermode='x unified',
+        hovermode=hover_mode,
         showlegend=True,
         legend=dict(
             orientation="h",
@@ -266,130 +534,107 @@ def create_combined_overview_chart(df: pd.DataFrame,
             y=1.02,
             xanchor="right",
             x=1
-        )
+        ),
+        shapes=shapes
     )
     
-    # 更新y轴标签
-    fig.update_yaxes(title_text="总资产（元）", tickformat=',.0f', row=1, col=1)
-    fig.update_yaxes(title_text="收益率 (%)", row=2, col=1)
-    fig.update_yaxes(title_text="金额（元）", tickformat=',.0f', row=3, col=1)
-    fig.update_xaxes(title_text="日期", row=3, col=1)
+    # 坐标轴标签
+    layout['yaxis'].update(title=dict(text="总资产（元）"), tickformat=',.0f')
+    layout['yaxis2'].update(title=dict(text="收益率 (%)"))
+    layout['yaxis3'].update(title=dict(text="金额（元）"), tickformat=',.0f')
+    layout['xaxis3'].update(title=dict(text="日期"))
     
-    return fig
+    return go.Figure(data=traces, layout=layout)
 
 
-def create_transactions_timeline(transactions_df: pd.DataFrame, title: str = "交易操作时间线") -> go.Figure:
+def create_transactions_timeline(transactions_df: pd.DataFrame, title: str = "交易操作时间线",
+                                 hover_mode: str = 'closest') -> go.Figure:
     """
     创建交易操作时间线图
     
     Args:
         transactions_df: 包含交易记录的DataFrame
         title: 图表标题
+        hover_mode: 悬停模式，交易点数量少，默认'closest'
     """
     if transactions_df.empty:
         # 返回空图表
-        fig = go.Figure()
-        fig.add_annotation(
-            text="暂无交易记录",
-            xref="paper", yref="paper",
-            x=0.5, y=0.5, showarrow=False,
-            font=dict(size=20, color="gray")
-        )
-        fig.update_layout(
-            title=title,
-            template='plotly_white',
-            height=400
-        )
-        return fig
+        return _empty_figure("暂无交易记录", title)
     
     fig = go.Figure()
     
-    # 为不同操作类型设置颜色
-    color_map = {
-        '买入': 'red',
-        '卖出': 'green',
-        '加仓': 'orange',
-        '减仓': 'blue'
-    }
-    
-    # 按操作类型分组绘制
-    for operation in transactions_df['操作'].unique():
-        df_op = transactions_df[transactions_df['操作'] == operation]
+    # 悬停文本整列一次拼接，之后按操作类型分组取用
+    text = (transactions_df['股票代码'].astype(str)
+            + '<br>数量: ' + transactions_df['数量'].astype(str)
+            + '<br>价格: ¥' + transactions_df['价格'].map('{:.2f}'.format)).to_numpy()
+    dates = transactions_df['日期'].to_numpy()
+    amounts = transactions_df['金额'].to_numpy()
+    qty = transactions_df['数量'].to_numpy(dtype=np.float32)
+    scatter = _scatter_cls(len(transactions_df), multi_trace=True)
+    
+    # 每种操作类型一条trace（图例可单独显示/隐藏），分组只做一次
+    for operation, idx in transactions_df.groupby('操作', sort=False).indices.items():
+        # 根据数量调整大小（按该操作类型的最大数量归一化）
+        op_qty = qty[idx]
+        max_qty = op_qty.max()
+        sizes = op_qty * (30.0 / max_qty if max_qty > 0 else 0.0) + 5.0
         
-        fig.add_trace(go.Scatter(
-            x=df_op['日期'],
-            y=df_op['金额'],
+        fig.add_trace(scatter(
+            x=dates[idx],
+            y=amounts[idx],
             mode='markers',
             name=operation,
             marker=dict(
-                size=df_op['数量'] / df_op['数量'].max() * 30 + 5,  # 根据数量调整大小
-                color=color_map.get(operation, 'gray'),
+                size=sizes,
+                color=_OPERATION_COLORS.get(operation, 'gray'),
                 opacity=0.7,
                 line=dict(width=1, color='white')
             ),
-            text=[f"{row['股票代码']}<br>数量: {row['数量']}<br>价格: ¥{row['价格']:.2f}" 
-                  for _, row in df_op.iterrows()],
+            text=text[idx],
             hovertemplate='<b>%{text}</b><br>日期: %{x}<br>金额: ¥%{y:,.0f}<extra></extra>'
         ))
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=title,
         xaxis_title='日期',
         yaxis_title='交易金额（元）',
         template='plotly_white',
         height=500,
-        hovermode='closest',
+        hovermode=hover_mode,
         yaxis=dict(tickformat=',.0f')
     )
     
     return fig
 
 
-def create_holdings_pie_chart(holdings_str: str, date: str = "", title: str = "持仓分布") -> go.Figure:
+def _parse_holdings(holdings_str: str) -> List[Tuple[str, float]]:
     """
-    创建持仓分布饼图
+    解析持仓详情字符串为 [(股票代码, 市值)]
     
-    Args:
-        holdings_str: 持仓详情字符串
-        date: 日期
-        title: 图表标题
+    按固定格式用str.partition切分（比逐条正则匹配快），格式不符时退回正则解析
     """
-    import re
-    
-    holdings = []
-    if pd.notna(holdings_str) and holdings_str:
-        for item in holdings_str.split(';'):
-            item = item.strip()
-            if not item:
-                continue
-            
-            match = re.match(r'(\d{6}):(\d+)股@([\d.]+)元\(收益率([-\d.]+)%\)', item)
-            if match:
-                symbol = match.group(1)
-                shares = int(match.group(2))
-                price = float(match.group(3))
-                holdings.append({
-                    'symbol': symbol,
-                    'value': shares * price
-                })
-    
-    if not holdings:
-        fig = go.Figure()
-        fig.add_annotation(
-            text="暂无持仓",
-            xref="paper", yref="paper",
-            x=0.5, y=0.5, showarrow=False,
-            font=dict(size=20, color="gray")
-        )
-        fig.update_layout(
-            title=f"{title} ({date})" if date else title,
-            template='plotly_white',
-            height=400
-        )
-        return fig
-    
-    symbols = [h['symbol'] for h in holdings]
-    values = [h['value'] for h in holdings]
+    pairs = []
+    try:
+        for item in holdings_str.split(_HOLDING_SEP):
+            code, _, rest = item.partition(':')
+            shares_s, _, rest = rest.partition('股@')
+            price_s, _, _ = rest.partition('元')
+            pairs.append((code, int(shares_s) * float(price_s)))
+        if len(pairs) != holdings_str.count('股@'):
+            raise ValueError(holdings_str)
+    except ValueError:
+        pairs = [
+            (m.group(1), int(m.group(2)) * float(m.group(3)))
+            for m in _HOLDING_RE.finditer(holdings_str)
+        ]
+    return pairs
+
+
+def _holdings_pie_figure(symbols: List[str], values: List[float], date: str, title: str) -> go.Figure:
+    """根据持仓代码和市值生成饼图（无持仓时返回提示图）"""
+    if not symbols:
+        return _empty_figure("暂无持仓", f"{title} ({date})" if date else title)
     
     fig = go.Figure(data=[go.Pie(
         labels=symbols,
@@ -405,6 +650,7 @@ def create_holdings_pie_chart(holdings_str: str, date: str = "", title: str = "
     )])
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=f"{title} ({date})" if date else title,
         template='plotly_white',
         height=400,
@@ -414,6 +660,57 @@ def create_holdings_pie_chart(holdings_str: str, date: str = "", title: str = "
     return fig
 
 
+def create_holdings_pie_chart(holdings_str: str, date: str = "", title: str = "持仓分布") -> go.Figure:
+    """
+    创建持仓分布饼图
+    
+    Args:
+        holdings_str: 持仓详情字符串
+        date: 日期
+        title: 图表标题
+    """
+    pairs = []
+    if pd.notna(holdings_str) and holdings_str:
+        pairs = _parse_holdings(holdings_str)
+    
+    symbols, values = (list(col) for col in zip(*pairs)) if pairs else ([], [])
+    return _holdings_pie_figure(symbols, values, date, title)
+
+
+def parse_holdings_table(holdings_series: pd.Series) -> pd.DataFrame:
+    """
+    批量解析多日的持仓详情字符串，所有行用一次向量化正则解析
+    
+    Args:
+        holdings_series: 持仓详情字符串Series
+    
+    Returns:
+        每条持仓一行的DataFrame（索引为holdings_series中所在行的索引），列为symbol、value（市值）
+    """
+    extracted = holdings_series.fillna('').astype(str).str.extractall(_HOLDING_RE.pattern)
+    return pd.DataFrame({
+        'symbol': extracted[0].to_numpy(),
+        'value': extracted[1].astype(int).to_numpy() * extracted[2].astype(float).to_numpy(),
+    }, index=extracted.index.get_level_values(0))
+
+
+def create_holdings_pie_chart_from_table(table: pd.DataFrame,
+                                         key,
+                                         date: str = "",
+                                         title: str = "持仓分布") -> go.Figure:
+    """
+    用parse_holdings_table的解析结果创建某一日的持仓分布饼图，无需再解析字符串
+    
+    Args:
+        table: parse_holdings_table返回的持仓表
+        key: 该日在持仓详情Series中的索引
+        date: 日期
+        title: 图表标题
+    """
+    rows = table[table.index == key]
+    return _holdings_pie_figure(rows['symbol'].tolist(), rows['value'].tolist(), date, title)
+
+
 def create_stock_profit_pie_chart(stock_profits: Dict[str, float], title: str = "各股票收益贡献占比") -> go.Figure:
     """
     创建各股票收益贡献占比饼图
@@ -424,67 +721,46 @@ def create_stock_profit_pie_chart(stock_profits: Dict[str, float], title: str =
         title: 图表标题
     """
     if not stock_profits:
-        fig = go.Figure()
-        fig.add_annotation(
-            text="暂无收益数据",
-            xref="paper", yref="paper",
-            x=0.5, y=0.5, showarrow=False,
-            font=dict(size=20, color="gray")
-        )
-        fig.update_layout(
-            title=title,
-            template='plotly_white',
-            height=400
-        )
-        return fig
-    
-    # 分离盈利和亏损股票
-    profit_stocks = {k: v for k, v in stock_profits.items() if v > 0}
-    loss_stocks = {k: abs(v) for k, v in stock_profits.items() if v < 0}
-    
-    # 判断总体是盈利还是亏损
-    total_profit = sum(stock_profits.values())
+        return _empty_figure("暂无收益数据", title)
+    
+    # 一次遍历分离盈利和亏损股票，同时累计总收益（判断总体是盈利还是亏损）
+    profit_stocks = {}
+    loss_stocks = {}
+    total_profit = 0.0
+    for symbol, profit in stock_profits.items():
+        total_profit += profit
+        if profit > 0:
+            profit_stocks[symbol] = profit
+        elif profit < 0:
+            loss_stocks[symbol] = -profit
     
     if not profit_stocks and not loss_stocks:
-        fig = go.Figure()
-        fig.add_annotation(
-            text="所有股票收益为0",
-            xref="paper", yref="paper",
-            x=0.5, y=0.5, showarrow=False,
-            font=dict(size=20, color="gray")
-        )
-        fig.update_layout(
-            title=title,
-            template='plotly_white',
-            height=400
-        )
-        return fig
+        return _empty_figure("所有股票收益为0", title)
     
     # 根据总收益决定显示方式
     if total_profit >= 0:
         # 总体盈利：显示盈利股票的贡献比例
         if profit_stocks:
-            symbols = list(profit_stocks.keys())
+            symbols = list(profit_stocks)
             values = list(profit_stocks.values())
+            hover_text = [
+                f'<b>{symbol}</b><br>盈利: ¥{profit:,.0f}<br>占比: %{{percent}}'
+                for symbol, profit in profit_stocks.items()
+            ]
             
             # 创建颜色：盈利用绿色系
             colors = ['#00C853', '#69F0AE', '#00E676', '#76FF03', '#B2FF59', '#CCFF90']
             
-            # 添加亏损股票的影响（用负值表示）
+            # 添加亏损股票的影响（用正值显示，但标记为亏损）
             if loss_stocks:
-                for symbol, loss in loss_stocks.items():
-                    symbols.append(f"{symbol}(亏)")
-                    values.append(loss)  # 用正值显示，但标记为亏损
+                symbols += [f"{symbol}(亏)" for symbol in loss_stocks]
+                values += loss_stocks.values()
+                hover_text += [
+                    f'<b>{symbol}(亏)</b><br>亏损: ¥{-loss:,.0f}<br>占比: %{{percent}}'
+                    for symbol, loss in loss_stocks.items()
+                ]
                 colors.extend(['#FF1744', '#FF5252', '#FF6E40', '#FF9100'])
             
-            hover_text = []
-            for i, symbol in enumerate(symbols):
-                if '(亏)' in symbol:
-                    original_profit = -loss_stocks[symbol.replace('(亏)', '')]
-                    hover_text.append(f'<b>{symbol}</b><br>亏损: ¥{original_profit:,.0f}<br>占比: %{{percent}}')
-                else:
-                    hover_text.append(f'<b>{symbol}</b><br>盈利: ¥{profit_stocks[symbol]:,.0f}<br>占比: %{{percent}}')
-            
             fig = go.Figure(data=[go.Pie(
                 labels=symbols,
                 values=values,
@@ -527,9 +803,8 @@ def create_stock_profit_pie_chart(stock_profits: Dict[str, float], title: str =
         
         # 如果有盈利股票，也显示出来
         if profit_stocks:
-            for symbol, profit in profit_stocks.items():
-                symbols.append(f"{symbol}(盈)")
-                values.append(profit)
+            symbols += [f"{symbol}(盈)" for symbol in profit_stocks]
+            values += profit_stocks.values()
             colors.extend(['#00C853', '#69F0AE', '#00E676', '#76FF03'])
         
         fig = go.Figure(data=[go.Pie(
@@ -547,6 +822,7 @@ def create_stock_profit_pie_chart(stock_profits: Dict[str, float], title: str =
         subtitle = f"总亏损: ¥{total_profit:,.0f}"
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=dict(
             text=f"{title}<br><sub>{subtitle}</sub>",
             x=0.5,
@@ -568,38 +844,42 @@ def create_daily_return_distribution(df: pd.DataFrame, title: str = "日收益
         df: 包含收益率数据的DataFrame
         title: 图表标题
     """
-    # 计算日收益率变化
-    daily_returns = df['收益率'].diff().dropna()
+    # 计算日收益率变化，并在本地完成分箱（不交给Plotly前端分箱）
+    hist = _daily_return_histogram(df['收益率'].to_numpy())
     
     fig = go.Figure()
     
-    fig.add_trace(go.Histogram(
-        x=daily_returns,
-        nbinsx=30,
-        name='日收益率',
-        marker=dict(
-            color='lightblue',
-            line=dict(color='darkblue', width=1)
-        ),
-        opacity=0.75
-    ))
-    
-    # 添加均值线
-    mean_return = daily_returns.mean()
-    fig.add_vline(
-        x=mean_return,
-        line_dash="dash",
-        line_color="red",
-        opacity=0.7,
-        annotation_text=f"均值: {mean_return:.2f}%"
-    )
+    if hist is not None:
+        counts, edges, mean_return = hist
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=edges[1] - edges[0],
+            name='日收益率',
+            marker=dict(
+                color='lightblue',
+                line=dict(color='darkblue', width=1)
+            ),
+            opacity=0.75
+        ))
+        
+        # 添加均值线
+        fig.add_vline(
+            x=mean_return,
+            line_dash="dash",
+            line_color="red",
+            opacity=0.7,
+            annotation_text=f"均值: {mean_return:.2f}%"
+        )
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=title,
         xaxis_title='日收益率变化 (%)',
         yaxis_title='频数',
         template='plotly_white',
         height=400,
+        bargap=0,
         showlegend=False
     )
     
@@ -609,7 +889,8 @@ def create_daily_return_distribution(df: pd.DataFrame, title: str = "日收益
 def create_portfolio_value_chart_with_index(df: pd.DataFrame, 
                                            index_data_dict: Optional[Dict[str, pd.DataFrame]] = None,
                                            index_names: Optional[Dict[str, str]] = None,
-                                           title: str = "投资组合总资产变化") -> go.Figure:
+                                           title: str = "投资组合总资产变化",
+                                           hover_mode: str = 'x') -> go.Figure:
     """
     创建带指数对比的投资组合总资产变化曲线图
     
@@ -618,18 +899,22 @@ def create_portfolio_value_chart_with_index(df: pd.DataFrame,
         index_data_dict: {index_symbol: df} 指数数据字典
         index_names: {index_symbol: display_name} 指数显示名称映射
         title: 图表标题
+        hover_mode: 悬停模式，默认'x'；'x unified'需要在所有trace上按y轴拾取，点数多时会明显卡顿
     """
     fig = go.Figure()
     
     # 总资产曲线（归一化为收益率）
     if len(df) > 0 and '总资产' in df.columns:
-        initial_value = df['总资产'].iloc[0]
-        portfolio_return = (df['总资产'] / initial_value - 1) * 100
+        total = df['总资产'].to_numpy()
+        initial_value = float(total[0])
+        portfolio_return = (total / initial_value - 1) * 100
+        
+        x_ds, y_ds = _lttb(df['日期'], portfolio_return)
         
-        fig.add_trace(go.Scatter(
-            x=df['日期'],
-            y=portfolio_return,
-            mode='lines+markers',
+        fig.add_trace(_scatter_cls(len(df))(
+            x=x_ds,
+            y=y_ds,
+            mode=_line_mode(len(y_ds)),
             name='投资组合',
             line=dict(color='blue', width=3),
             marker=dict(size=4),
@@ -644,13 +929,15 @@ def create_portfolio_value_chart_with_index(df: pd.DataFrame,
         for i, (symbol, index_df) in enumerate(index_data_dict.items()):
             if not index_df.empty and 'close' in index_df.columns:
                 # 归一化（以第一个值为基准）
-                normalized = (index_df['close'] / index_df['close'].iloc[0] - 1) * 100
+                normalized = _normalize_returns(index_df)
                 
                 display_name = index_names.get(symbol, symbol)
                 
-                fig.add_trace(go.Scatter(
-                    x=index_df['date'],
-                    y=normalized,
+                x_ds, y_ds = _lttb(index_df['date'], normalized)
+                
+                fig.add_trace(_scatter_cls(len(index_df))(
+                    x=x_ds,
+                    y=y_ds,
                     mode='lines',
                     name=f"{display_name}",
                     line=dict(
@@ -670,12 +957,13 @@ def create_portfolio_value_chart_with_index(df: pd.DataFrame,
     )
     
     fig.update_layout(
+        uirevision=_UIREVISION,
         title=title,
         xaxis_title='日期',
         yaxis_title='收益率 (%)',
         template='plotly_white',
         height=500,
-        hovermode='x unified',
+        hovermode=hover_mode,
         legend=dict(
             orientation="h",
             yanchor="bottom",
@@ -691,7 +979,8 @@ def create_portfolio_value_chart_with_index(df: pd.DataFrame,
 def create_stock_pool_comparison_chart(portfolio_df: pd.DataFrame,
                                        stock_pool_data: Dict[str, pd.DataFrame],
                                        stock_names: Optional[Dict[str, str]] = None,
-                                       title: str = "投资组合 vs 股票池对比") -> go.Figure:
+                                       title: str = "投资组合 vs 股票池对比",
+                                       hover_mode: str = 'x') -> go.Figure:
     """
     创建投资组合与股票池中所有股票的对比图
     
@@ -700,18 +989,25 @@ def create_stock_pool_comparison_chart(portfolio_df: pd.DataFrame,
         stock_pool_data: {股票代码: 价格数据DataFrame} 字典
         stock_names: {股票代码: 股票名称} 映射
         title: 图表标题
+        hover_mode: 悬停模式，默认'x'；'x unified'需要在所有trace上按y轴拾取，点数多时会明显卡顿
     """
-    fig = go.Figure()
+    # 热点路径直接用dict描述trace和布局，整张图在go.Figure构造时一次校验
+    trace_type = _scatter_type(len(portfolio_df), multi_trace=True)
+    traces = []
     
     # 投资组合收益率曲线
     if len(portfolio_df) > 0 and '总资产' in portfolio_df.columns:
-        initial_value = portfolio_df['总资产'].iloc[0]
-        portfolio_return = (portfolio_df['总资产'] / initial_value - 1) * 100
+        total = portfolio_df['总资产'].to_numpy()
+        initial_value = float(total[0])
+        portfolio_return = (total / initial_value - 1) * 100
         
-        fig.add_trace(go.Scatter(
-            x=portfolio_df['日期'],
-            y=portfolio_return,
-            mode='lines+markers',
+        x_ds, y_ds = _lttb(portfolio_df['日期'], portfolio_return)
+        
+        traces.append(dict(
+            type=trace_type,
+            x=x_ds,
+            y=y_ds,
+            mode=_line_mode(len(y_ds)),
             name='AI投资组合',
             line=dict(color='#FF1744', width=4),
             marker=dict(size=5),
@@ -724,7 +1020,7 @@ def create_stock_pool_comparison_chart(portfolio_df: pd.DataFrame,
     for i, (symbol, stock_df) in enumerate(stock_pool_data.items()):
         if not stock_df.empty and 'close' in stock_df.columns:
             # 归一化收益率
-            normalized = (stock_df['close'] / stock_df['close'].iloc[0] - 1) * 100
+            normalized = _normalize_returns(stock_df)
             
             # 获取股票名称
             if stock_names and symbol in stock_names:
@@ -732,9 +1028,12 @@ def create_stock_pool_comparison_chart(portfolio_df: pd.DataFrame,
             else:
                 display_name = symbol
             
-            fig.add_trace(go.Scatter(
-                x=stock_df['date'],
-                y=normalized,
+            x_ds, y_ds = _lttb(stock_df['date'], normalized)
+            
+            traces.append(dict(
+                type=trace_type,
+                x=x_ds,
+                y=y_ds,
                 mode='lines',
                 name=display_name,
                 line=dict(
@@ -745,21 +1044,14 @@ def create_stock_pool_comparison_chart(portfolio_df: pd.DataFrame,
                 opacity=0.6
             ))
     
-    # 添加零轴参考线
-    fig.add_hline(
-        y=0,
-        line_dash="dash",
-        line_color="gray",
-        opacity=0.5
-    )
-    
-    fig.update_layout(
+    layout = dict(
+        uirevision=_UIREVISION,
         title=title,
         xaxis_title='日期',
         yaxis_title='收益率 (%)',
         template='plotly_white',
         height=600,
-        hovermode='x unified',
+        hovermode=hover_mode,
         legend=dict(
             orientation="v",
             yanchor="top",
@@ -767,10 +1059,18 @@ def create_stock_pool_comparison_chart(portfolio_df: pd.DataFrame,
             xanchor="left",
             x=1.01,
             bgcolor='rgba(255, 255, 255, 0.8)'
-        )
+        ),
+        # 零轴参考线
+        shapes=[dict(
+            type='line',
+            xref='paper', x0=0, x1=1,
+            yref='y', y0=0, y1=0,
+            line=dict(color='gray', dash='dash'),
+            opacity=0.5
+        )]
     )
     
-    return fig
+    return go.Figure(data=traces, layout=layout)
 
 
 def create_stock_performance_table(portfolio_df: pd.DataFrame,
@@ -787,46 +1087,40 @@ def create_stock_performance_table(portfolio_df: pd.DataFrame,
     Returns:
         对比数据表格
     """
-    performance_data = []
+    names = []
+    initial_values = []
+    final_values = []
     
-    # 计算投资组合表现
+    # 投资组合起止资产
     if len(portfolio_df) > 0 and '总资产' in portfolio_df.columns:
-        initial_value = portfolio_df['总资产'].iloc[0]
-        final_value = portfolio_df['总资产'].iloc[-1]
-        total_return = (final_value / initial_value - 1) * 100
-        
-        performance_data.append({
-            '代码/名称': 'AI投资组合',
-            '起始值': f"¥{initial_value:,.0f}",
-            '最终值': f"¥{final_value:,.0f}",
-            '总收益率(%)': f"{total_return:.2f}%",
-            '收益金额': f"¥{final_value - initial_value:,.0f}"
-        })
-    
-    # 计算各股票表现
+        total = portfolio_df['总资产'].to_numpy()
+        names.append('AI投资组合')
+        initial_values.append(float(total[0]))
+        final_values.append(float(total[-1]))
+    
+    # 各股票起止价格（假设同样投资100万，按价格涨跌换算为起止资产）
+    initial_investment = 1000000
     for symbol, stock_df in stock_pool_data.items():
         if not stock_df.empty and 'close' in stock_df.columns:
-            initial_price = stock_df['close'].iloc[0]
-            final_price = stock_df['close'].iloc[-1]
-            total_return = (final_price / initial_price - 1) * 100
-            
-            # 假设同样投资100万
-            initial_investment = 1000000
-            final_value = initial_investment * (1 + total_return / 100)
-            profit = final_value - initial_investment
-            
+            close = stock_df['close']
             # 获取股票名称
             if stock_names and symbol in stock_names:
-                display_name = f"{symbol} {stock_names[symbol]}"
+                names.append(f"{symbol} {stock_names[symbol]}")
             else:
-                display_name = symbol
-            
-            performance_data.append({
-                '代码/名称': display_name,
-                '起始值': f"¥{initial_investment:,.0f}",
-                '最终值': f"¥{final_value:,.0f}",
-                '总收益率(%)': f"{total_return:.2f}%",
-                '收益金额': f"¥{profit:,.0f}"
-            })
-    
-    return pd.DataFrame(performance_data)
+                names.append(symbol)
+            initial_values.append(initial_investment)
+            final_values.append(initial_investment * (close.iat[-1] / close.iat[0]))
+    
+    # 收益率与收益金额按列一次算出
+    initial_arr = np.asarray(initial_values, dtype=np.float64)
+    final_arr = np.asarray(final_values, dtype=np.float64)
+    total_returns = (final_arr / initial_arr - 1) * 100
+    profits = final_arr - initial_arr
+    
+    return pd.DataFrame({
+        '代码/名称': names,
+        '起始值': [f"¥{v:,.0f}" for v in initial_arr],
+        '最终值': [f"¥{v:,.0f}" for v in final_arr],
+        '总收益率(%)': [f"{r:.2f}%" for r in total_returns],
+        '收益金额': [f"¥{v:,.0f}" for v in profits]
+    })
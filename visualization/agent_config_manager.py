@@ -3,67 +3,54 @@ AI Agent配置管理模块
 处理user_setting.ini的读写和.env的加载
 """
 import os
-import configparser
-from typing import Dict, Any, List
+import re
+import copy
+from typing import Dict, Any, Set, Tuple
 from dotenv import load_dotenv
 
+from visualization import _fast_ini
 
-class AgentConfigManager:
-    """Agent配置管理器"""
-    
-    def __init__(self):
-        """初始化配置管理器"""
-        # 配置文件路径
-        self.agents_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), 
-            'Agents_Experience'
-        )
-        self.config_file = os.path.join(self.agents_dir, 'user_setting.ini')
-        self.env_file = os.path.join(self.agents_dir, '.env')
-        
-        # 加载.env文件
-        load_dotenv(self.env_file)
-        
-        # 初始化配置解析器（使用RawConfigParser避免插值语法问题）
-        self.config = configparser.RawConfigParser()
-        
-    def get_default_config(self) -> Dict[str, Any]:
-        """
-        从.env文件获取默认配置
-        
-        Returns:
-            默认配置字典
-        """
-        return {
-            # API配置
-            'api_base': os.getenv('QWEN_API_BASE', 'https://api.suanli.cn/v1'),
-            'api_key': os.getenv('QWEN_API_KEY', ''),
-            'model': os.getenv('QWEN_MODEL', 'free:Qwen3-30B-A3B'),
-            'api_call_interval': float(os.getenv('API_CALL_INTERVAL', '2')),
-            
-            # 模型参数
-            'temperature': 1.0,
-            'max_tokens': 2000,
-            
-            # 系统提示词
-            'system_prompt': self._get_default_prompt(),
-            
-            # 交易配置
-            'initial_capital': 1000000,
-            'stock_pool': ['600519', '600036', '000002', '601318', '000858', 
-                          '600276', '300750', '002594', '600887', '002475'],
-            
-            # 时间配置
-            'start_date': '2020-01-02',
-            'end_date': '2020-12-31',
-            
-            # 历史窗口
-            'history_window_days': 60
-        }
-    
-    def _get_default_prompt(self) -> str:
-        """获取默认系统提示词（与system_prompt.py一致）"""
-        return """你是一位专业的股票投资顾问AI助手，负责管理一个100万人民币的股票账户。
+
+# 项目路径（导入时计算一次）
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_AGENTS_DIR = os.path.join(_PROJECT_ROOT, 'Agents_Experience')
+_CONFIG_FILE = os.path.join(_AGENTS_DIR, 'user_setting.ini')
+_ENV_FILE = os.path.join(_AGENTS_DIR, '.env')
+
+# 已解析配置的缓存（进程内所有实例共享，UI每次重跑都会新建管理器）：
+# {配置文件路径: ((st_mtime_ns, st_size), 配置字典)}，文件未变化时不再重新解析
+_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+# 本进程中已加载过的.env文件（load_dotenv不覆盖已有环境变量，重复加载没有意义）
+_DOTENV_LOADED: Set[str] = set()
+
+# 股票池中的单个股票代码（6位数字），解析时顺带去掉空白和格式错误的条目
+_STOCK_CODE_RE = re.compile(r'(?<!\d)\d{6}(?!\d)')
+
+# 默认可选股票池
+_DEFAULT_STOCK_POOL: Tuple[str, ...] = (
+    '600519',  # 贵州茅台
+    '600036',  # 招商银行
+    '000002',  # 万科A
+    '601318',  # 中国平安
+    '000858',  # 五粮液
+    '600276',  # 恒瑞医药
+    '300750',  # 宁德时代
+    '002594',  # 比亚迪
+    '600887',  # 伊利股份
+    '002475',  # 立讯精密
+    '000001',  # 平安银行
+    '000333',  # 美的集团
+    '600031',  # 三一重工
+    '601166',  # 兴业银行
+    '600900',  # 长江电力
+)
+
+# 默认配置中选中的股票数（取默认股票池的前N只）
+_DEFAULT_SELECTED_STOCKS = 10
+
+# 默认系统提示词（与system_prompt.py一致）
+_DEFAULT_PROMPT = """你是一位专业的股票投资顾问AI助手，负责管理一个100万人民币的股票账户。
 
 ## 你的角色
 - 你需要基于市场数据和技术分析做出买入/卖出决策
@@ -155,6 +142,87 @@ class AgentConfigManager:
 - 每次决策都会产生真实的交易成本（佣金约万分之三，卖出时还有千分之一印花税）
 - 买入数量必须是100的整数倍（1手=100股）
 - **必须通过调用buy_stock/sell_stock工具来执行交易，不能只在文本中说明**"""
+
+# user_setting.ini文件模板，输出格式与configparser.write一致
+_INI_TEMPLATE = """[API]
+api_base = {api_base}
+api_key = {api_key}
+model = {model}
+api_call_interval = {api_call_interval}
+
+[Model]
+temperature = {temperature}
+max_tokens = {max_tokens}
+
+[Prompt]
+system_prompt = {system_prompt}
+
+[Trading]
+initial_capital = {initial_capital}
+stock_pool = {stock_pool}
+history_window_days = {history_window_days}
+
+[Time]
+start_date = {start_date}
+end_date = {end_date}
+
+"""
+
+
+class AgentConfigManager:
+    """Agent配置管理器"""
+    
+    def __init__(self):
+        """初始化配置管理器"""
+        # 配置文件路径
+        self.agents_dir = _AGENTS_DIR
+        self.config_file = _CONFIG_FILE
+        self.env_file = _ENV_FILE
+        
+    def _ensure_env_loaded(self):
+        """首次需要默认配置时加载.env文件（进程内每个文件只加载一次，多个实例共享）"""
+        if self.env_file not in _DOTENV_LOADED:
+            load_dotenv(self.env_file)
+            _DOTENV_LOADED.add(self.env_file)
+    
+    def get_default_config(self) -> Dict[str, Any]:
+        """
+        从.env文件获取默认配置
+        
+        Returns:
+            默认配置字典
+        """
+        self._ensure_env_loaded()
+        env = os.environ
+        return {
+            # API配置
+            'api_base': env.get('QWEN_API_BASE', 'https://api.suanli.cn/v1'),
+            'api_key': env.get('QWEN_API_KEY', ''),
+            'model': env.get('QWEN_MODEL', 'free:Qwen3-30B-A3B'),
+            'api_call_interval': float(env.get('API_CALL_INTERVAL', '2')),
+            
+            # 模型参数
+            'temperature': 1.0,
+            'max_tokens': 2000,
+            
+            # 系统提示词
+            'system_prompt': _DEFAULT_PROMPT,
+            
+            # 交易配置
+            'initial_capital': 1000000,
+            'stock_pool': list(_DEFAULT_STOCK_POOL[:_DEFAULT_SELECTED_STOCKS]),
+            
+            # 时间配置
+            'start_date': '2020-01-02',
+            'end_date': '2020-12-31',
+            
+            # 历史窗口
+            'history_window_days': 60
+        }
+    
+    def _get_default_prompt(self) -> str:
+        """获取默认系统提示词（与system_prompt.py一致）"""
+        return _DEFAULT_PROMPT
     
     def load_config(self) -> Dict[str, Any]:
         """
@@ -163,50 +231,61 @@ class AgentConfigManager:
         Returns:
             配置字典
         """
+        # 配置文件未变化时直接返回缓存（返回副本，调用方修改不影响缓存）
+        try:
+            st = os.stat(self.config_file)
+            file_stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            file_stat = None
+        cached = _CONFIG_CACHE.get(self.config_file)
+        if file_stat is not None and cached is not None and cached[0] == file_stat:
+            return copy.deepcopy(cached[1])
+        
         # 先获取默认配置
         config = self.get_default_config()
         
         # 如果配置文件存在，则加载覆盖
-        if os.path.exists(self.config_file):
+        if file_stat is not None:
             try:
-                self.config.read(self.config_file, encoding='utf-8')
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    sections = _fast_ini.parse(f.read())
                 
                 # API配置
-                if self.config.has_section('API'):
-                    config['api_base'] = self.config.get('API', 'api_base', fallback=config['api_base'])
-                    config['api_key'] = self.config.get('API', 'api_key', fallback=config['api_key'])
-                    config['model'] = self.config.get('API', 'model', fallback=config['model'])
-                    config['api_call_interval'] = self.config.getfloat('API', 'api_call_interval', 
-                                                                       fallback=config['api_call_interval'])
+                api = sections.get('API')
+                if api is not None:
+                    config['api_base'] = api.get('api_base', config['api_base'])
+                    config['api_key'] = api.get('api_key', config['api_key'])
+                    config['model'] = api.get('model', config['model'])
+                    config['api_call_interval'] = float(api.get('api_call_interval', config['api_call_interval']))
                 
                 # 模型参数
-                if self.config.has_section('Model'):
-                    config['temperature'] = self.config.getfloat('Model', 'temperature', 
-                                                                 fallback=config['temperature'])
-                    config['max_tokens'] = self.config.getint('Model', 'max_tokens', 
-                                                             fallback=config['max_tokens'])
+                model = sections.get('Model')
+                if model is not None:
+                    config['temperature'] = float(model.get('temperature', config['temperature']))
+                    config['max_tokens'] = int(model.get('max_tokens', config['max_tokens']))
                 
                 # 系统提示词
-                if self.config.has_section('Prompt'):
-                    config['system_prompt'] = self.config.get('Prompt', 'system_prompt', 
-                                                             fallback=config['system_prompt'])
+                prompt = sections.get('Prompt')
+                if prompt is not None:
+                    config['system_prompt'] = prompt.get('system_prompt', config['system_prompt'])
                 
                 # 交易配置
-                if self.config.has_section('Trading'):
-                    config['initial_capital'] = self.config.getfloat('Trading', 'initial_capital', 
-                                                                     fallback=config['initial_capital'])
-                    stock_pool_str = self.config.get('Trading', 'stock_pool', fallback='')
+                trading = sections.get('Trading')
+                if trading is not None:
+                    config['initial_capital'] = float(trading.get('initial_capital', config['initial_capital']))
+                    stock_pool_str = trading.get('stock_pool', '')
                     if stock_pool_str:
-                        config['stock_pool'] = [s.strip() for s in stock_pool_str.split(',')]
-                    config['history_window_days'] = self.config.getint('Trading', 'history_window_days',
-                                                                       fallback=config['history_window_days'])
+                        config['stock_pool'] = _STOCK_CODE_RE.findall(stock_pool_str)
+                    config['history_window_days'] = int(trading.get('history_window_days',
+                                                                    config['history_window_days']))
                 
                 # 时间配置
-                if self.config.has_section('Time'):
-                    config['start_date'] = self.config.get('Time', 'start_date', 
-                                                          fallback=config['start_date'])
-                    config['end_date'] = self.config.get('Time', 'end_date', 
-                                                        fallback=config['end_date'])
+                time_section = sections.get('Time')
+                if time_section is not None:
+                    config['start_date'] = time_section.get('start_date', config['start_date'])
+                    config['end_date'] = time_section.get('end_date', config['end_date'])
+                
+                _CONFIG_CACHE[self.config_file] = (file_stat, copy.deepcopy(config))
                     
             except Exception as e:
                 print(f"加载配置文件失败: {e}")
@@ -226,46 +305,33 @@ class AgentConfigManager:
             (是否保存成功, 错误信息)
         """
         try:
-            # 创建新的配置对象（使用RawConfigParser避免插值语法问题）
-            new_config = configparser.RawConfigParser()
-            
-            # API配置
-            new_config.add_section('API')
-            new_config.set('API', 'api_base', str(config.get('api_base', '')))
-            new_config.set('API', 'api_key', str(config.get('api_key', '')))
-            new_config.set('API', 'model', str(config.get('model', '')))
-            new_config.set('API', 'api_call_interval', str(config.get('api_call_interval', 2)))
-            
-            # 模型参数
-            new_config.add_section('Model')
-            new_config.set('Model', 'temperature', str(config.get('temperature', 1.0)))
-            new_config.set('Model', 'max_tokens', str(config.get('max_tokens', 2000)))
-            
-            # 系统提示词
-            new_config.add_section('Prompt')
-            new_config.set('Prompt', 'system_prompt', str(config.get('system_prompt', '')))
-            
-            # 交易配置
-            new_config.add_section('Trading')
-            new_config.set('Trading', 'initial_capital', str(config.get('initial_capital', 1000000)))
             stock_pool = config.get('stock_pool', [])
             if isinstance(stock_pool, list):
-                new_config.set('Trading', 'stock_pool', ','.join(stock_pool))
-            else:
-                new_config.set('Trading', 'stock_pool', str(stock_pool))
-            new_config.set('Trading', 'history_window_days', str(config.get('history_window_days', 60)))
+                stock_pool = ','.join(stock_pool)
             
-            # 时间配置
-            new_config.add_section('Time')
-            new_config.set('Time', 'start_date', str(config.get('start_date', '')))
-            new_config.set('Time', 'end_date', str(config.get('end_date', '')))
+            # 多行值按configparser的写法，续行前加制表符缩进
+            payload = _INI_TEMPLATE.format(
+                api_base=config.get('api_base', ''),
+                api_key=config.get('api_key', ''),
+                model=config.get('model', ''),
+                api_call_interval=config.get('api_call_interval', 2),
+                temperature=config.get('temperature', 1.0),
+                max_tokens=config.get('max_tokens', 2000),
+                system_prompt=str(config.get('system_prompt', '')).replace('\n', '\n\t'),
+                initial_capital=config.get('initial_capital', 1000000),
+                stock_pool=stock_pool,
+                history_window_days=config.get('history_window_days', 60),
+                start_date=config.get('start_date', ''),
+                end_date=config.get('end_date', '')
+            )
             
             # 确保目录存在
             os.makedirs(self.agents_dir, exist_ok=True)
             
             # 写入文件
             with open(self.config_file, 'w', encoding='utf-8') as f:
-                new_config.write(f)
+                f.write(payload)
+            _CONFIG_CACHE.pop(self.config_file, None)
             
             print(f"配置已成功保存到: {self.config_file}")
             return True, ""
@@ -277,28 +343,12 @@ class AgentConfigManager:
             traceback.print_exc()
             return False, error_msg
     
-    def get_available_stock_pool(self) -> List[str]:
+    def get_available_stock_pool(self) -> Tuple[str, ...]:
         """
         获取可用的股票池（从数据库或默认配置）
         
         Returns:
-            股票代码列表
+            股票代码元组（只读）
         """
         # 这里可以从数据库查询，目前返回默认股票池
-        return [
-            '600519',  # 贵州茅台
-            '600036',  # 招商银行
-            '000002',  # 万科A
-            '601318',  # 中国平安
-            '000858',  # 五粮液
-            '600276',  # 恒瑞医药
-            '300750',  # 宁德时代
-            '002594',  # 比亚迪
-            '600887',  # 伊利股份
-            '002475',  # 立讯精密
-            '000001',  # 平安银行
-            '000333',  # 美的集团
-            '600031',  # 三一重工
-            '601166',  # 兴业银行
-            '600900',  # 长江电力
-        ]
+        return _DEFAULT_STOCK_POOL
@@ -2,13 +2,33 @@
 AI Agent交易日志数据加载器
 用于加载和解析Agents_Experience/logs目录中的交易日志数据
 """
+import numpy as np
 import pandas as pd
+import mmap
 import os
 import re
-from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
 
+# 项目路径（导入时计算一次）
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LOGS_DIR = os.path.join(_PROJECT_ROOT, 'Agents_Experience', 'logs')
+
+# portfolio日志文件名，如 agent_qwen_portfolio_20240101_120000.csv
+_PORTFOLIO_FILE_RE = re.compile(r'agent_(.+)_portfolio_(\d{8}_\d{6})\.csv')
+
+# 单条持仓，如 601318:2000股@86.12元(收益率0.00%)
+_HOLDING_RE = re.compile(r'(\d{6}):(\d+)股@([\d.]+)元\(收益率([-\d.]+)%\)')
+
+# 决策日志中每个交易日的分隔行（字节模式，直接在mmap映射的文件内容上匹配）
+_DECISION_DATE_RE = re.compile(
+    r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] 交易日期: (\d{4}-\d{2}-\d{2})'.encode('utf-8')
+)
+
+# 决策内容中的章节标题，如 【市场分析】
+_SECTION_SPLIT_RE = re.compile(r'【([^【】]+)】')
+
+
 class AgentDataLoader:
     """AI Agent交易数据加载器"""
     
@@ -19,13 +39,10 @@ class AgentDataLoader:
         Args:
             logs_dir: 日志文件目录路径，默认为项目的Agents_Experience/logs目录
         """
-        if logs_dir is None:
-            # 获取项目根目录
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(current_dir)
-            self.logs_dir = os.path.join(project_root, 'Agents_Experience', 'logs')
-        else:
-            self.logs_dir = logs_dir
+        self.logs_dir = _LOGS_DIR if logs_dir is None else logs_dir
+        
+        # portfolio CSV解析结果缓存：{文件路径: (修改时间, DataFrame)}
+        self._df_cache: Dict[str, Tuple[float, pd.DataFrame]] = {}
     
     def get_available_logs(self) -> List[Dict[str, str]]:
         """
@@ -38,28 +55,26 @@ class AgentDataLoader:
             return []
         
         logs = []
-        portfolio_files = {}
-        
-        # 查找所有portfolio CSV文件
-        for file in os.listdir(self.logs_dir):
-            if '_portfolio_' in file and file.endswith('.csv'):
-                match = re.match(r'agent_(.+)_portfolio_(\d{8}_\d{6})\.csv', file)
-                if match:
-                    agent_name = match.group(1)
-                    timestamp = match.group(2)
-                    key = f"{agent_name}_{timestamp}"
-                    portfolio_files[key] = file
-        
-        # 为每个portfolio文件查找对应的decision log
-        for key, portfolio_file in portfolio_files.items():
-            agent_name, timestamp = key.rsplit('_', 1)
+        logs_dir = self.logs_dir
+        
+        # 一次扫描目录，记录所有文件名（之后判断决策日志是否存在时不再逐个stat）
+        with os.scandir(logs_dir) as it:
+            entries = {entry.name for entry in it if entry.is_file()}
+        
+        # 查找所有portfolio CSV文件，并为每个portfolio文件查找对应的decision log
+        for file in entries:
+            match = _PORTFOLIO_FILE_RE.fullmatch(file)
+            if match is None:
+                continue
+            
+            agent_name, timestamp = match.groups()
             decision_file = f"agent_{agent_name}_decision_{timestamp}.log"
             
             log_info = {
                 'agent_name': agent_name,
                 'timestamp': timestamp,
-                'portfolio_file': os.path.join(self.logs_dir, portfolio_file),
-                'decision_file': os.path.join(self.logs_dir, decision_file) if os.path.exists(os.path.join(self.logs_dir, decision_file)) else None,
+                'portfolio_file': os.path.join(logs_dir, file),
+                'decision_file': os.path.join(logs_dir, decision_file) if decision_file in entries else None,
                 'display_name': f"{agent_name} ({self._format_timestamp(timestamp)})"
             }
             logs.append(log_info)
@@ -69,12 +84,11 @@ class AgentDataLoader:
         return logs
     
     def _format_timestamp(self, timestamp: str) -> str:
-        """格式化时间戳显示"""
-        try:
-            dt = datetime.strptime(timestamp, '%Y%m%d_%H%M%S')
-            return dt.strftime('%Y-%m-%d %H:%M:%S')
-        except:
+        """格式化时间戳显示（YYYYMMDD_HHMMSS -> YYYY-MM-DD HH:MM:SS，按固定位置切片）"""
+        if len(timestamp) != 15 or timestamp[8] != '_' or not (timestamp[:8] + timestamp[9:]).isdigit():
             return timestamp
+        return (f"{timestamp[0:4]}-{timestamp[4:6]}-{timestamp[6:8]} "
+                f"{timestamp[9:11]}:{timestamp[11:13]}:{timestamp[13:15]}")
     
     def load_portfolio_data(self, portfolio_file: str) -> pd.DataFrame:
         """
@@ -87,17 +101,24 @@ class AgentDataLoader:
             DataFrame包含日期、现金、市值、总资产、收益率等信息
         """
         try:
-            df = pd.read_csv(portfolio_file, encoding='utf-8')
+            mtime = os.stat(portfolio_file).st_mtime
+            cached = self._df_cache.get(portfolio_file)
+            if cached is not None and cached[0] == mtime:
+                return cached[1].copy(deep=False)
             
-            # 确保日期列存在并转换格式
-            if '日期' in df.columns:
-                df['日期'] = pd.to_datetime(df['日期'])
+            # 日期列在C解析器中直接转换，避免读取后再做一次pd.to_datetime
+            try:
+                df = pd.read_csv(portfolio_file, encoding='utf-8', engine='c', parse_dates=['日期'])
+            except ValueError:
+                # 文件中没有日期列
+                df = pd.read_csv(portfolio_file, encoding='utf-8', engine='c')
             
             # 转换收益率列（去除%符号）
             if '收益率(%)' in df.columns:
                 df['收益率'] = df['收益率(%)'].astype(float)
             
-            return df
+            self._df_cache[portfolio_file] = (mtime, df)
+            return df.copy(deep=False)
         except Exception as e:
             print(f"加载portfolio数据失败: {e}")
             return pd.DataFrame()
@@ -112,27 +133,19 @@ class AgentDataLoader:
         Returns:
             持仓列表，每个元素包含symbol, shares, price, return_rate
         """
-        if pd.isna(holdings_str) or not holdings_str:
+        if not isinstance(holdings_str, str):
             return []
         
-        holdings = []
-        # 按分号分割多个持仓
-        for item in holdings_str.split(';'):
-            item = item.strip()
-            if not item:
-                continue
-            
-            # 解析格式：601318:2000股@86.12元(收益率0.00%)
-            match = re.match(r'(\d{6}):(\d+)股@([\d.]+)元\(收益率([-\d.]+)%\)', item)
-            if match:
-                holdings.append({
-                    'symbol': match.group(1),
-                    'shares': int(match.group(2)),
-                    'price': float(match.group(3)),
-                    'return_rate': float(match.group(4))
-                })
-        
-        return holdings
+        # 正则本身能区分各条持仓，直接在整个字符串上扫描，无需先按分号切分
+        return [
+            {
+                'symbol': m[1],
+                'shares': int(m[2]),
+                'price': float(m[3]),
+                'return_rate': float(m[4])
+            }
+            for m in _HOLDING_RE.finditer(holdings_str)
+        ]
     
     def load_daily_transactions(self, portfolio_file: str) -> pd.DataFrame:
         """
@@ -148,80 +161,78 @@ class AgentDataLoader:
         if df.empty or '持仓详情' not in df.columns:
             return pd.DataFrame()
         
-        transactions = []
-        prev_holdings = {}
-        prev_cash = 0
+        # 展开为长表：(行号, 股票代码, 持股数, 价格, 行内顺序)
+        records = []
+        for row_pos, holdings_str in enumerate(df['持仓详情'].to_numpy()):
+            records.extend(
+                (row_pos, h['symbol'], h['shares'], h['price'], order)
+                for order, h in enumerate(self.parse_holdings_detail(holdings_str))
+            )
+        if not records:
+            return pd.DataFrame()
+        
+        # 转为宽表（行=交易日，列=股票），未持有为NaN；同一天重复出现的股票取最后一条
+        long_df = pd.DataFrame(records, columns=['row', 'symbol', 'shares', 'price', 'order'])
+        wide = (
+            long_df.groupby(['row', 'symbol'])
+            .agg(shares=('shares', 'last'), price=('price', 'last'), order=('order', 'first'))
+            .unstack('symbol')
+            .reindex(range(len(df)))
+        )
+        symbols = wide['shares'].columns.to_numpy()
+        shares = wide['shares'].to_numpy(dtype=np.float64)
+        price = wide['price'].to_numpy(dtype=np.float64)
+        order = wide['order'].to_numpy(dtype=np.float64)
         
-        for idx, row in df.iterrows():
-            date = row['日期']
-            current_cash = row.get('现金', 0)
-            current_holdings = {}
-            
-            # 解析当前持仓
-            holdings = self.parse_holdings_detail(row['持仓详情'])
-            for holding in holdings:
-                symbol = holding['symbol']
-                current_holdings[symbol] = holding
-            
-            # 比较与前一天的变化
-            if idx > 0:
-                # 查找新增持仓（买入）
-                for symbol, holding in current_holdings.items():
-                    if symbol not in prev_holdings:
-                        transactions.append({
-                            '日期': date,
-                            '操作': '买入',
-                            '股票代码': symbol,
-                            '数量': holding['shares'],
-                            '价格': holding['price'],
-                            '金额': holding['shares'] * holding['price']
-                        })
-                    elif holding['shares'] > prev_holdings[symbol]['shares']:
-                        # 加仓
-                        diff_shares = holding['shares'] - prev_holdings[symbol]['shares']
-                        transactions.append({
-                            '日期': date,
-                            '操作': '加仓',
-                            '股票代码': symbol,
-                            '数量': diff_shares,
-                            '价格': holding['price'],
-                            '金额': diff_shares * holding['price']
-                        })
-                
-                # 查找减少持仓（卖出）
-                for symbol, prev_holding in prev_holdings.items():
-                    if symbol not in current_holdings:
-                        # 完全卖出：使用前一天的持仓价格作为卖出价格估算
-                        quantity = prev_holding['shares']
-                        sell_price = prev_holding['price']
-                        
-                        transactions.append({
-                            '日期': date,
-                            '操作': '卖出',
-                            '股票代码': symbol,
-                            '数量': quantity,
-                            '价格': sell_price,
-                            '金额': quantity * sell_price
-                        })
-                    elif current_holdings[symbol]['shares'] < prev_holding['shares']:
-                        # 减仓：使用当前价格作为卖出价格估算
-                        diff_shares = prev_holding['shares'] - current_holdings[symbol]['shares']
-                        # 使用前后价格的平均值
-                        sell_price = (prev_holding['price'] + current_holdings[symbol]['price']) / 2
-                        
-                        transactions.append({
-                            '日期': date,
-                            '操作': '减仓',
-                            '股票代码': symbol,
-                            '数量': diff_shares,
-                            '价格': sell_price,
-                            '金额': diff_shares * sell_price
-                        })
-            
-            prev_holdings = current_holdings
-            prev_cash = current_cash
+        # 与前一天逐格比较（第一天没有可比较的前一天）
+        cur_shares, prev_shares = shares[1:], shares[:-1]
+        cur_price, prev_price = price[1:], price[:-1]
+        held = ~np.isnan(cur_shares)
+        prev_held = ~np.isnan(prev_shares)
+        both = held & prev_held
         
-        return pd.DataFrame(transactions)
+        # 每类操作：(掩码, 操作名, 数量, 价格, 排序组, 行内顺序)
+        # 同一天内先列新增/加仓（按当天持仓顺序），再列卖出/减仓（按前一天持仓顺序）
+        with np.errstate(invalid='ignore'):
+            kinds = (
+                # 新增持仓（买入）
+                (held & ~prev_held, '买入', cur_shares, cur_price, 0, order[1:]),
+                # 加仓
+                (both & (cur_shares > prev_shares), '加仓', cur_shares - prev_shares, cur_price, 0, order[1:]),
+                # 完全卖出：使用前一天的持仓价格作为卖出价格估算
+                (~held & prev_held, '卖出', prev_shares, prev_price, 1, order[:-1]),
+                # 减仓：使用前后价格的平均值作为卖出价格估算
+                (both & (cur_shares < prev_shares), '减仓', prev_shares - cur_shares,
+                 (prev_price + cur_price) / 2, 1, order[:-1]),
+            )
+        
+        parts = []
+        for mask, operation, quantity, trade_price, group, item_order in kinds:
+            rows, cols = np.nonzero(mask)
+            if len(rows) == 0:
+                continue
+            parts.append((rows, cols, np.full(len(rows), operation, dtype=object),
+                          quantity[rows, cols], trade_price[rows, cols],
+                          np.full(len(rows), group), item_order[rows, cols]))
+        if not parts:
+            return pd.DataFrame()
+        
+        rows, cols, operations, quantities, prices, groups, item_orders = (
+            np.concatenate(column) for column in zip(*parts)
+        )
+        sort_idx = np.lexsort((item_orders, groups, rows))
+        rows, cols = rows[sort_idx], cols[sort_idx]
+        quantities = quantities[sort_idx].astype(np.int64)
+        prices = prices[sort_idx]
+        
+        return pd.DataFrame({
+            '日期': df['日期'].to_numpy()[rows + 1],
+            '操作': operations[sort_idx],
+            '股票代码': symbols[cols],
+            '数量': quantities,
+            '价格': prices,
+            '金额': quantities * prices
+        })
     
     def load_decision_log(self, decision_file: str) -> List[Dict]:
         """
@@ -237,46 +248,52 @@ class AgentDataLoader:
             return []
         
         try:
-            with open(decision_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 按日期分割决策记录
-            decisions = []
-            date_pattern = r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] 交易日期: (\d{4}-\d{2}-\d{2})'
-            
-            # 找到所有日期分隔符
-            matches = list(re.finditer(date_pattern, content))
-            
-            for i, match in enumerate(matches):
-                timestamp = match.group(1)
-                trade_date = match.group(2)
-                
-                # 提取该日期的决策内容
-                start_pos = match.end()
-                end_pos = matches[i + 1].start() if i + 1 < len(matches) else len(content)
-                decision_content = content[start_pos:end_pos].strip()
-                
-                # 提取关键信息
-                decisions.append({
-                    'timestamp': timestamp,
-                    'trade_date': trade_date,
-                    'content': decision_content,
-                    'market_analysis': self._extract_section(decision_content, '【市场分析】'),
-                    'decision_reason': self._extract_section(decision_content, '【决策理由】')
-                })
-            
-            return decisions
+            with open(decision_file, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return []
+                # 映射文件而不是整体读入，只解码每条决策的内容片段
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self._parse_decisions(mm)
         except Exception as e:
             print(f"加载决策日志失败: {e}")
             return []
     
-    def _extract_section(self, content: str, section_name: str) -> str:
-        """从决策内容中提取特定章节"""
-        pattern = f'{section_name}(.*?)(?=【|$)'
-        match = re.search(pattern, content, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        return ""
+    def _parse_decisions(self, mm: mmap.mmap) -> List[Dict]:
+        """从映射的决策日志中按日期分割决策记录"""
+        decisions = []
+        
+        # 找到所有日期分隔符
+        matches = list(_DECISION_DATE_RE.finditer(mm))
+        
+        for i, match in enumerate(matches):
+            timestamp = match.group(1).decode('ascii')
+            trade_date = match.group(2).decode('ascii')
+            
+            # 提取该日期的决策内容（与文本模式读取一致，统一换行符）
+            start_pos = match.end()
+            end_pos = matches[i + 1].start() if i + 1 < len(matches) else len(mm)
+            decision_content = mm[start_pos:end_pos].decode('utf-8').replace('\r\n', '\n').strip()
+            
+            # 提取关键信息
+            sections = self._split_sections(decision_content)
+            decisions.append({
+                'timestamp': timestamp,
+                'trade_date': trade_date,
+                'content': decision_content,
+                'market_analysis': sections.get('市场分析', ''),
+                'decision_reason': sections.get('决策理由', '')
+            })
+        
+        return decisions
+    
+    def _split_sections(self, content: str) -> Dict[str, str]:
+        """一次扫描把决策内容按【章节】拆分为 {章节名: 内容}，同名章节取第一个"""
+        parts = _SECTION_SPLIT_RE.split(content)
+        sections = {}
+        for i in range(1, len(parts), 2):
+            if parts[i] not in sections:
+                sections[parts[i]] = parts[i + 1].split('【', 1)[0].strip()
+        return sections
     
     def get_stock_profits(self, portfolio_file: str) -> Dict[str, float]:
         """
@@ -380,29 +397,42 @@ class AgentDataLoader:
             return {}
         
         try:
+            # 一次取出NumPy数组，之后只做标量运算
+            assets = df['总资产'].to_numpy(dtype=np.float64)
+            returns = df['收益率'].to_numpy(dtype=np.float64)
+            dates = df['日期']
+            n = len(assets)
+            
+            first_asset = assets[0]
+            last_asset = assets[-1]
+            max_asset = assets.max()
+            min_asset = assets.min()
+            
             stats = {
-                '起始日期': df['日期'].iloc[0].strftime('%Y-%m-%d'),
-                '结束日期': df['日期'].iloc[-1].strftime('%Y-%m-%d'),
-                '交易天数': len(df),
-                '初始资金': df['总资产'].iloc[0],
-                '最终资产': df['总资产'].iloc[-1],
-                '总收益': df['总资产'].iloc[-1] - df['总资产'].iloc[0],
-                '总收益率': df['收益率'].iloc[-1],
-                '最大资产': df['总资产'].max(),
-                '最小资产': df['总资产'].min(),
-                '最大收益率': df['收益率'].max(),
-                '最大回撤': (df['总资产'].max() - df['总资产'].min()) / df['总资产'].max() * 100,
-                '平均日收益率': df['收益率'].diff().mean(),
+                '起始日期': dates.iat[0].strftime('%Y-%m-%d'),
+                '结束日期': dates.iat[-1].strftime('%Y-%m-%d'),
+                '交易天数': n,
+                '初始资金': first_asset,
+                '最终资产': last_asset,
+                '总收益': last_asset - first_asset,
+                '总收益率': returns[-1],
+                '最大资产': max_asset,
+                '最小资产': min_asset,
+                '最大收益率': returns.max(),
+                '最大回撤': (max_asset - min_asset) / max_asset * 100,
+                '平均日收益率': np.diff(returns).mean() if n > 1 else np.nan,
             }
             
             # 计算夏普比率等高级指标
-            if len(df) > 1:
-                daily_returns = df['总资产'].pct_change().dropna()
-                if len(daily_returns) > 0 and daily_returns.std() != 0:
-                    stats['收益波动率'] = daily_returns.std() * 100
+            if n > 1:
+                daily_returns = np.diff(assets) / assets[:-1]
+                # 与pandas一致使用样本标准差（ddof=1），单个样本时为NaN
+                std = daily_returns.std(ddof=1) if n > 2 else np.nan
+                if std != 0:
+                    stats['收益波动率'] = std * 100
                     # 假设无风险利率为3%年化
                     risk_free_rate = 0.03 / 252  # 日无风险利率
-                    stats['夏普比率'] = (daily_returns.mean() - risk_free_rate) / daily_returns.std() * (252 ** 0.5) if daily_returns.std() > 0 else 0
+                    stats['夏普比率'] = (daily_returns.mean() - risk_free_rate) / std * (252 ** 0.5) if std > 0 else 0
             
             return stats
         except Exception as e:
@@ -6,9 +6,14 @@ import sys
 import os
 import threading
 import time
+import traceback
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from typing import Dict, Any, List, Optional
-from queue import Queue
 
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,6 +24,30 @@ from Agents_Experience.core.data_provider import MarketDataProvider
 from Agents_Experience.core.tools import TradingTools
 from Agents_Experience.utils.logger import DualLogger
 from src.stock_app.portfolio import Portfolio
+import config as main_config
+
+
+# 内存中保留的日志消息条数上限
+_MAX_LOG_MESSAGES = 1000
+
+# 内存中保留的每日快照和交易记录条数上限（可通过config['snapshot_cap']调整）
+_DEFAULT_HISTORY_CAP = 5000
+
+# 每日快照的列（列式存储，每列一个NumPy数组）
+_SNAPSHOT_DTYPES = {
+    'date': 'U10',
+    'cash': np.float64,
+    'market_value': np.float64,
+    'total_asset': np.float64,
+    'profit': np.float64,
+    'profit_rate': np.float64,
+}
+
+# 快照列式存储的初始容量（初始化时按交易日数预分配，不足时按2倍扩容）
+_SNAPSHOT_INITIAL_CAPACITY = 16
+
+# 每个交易日之间的默认间隔（毫秒），避免UI更新过快
+_DEFAULT_UI_TICK_MS = 500
 
 
 class AgentRunner:
@@ -35,26 +64,47 @@ class AgentRunner:
         self.config = config
         self.db_path = db_path
         
+        # 交易费率（可通过配置覆盖）
+        self._commission_rate = config.get('commission_rate', main_config.COMMISSION_RATE)
+        self._commission_min = config.get('commission_min', main_config.MIN_COMMISSION)
+        self._stamp_rate = config.get('stamp_rate', main_config.STAMP_TAX_RATE)
+        
         # 运行状态
         self.is_running = False
         self.is_paused = False
         self.should_stop = False
+        self._pause_event = threading.Event()  # 置位表示运行中，清除表示暂停
+        self._pause_event.set()
         
         # Agent和模拟器
         self.agent = None
         self.portfolio = None
         self.data_provider = None
         self.tools = None
+        self.stock_name_map = {}  # {股票代码: 股票名称}
+        self._last_positions_snapshot = {}  # 上一交易日传给Agent的持仓信息
+        self._price_cache = {}  # 当日单独查询的价格信息 {股票代码: 价格信息或None}，每天开始时清空
         
         # 交易日列表
         self.trading_dates = []
         self.current_date_index = 0
+        self._trading_dates_cache = {}  # {(开始日期, 结束日期, 股票代码): 交易日列表}
         
         # 实时数据
-        self.status_queue = Queue()  # 状态更新队列
-        self.log_messages = []  # 日志消息
-        self.daily_snapshots = []  # 每日快照
-        self.trade_log = []  # 交易记录
+        self.status_state = {}  # 待取走的状态更新（每个键只保留最新值）
+        self.status_lock = threading.Lock()
+        self.log_messages = deque(maxlen=_MAX_LOG_MESSAGES)  # 日志消息（超出上限时自动丢弃最早的）
+        self._log_time = (-1, '')  # 最近一次格式化的时间戳 (秒, HH:MM:SS)，整体替换保证线程间一致
+        # 每日快照（列式存储，前self._snapshot_count行有效），超过上限时丢弃最早的快照
+        self._snapshot_cap = config.get('snapshot_cap', _DEFAULT_HISTORY_CAP)
+        self._snapshot_lock = threading.Lock()  # 运行线程写入、UI线程读取
+        self._snapshots = {}
+        self._snapshot_count = 0
+        self._snapshot_total = 0  # 累计记录的快照数（含已丢弃的）
+        self._reset_snapshots(_SNAPSHOT_INITIAL_CAPACITY)
+        
+        # 交易记录，超过上限时丢弃最早的记录
+        self.trade_log = deque(maxlen=self._snapshot_cap)
         
         # 运行线程
         self.run_thread = None
@@ -70,6 +120,13 @@ class AgentRunner:
             是否初始化成功
         """
         try:
+            # 初始化数据提供者
+            self.data_provider = MarketDataProvider(self.db_path)
+            
+            # 一次查询股票池的名称，供提示词和买入记录使用
+            pool_names = self.data_provider.get_stock_names(self.config['stock_pool'])
+            self.stock_name_map = {symbol: pool_names.get(symbol, symbol) for symbol in self.config['stock_pool']}
+            
             # 创建Agent
             self.agent = QwenAgent(
                 agent_id="realtime_agent",
@@ -79,15 +136,14 @@ class AgentRunner:
                 model=self.config['model'],
                 temperature=self.config['temperature'],
                 stock_pool=self.config['stock_pool'],
-                stock_names={},  # 可以添加股票名称映射
+                stock_names=self.stock_name_map,
                 api_call_interval=self.config['api_call_interval']
             )
             
             # 自定义系统提示词
             self.agent.system_prompt = self.config['system_prompt']
             
-            # 初始化数据提供者和工具
-            self.data_provider = MarketDataProvider(self.db_path)
+            # 初始化工具
             self.tools = TradingTools(self.data_provider, self.config['stock_pool'])
             
             # 初始化投资组合
@@ -104,6 +160,9 @@ class AgentRunner:
                 self.add_log("错误：未找到交易日数据", "error")
                 return False
             
+            # 按交易日数预分配快照存储
+            self._reset_snapshots(len(self.trading_dates))
+            
             # 初始化双日志系统 - 使用真实模型名
             model_name = self.config['model'].replace(':', '_').replace('/', '_')  # 清理特殊字符
             self.dual_logger = DualLogger(f"agent_{model_name}")
@@ -113,28 +172,28 @@ class AgentRunner:
             
         except Exception as e:
             self.add_log(f"初始化失败: {e}", "error")
-            import traceback
             traceback.print_exc()
             return False
     
     def _get_trading_dates(self) -> List[str]:
         """获取交易日列表"""
         try:
-            # 使用股票池中的第一只股票获取交易日
-            dates = self.data_provider.db.get_available_dates(self.config['stock_pool'][0])
+            # 起止日期统一为YYYY-MM-DD（与数据库日期格式一致，可以直接按字符串比较）
+            start_date = datetime.strptime(self.config['start_date'], '%Y-%m-%d').strftime('%Y-%m-%d')
+            end_date = datetime.strptime(self.config['end_date'], '%Y-%m-%d').strftime('%Y-%m-%d')
             
-            # 过滤日期范围
-            from datetime import datetime
-            start_dt = datetime.strptime(self.config['start_date'], '%Y-%m-%d')
-            end_dt = datetime.strptime(self.config['end_date'], '%Y-%m-%d')
+            # 使用股票池中的第一只股票获取交易日
+            cache_key = (start_date, end_date, self.config['stock_pool'][0])
+            cached = self._trading_dates_cache.get(cache_key)
+            if cached is not None:
+                return list(cached)
             
-            trading_dates = []
-            for date_str in dates:
-                dt = datetime.strptime(date_str, '%Y-%m-%d')
-                if start_dt <= dt <= end_dt:
-                    trading_dates.append(date_str)
+            # 数据库按日期升序返回，二分查找截取日期范围
+            dates = self.data_provider.db.get_available_dates(cache_key[2])
+            trading_dates = dates[bisect_left(dates, start_date):bisect_right(dates, end_date)]
             
-            return trading_dates
+            self._trading_dates_cache[cache_key] = trading_dates
+            return list(trading_dates)
         except Exception as e:
             self.add_log(f"获取交易日失败: {e}", "error")
             return []
@@ -148,6 +207,7 @@ class AgentRunner:
         self.is_running = True
         self.should_stop = False
         self.is_paused = False
+        self._pause_event.set()
         
         # 在新线程中运行
         self.run_thread = threading.Thread(target=self._run_loop, daemon=True)
@@ -161,6 +221,7 @@ class AgentRunner:
             return
         
         self.is_paused = True
+        self._pause_event.clear()
         self.add_log("Agent已暂停", "info")
     
     def resume(self):
@@ -169,6 +230,7 @@ class AgentRunner:
             return
         
         self.is_paused = False
+        self._pause_event.set()
         self.add_log("Agent继续运行", "info")
     
     def stop(self):
@@ -176,6 +238,7 @@ class AgentRunner:
         self.should_stop = True
         self.is_running = False
         self.is_paused = False
+        self._pause_event.set()  # 唤醒可能处于暂停等待中的运行线程
         self.add_log("Agent已终止", "info")
         
         # 关闭日志文件
@@ -185,33 +248,45 @@ class AgentRunner:
     
     def _run_loop(self):
         """运行循环（在独立线程中）"""
+        ui_tick = self.config.get('ui_tick_ms', _DEFAULT_UI_TICK_MS) / 1000
         try:
-            while self.current_date_index < len(self.trading_dates) and not self.should_stop:
-                # 检查是否暂停
-                while self.is_paused and not self.should_stop:
-                    time.sleep(0.5)
-                
-                if self.should_stop:
-                    break
-                
-                current_date = self.trading_dates[self.current_date_index]
-                
-                # 更新进度
-                progress = (self.current_date_index + 1) / len(self.trading_dates) * 100
-                self.update_status('progress', progress)
-                self.update_status('current_date', current_date)
-                self.update_status('current_index', self.current_date_index + 1)
-                
-                self.add_log(f"[{self.current_date_index + 1}/{len(self.trading_dates)}] {current_date}", "info")
-                
-                # 执行一天的交易
-                self._execute_day(current_date)
-                
-                # 更新索引
-                self.current_date_index += 1
-                
-                # 短暂延迟，避免UI更新过快
-                time.sleep(0.5)
+            # 后台线程预取下一交易日股票池的收盘价，与当日Agent决策（网络请求）并行
+            with ThreadPoolExecutor(max_workers=1) as io_pool:
+                next_prices = None
+                while self.current_date_index < len(self.trading_dates) and not self.should_stop:
+                    # 暂停时阻塞等待，resume()或stop()时立即唤醒
+                    self._pause_event.wait()
+                    
+                    if self.should_stop:
+                        break
+                    
+                    current_date = self.trading_dates[self.current_date_index]
+                    
+                    # 取出上一轮预取的当日价格，并提交下一交易日的预取
+                    prefetched = self._take_prefetched(next_prices)
+                    next_prices = None
+                    if self.current_date_index + 1 < len(self.trading_dates):
+                        next_prices = io_pool.submit(
+                            self._prefetch_prices, self.trading_dates[self.current_date_index + 1]
+                        )
+                    
+                    # 更新进度
+                    progress = (self.current_date_index + 1) / len(self.trading_dates) * 100
+                    self.update_status('progress', progress)
+                    self.update_status('current_date', current_date)
+                    self.update_status('current_index', self.current_date_index + 1)
+                    
+                    self.add_log(f"[{self.current_date_index + 1}/{len(self.trading_dates)}] {current_date}", "info")
+                    
+                    # 执行一天的交易
+                    self._execute_day(current_date, prefetched)
+                    
+                    # 更新索引
+                    self.current_date_index += 1
+                    
+                    # 短暂延迟，避免UI更新过快（config['ui_tick_ms']为0时不等待）
+                    if ui_tick > 0:
+                        time.sleep(ui_tick)
             
             # 运行完成
             if not self.should_stop:
@@ -226,15 +301,29 @@ class AgentRunner:
             
         except Exception as e:
             self.add_log(f"运行错误: {e}", "error")
-            import traceback
             traceback.print_exc()
             self.is_running = False
     
-    def _execute_day(self, current_date: str):
+    def _prefetch_prices(self, date: str) -> Dict[str, float]:
+        """查询股票池在指定交易日的收盘价（在后台线程中执行）"""
+        return self.data_provider.get_prices_on_date(self.config['stock_pool'], date)
+    
+    def _take_prefetched(self, future: Optional[Future]) -> Optional[Dict[str, float]]:
+        """取出预取结果，预取失败时返回None（改为当日直接查询）"""
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            self.add_log(f"预取价格失败: {e}", "warning")
+            return None
+    
+    def _execute_day(self, current_date: str, prefetched: Optional[Dict[str, float]] = None):
         """执行一天的交易"""
+        self._price_cache.clear()
         try:
-            # 更新持仓价格
-            self._update_portfolio_prices(current_date)
+            # 更新持仓价格（同时取得当日股票池的收盘价，供当天的买卖复用）
+            day_prices = self._update_portfolio_prices(current_date, prefetched)
             
             # Agent做决策
             decision = self._agent_decide(current_date)
@@ -264,7 +353,7 @@ class AgentRunner:
                     self.add_log(f"理由: {reasoning}", "info")
                 
                 # 执行交易
-                self._execute_actions(current_date, decision['actions'])
+                self._execute_actions(current_date, decision['actions'], day_prices)
                 
                 self.add_log(f"决策: {len(decision['actions'])}个操作", "info")
             else:
@@ -292,14 +381,43 @@ class AgentRunner:
         except Exception as e:
             self.add_log(f"执行交易失败: {e}", "error")
     
-    def _update_portfolio_prices(self, current_date: str):
-        """更新持仓价格"""
-        for symbol in list(self.portfolio.positions.keys()):
-            price_info = self.data_provider.get_stock_price_on_date(symbol, current_date)
-            if price_info:
-                self.portfolio.update_price(symbol, price_info['close'])
+    def _update_portfolio_prices(self, current_date: str,
+                                 prefetched: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        更新持仓价格
+        
+        一次查询取得股票池和当前持仓在当日的收盘价
+        
+        Args:
+            current_date: 当前交易日
+            prefetched: 后台预取的股票池当日收盘价，提供时只需再查询股票池外的持仓
+        
+        Returns:
+            {股票代码: 当日收盘价}
+        """
+        symbols = list(dict.fromkeys([*self.config['stock_pool'], *self.portfolio.positions]))
+        if prefetched is None:
+            day_prices = self.data_provider.get_prices_on_date(symbols, current_date)
+        else:
+            day_prices = dict(prefetched)
+            pool = set(self.config['stock_pool'])
+            missing = [symbol for symbol in symbols if symbol not in pool]
+            if missing:
+                day_prices.update(self.data_provider.get_prices_on_date(missing, current_date))
+        self.portfolio.update_prices(day_prices)
         
         self.portfolio.current_date = current_date
+        return day_prices
+    
+    def _get_close_price(self, symbol: str, date: str, day_prices: Optional[Dict[str, float]]) -> Optional[float]:
+        """获取收盘价，优先使用当日已批量查询的价格"""
+        if day_prices is not None and symbol in day_prices:
+            return day_prices[symbol]
+        # 当日已查询过的股票（包括无数据的）不再重复查询
+        if symbol not in self._price_cache:
+            self._price_cache[symbol] = self.data_provider.get_stock_price_on_date(symbol, date)
+        price_info = self._price_cache[symbol]
+        return price_info['close'] if price_info else None
     
     def _agent_decide(self, current_date: str) -> Dict:
         """Agent做决策"""
@@ -310,12 +428,7 @@ class AgentRunner:
             'market_value': summary['market_value'],
             'total_asset': summary['total_asset'],
             'total_profit_rate': summary['total_profit_rate'],
-            'positions': {symbol: {
-                'quantity': pos.quantity,
-                'avg_cost': pos.avg_cost,
-                'current_price': pos.current_price,
-                'profit_rate': pos.profit_rate
-            } for symbol, pos in self.portfolio.positions.items()}
+            'positions': self._positions_snapshot()
         }
         
         try:
@@ -330,7 +443,30 @@ class AgentRunner:
             self.add_log(f"决策异常: {e}", "error")
             return {'success': False, 'reasoning': str(e), 'actions': []}
     
-    def _execute_actions(self, current_date: str, actions: List[Dict]):
+    def _positions_snapshot(self) -> Dict[str, Dict]:
+        """生成持仓快照，数量、成本价、当前价都未变化的持仓沿用上次的字典"""
+        last = self._last_positions_snapshot
+        snapshot = {}
+        for symbol, pos in self.portfolio.positions.items():
+            quantity = pos.quantity
+            avg_cost = pos.avg_cost
+            current_price = pos.current_price
+            entry = last.get(symbol)
+            if (entry is None or entry['quantity'] != quantity or entry['avg_cost'] != avg_cost
+                    or entry['current_price'] != current_price):
+                entry = {
+                    'quantity': quantity,
+                    'avg_cost': avg_cost,
+                    'current_price': current_price,
+                    'profit_rate': pos.profit_rate
+                }
+            snapshot[symbol] = entry
+        
+        self._last_positions_snapshot = snapshot
+        return snapshot
+    
+    def _execute_actions(self, current_date: str, actions: List[Dict],
+                         day_prices: Optional[Dict[str, float]] = None):
         """执行交易动作"""
         for action in actions:
             action_type = action.get('type')
@@ -338,33 +474,32 @@ class AgentRunner:
             quantity = action.get('quantity')
             
             if action_type == 'buy':
-                success = self._execute_buy(current_date, symbol, quantity)
+                success = self._execute_buy(current_date, symbol, quantity, day_prices)
                 if success:
                     self.add_log(f"✓ 买入: {symbol} {quantity}股", "success")
                 else:
                     self.add_log(f"✗ 买入失败: {symbol}", "warning")
             
             elif action_type == 'sell':
-                success = self._execute_sell(current_date, symbol, quantity)
+                success = self._execute_sell(current_date, symbol, quantity, day_prices)
                 if success:
                     self.add_log(f"✓ 卖出: {symbol} {quantity}股", "success")
                 else:
                     self.add_log(f"✗ 卖出失败: {symbol}", "warning")
     
-    def _execute_buy(self, date: str, symbol: str, quantity: int) -> bool:
+    def _execute_buy(self, date: str, symbol: str, quantity: int,
+                     day_prices: Optional[Dict[str, float]] = None) -> bool:
         """执行买入"""
         try:
-            price_info = self.data_provider.get_stock_price_on_date(symbol, date)
-            if not price_info:
+            price = self._get_close_price(symbol, date, day_prices)
+            if price is None:
                 return False
             
-            price = price_info['close']
-            stock_info = self.data_provider.get_stock_info(symbol)
-            stock_name = stock_info['name'] if stock_info else symbol
+            stock_name = self._get_stock_name(symbol)
             
             # 计算成本
             trade_amount = price * quantity
-            commission = max(trade_amount * 0.0003, 5)
+            commission = max(trade_amount * self._commission_rate, self._commission_min)
             total_cost = trade_amount + commission
             
             if self.portfolio.cash < total_cost:
@@ -390,24 +525,32 @@ class AgentRunner:
         except Exception as e:
             return False
     
-    def _execute_sell(self, date: str, symbol: str, quantity: int) -> bool:
+    def _get_stock_name(self, symbol: str) -> str:
+        """获取股票名称，股票池外的股票查询一次后记入映射"""
+        stock_name = self.stock_name_map.get(symbol)
+        if stock_name is None:
+            stock_info = self.data_provider.get_stock_info(symbol)
+            stock_name = self.stock_name_map[symbol] = stock_info['name'] if stock_info else symbol
+        return stock_name
+    
+    def _execute_sell(self, date: str, symbol: str, quantity: int,
+                      day_prices: Optional[Dict[str, float]] = None) -> bool:
         """执行卖出"""
         try:
             position = self.portfolio.get_position(symbol)
             if not position or position.quantity < quantity:
                 return False
             
-            price_info = self.data_provider.get_stock_price_on_date(symbol, date)
-            if not price_info:
+            price = self._get_close_price(symbol, date, day_prices)
+            if price is None:
                 return False
             
-            price = price_info['close']
             stock_name = position.name
             
             # 计算收入
             trade_amount = price * quantity
-            commission = max(trade_amount * 0.0003, 5)
-            stamp_tax = trade_amount * 0.001
+            commission = max(trade_amount * self._commission_rate, self._commission_min)
+            stamp_tax = trade_amount * self._stamp_rate
             total_revenue = trade_amount - commission - stamp_tax
             
             # 执行交易
@@ -431,47 +574,102 @@ class AgentRunner:
         except Exception as e:
             return False
     
+    def _reset_snapshots(self, capacity: int):
+        """清空并按指定容量（不超过上限）重新分配快照存储"""
+        capacity = max(min(capacity, self._snapshot_cap), 1)
+        with self._snapshot_lock:
+            self._snapshots = {col: np.empty(capacity, dtype=dtype) for col, dtype in _SNAPSHOT_DTYPES.items()}
+            self._snapshot_count = 0
+            self._snapshot_total = 0
+    
+    def _make_room_for_snapshot(self):
+        """存储已满时扩容；已达上限时整体前移一行，丢弃最早的快照（调用方持有锁）"""
+        n = self._snapshot_count
+        capacity = len(self._snapshots['date'])
+        if capacity < self._snapshot_cap:
+            capacity = min(max(capacity * 2, _SNAPSHOT_INITIAL_CAPACITY), self._snapshot_cap)
+            for col, old in self._snapshots.items():
+                new = np.empty(capacity, dtype=old.dtype)
+                new[:n] = old[:n]
+                self._snapshots[col] = new
+        else:
+            for arr in self._snapshots.values():
+                arr[:-1] = arr[1:]
+            self._snapshot_count = n - 1
+    
     def _take_snapshot(self, date: str):
         """记录每日快照"""
         summary = self.portfolio.get_summary()
         
-        self.daily_snapshots.append({
-            'date': date,
-            'cash': summary['cash'],
-            'market_value': summary['market_value'],
-            'total_asset': summary['total_asset'],
-            'profit': summary['total_profit'],
-            'profit_rate': summary['total_profit_rate']
-        })
+        with self._snapshot_lock:
+            if self._snapshot_count == len(self._snapshots['date']):
+                self._make_room_for_snapshot()
+            
+            idx = self._snapshot_count
+            snapshots = self._snapshots
+            snapshots['date'][idx] = date
+            snapshots['cash'][idx] = summary['cash']
+            snapshots['market_value'][idx] = summary['market_value']
+            snapshots['total_asset'][idx] = summary['total_asset']
+            snapshots['profit'][idx] = summary['total_profit']
+            snapshots['profit_rate'][idx] = summary['total_profit_rate']
+            self._snapshot_count = idx + 1
+            self._snapshot_total += 1
+    
+    @property
+    def daily_snapshots(self) -> Dict[str, np.ndarray]:
+        """已记录的每日快照，{列名: NumPy数组副本}"""
+        with self._snapshot_lock:
+            n = self._snapshot_count
+            return {col: arr[:n].copy() for col, arr in self._snapshots.items()}
+    
+    def get_snapshots_since(self, index: int) -> Dict[str, List]:
+        """
+        获取第index条（从0开始累计计数）之后的每日快照，供UI增量拉取
+        
+        Args:
+            index: 调用方已取得的快照数量
+            
+        Returns:
+            {列名: 新增快照的值列表}，各列长度一致（早于内存上限的快照已被丢弃，不再返回）
+        """
+        with self._snapshot_lock:
+            n = self._snapshot_count
+            dropped = self._snapshot_total - n
+            start = min(max(index - dropped, 0), n)
+            return {col: arr[start:n].tolist() for col, arr in self._snapshots.items()}
     
     def add_log(self, message: str, level: str = "info"):
         """添加日志消息"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
+        # 时间戳精确到秒，同一秒内复用已格式化的字符串
+        now = int(time.time())
+        last_sec, timestamp = self._log_time
+        if now != last_sec:
+            timestamp = time.strftime('%H:%M:%S', time.localtime(now))
+            self._log_time = (now, timestamp)
         log_entry = {
             'timestamp': timestamp,
             'message': message,
             'level': level
         }
         self.log_messages.append(log_entry)
-        
-        # 限制日志数量
-        if len(self.log_messages) > 1000:
-            self.log_messages = self.log_messages[-500:]
     
     def update_status(self, key: str, value: Any):
-        """更新状态"""
-        self.status_queue.put({'key': key, 'value': value})
+        """更新状态（同一键未被取走的旧值直接被覆盖）"""
+        with self.status_lock:
+            self.status_state[key] = value
     
     def get_status_updates(self) -> List[Dict]:
-        """获取所有待处理的状态更新"""
-        updates = []
-        while not self.status_queue.empty():
-            updates.append(self.status_queue.get())
-        return updates
+        """获取所有待处理的状态更新（每个键只返回最新值）"""
+        with self.status_lock:
+            pending = list(self.status_state.items())
+            self.status_state.clear()
+        return [{'key': key, 'value': value} for key, value in pending]
     
     def get_current_state(self) -> Dict[str, Any]:
         """获取当前状态"""
         summary = self.portfolio.get_summary() if self.portfolio else {}
+        snapshots = self.get_snapshots_since(0)
         
         return {
             'is_running': self.is_running,
@@ -486,7 +684,7 @@ class AgentRunner:
                 'total_asset': summary.get('total_asset', 0),
                 'profit_rate': summary.get('total_profit_rate', 0)
             },
-            'daily_snapshots': self.daily_snapshots,
-            'trade_log': self.trade_log,
-            'log_messages': self.log_messages[-50:]  # 最近50条日志
+            'daily_snapshots': snapshots if snapshots['date'] else {},
+            'trade_log': list(self.trade_log),
+            'log_messages': list(islice(self.log_messages, max(0, len(self.log_messages) - 50), None))  # 最近50条日志
         }
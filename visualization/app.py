@@ -30,10 +30,10 @@ from visualization.agent_data_loader import AgentDataLoader
 from visualization.agent_charts import (
     create_portfolio_value_chart, create_return_rate_chart,
     create_cash_position_chart, create_combined_overview_chart,
-    create_transactions_timeline, create_holdings_pie_chart,
-    create_daily_return_distribution, create_portfolio_value_chart_with_index,
-    create_stock_profit_pie_chart, create_stock_pool_comparison_chart,
-    create_stock_performance_table
+    create_transactions_timeline, create_daily_return_distribution,
+    create_portfolio_value_chart_with_index, create_stock_profit_pie_chart,
+    create_stock_pool_comparison_chart, create_stock_performance_table,
+    parse_holdings_table, create_holdings_pie_chart_from_table
 )
 from visualization.agent_config_manager import AgentConfigManager
 from visualization.agent_runner import AgentRunner
@@ -128,6 +128,43 @@ def get_cached_index_data(index_symbol, start_date, end_date):
     pure_symbol = index_symbol.split('.')[-1] if '.' in index_symbol else index_symbol
     return data_loader.get_index_data(pure_symbol, start_date, end_date)
 
+# Agent结果图表缓存：数据不变时Streamlit重跑直接复用图表，跳过Plotly图表构建
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_overview_chart(portfolio_df, agent_name, index_data_dict=None):
+    """缓存综合概览图表"""
+    if index_data_dict:
+        return create_combined_overview_chart(portfolio_df, agent_name, index_data_dict, COMMON_INDICES)
+    return create_combined_overview_chart(portfolio_df, agent_name)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_portfolio_value_chart(portfolio_df, index_data_dict=None):
+    """缓存总资产曲线图表（有指数数据时为指数对比图）"""
+    if index_data_dict:
+        return create_portfolio_value_chart_with_index(
+            portfolio_df, index_data_dict, COMMON_INDICES, "投资组合 vs 指数对比"
+        )
+    return create_portfolio_value_chart(portfolio_df)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_return_rate_chart(portfolio_df):
+    """缓存收益率变化图表"""
+    return create_return_rate_chart(portfolio_df)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_cash_position_chart(portfolio_df):
+    """缓存资产配置图表"""
+    return create_cash_position_chart(portfolio_df)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_transactions_timeline(transactions_df):
+    """缓存交易操作时间线图表"""
+    return create_transactions_timeline(transactions_df)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_holdings_table(portfolio_df):
+    """缓存批量解析的持仓表（所有日期的持仓详情一次解析，按行号索引）"""
+    return parse_holdings_table(portfolio_df['持仓详情'].reset_index(drop=True))
+
 
 def main():
     """主函数"""
@@ -260,8 +297,8 @@ def show_stock_detail_page():
             return
         
         # 股票选择下拉框
-        stock_options = {f"{row['symbol']} - {row['name']}": row['symbol'] 
-                        for _, row in stocks_df.iterrows()}
+        stock_options = {f"{symbol} - {name}": symbol 
+                        for symbol, name in stocks_df[['symbol', 'name']].itertuples(index=False, name=None)}
         
         selected_stock = st.selectbox(
             "选择股票",
@@ -435,8 +472,8 @@ def show_comparison_page():
         return
     
     # 创建股票选项
-    stock_options = {f"{row['symbol']} - {row['name']}": row['symbol'] 
-                    for _, row in stocks_df.iterrows()}
+    stock_options = {f"{symbol} - {name}": symbol 
+                    for symbol, name in stocks_df[['symbol', 'name']].itertuples(index=False, name=None)}
     
     # 多选
     selected_stocks = st.multiselect(
@@ -553,8 +590,8 @@ def show_indicators_page():
         st.warning("暂无股票数据")
         return
     
-    stock_options = {f"{row['symbol']} - {row['name']}": row['symbol'] 
-                    for _, row in stocks_df.iterrows()}
+    stock_options = {f"{symbol} - {name}": symbol 
+                    for symbol, name in stocks_df[['symbol', 'name']].itertuples(index=False, name=None)}
     
     col1, col2 = st.columns([2, 1])
     
@@ -670,8 +707,8 @@ def show_statistics_page():
         st.warning("暂无股票数据")
         return
     
-    stock_options = {f"{row['symbol']} - {row['name']}": row['symbol'] 
-                    for _, row in stocks_df.iterrows()}
+    stock_options = {f"{symbol} - {name}": symbol 
+                    for symbol, name in stocks_df[['symbol', 'name']].itertuples(index=False, name=None)}
     
     selected_stock = st.selectbox("选择股票", options=list(stock_options.keys()))
     if not selected_stock:
@@ -1292,15 +1329,7 @@ def show_ai_agent_page():
                         index_data_dict[index_symbol] = index_df
         
         # 创建图表
-        if index_data_dict:
-            fig = create_combined_overview_chart(
-                portfolio_df, 
-                selected_log['agent_name'],
-                index_data_dict,
-                COMMON_INDICES
-            )
-        else:
-            fig = create_combined_overview_chart(portfolio_df, selected_log['agent_name'])
+        fig = get_cached_overview_chart(portfolio_df, selected_log['agent_name'], index_data_dict)
         
         st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
@@ -1321,31 +1350,23 @@ def show_ai_agent_page():
                         index_data_dict[index_symbol] = index_df
         
         # 根据是否有指数数据选择不同的图表
-        if index_data_dict:
-            fig = create_portfolio_value_chart_with_index(
-                portfolio_df, 
-                index_data_dict, 
-                COMMON_INDICES,
-                "投资组合 vs 指数对比"
-            )
-        else:
-            fig = create_portfolio_value_chart(portfolio_df)
+        fig = get_cached_portfolio_value_chart(portfolio_df, index_data_dict)
         
         st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
     elif chart_view == "📊 收益率变化":
         st.subheader("收益率变化")
-        fig = create_return_rate_chart(portfolio_df)
+        fig = get_cached_return_rate_chart(portfolio_df)
         st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
     elif chart_view == "💼 资产配置":
         st.subheader("现金与持仓市值分布")
-        fig = create_cash_position_chart(portfolio_df)
+        fig = get_cached_cash_position_chart(portfolio_df)
         st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
     elif chart_view == "🔄 交易操作":
         st.subheader("交易操作时间线")
-        fig = create_transactions_timeline(transactions_df)
+        fig = get_cached_transactions_timeline(transactions_df)
         st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
         # 显示交易记录表格
@@ -1400,10 +1421,10 @@ def show_ai_agent_page():
         )
         
         # 获取该日期的持仓详情
-        date_data = portfolio_df[portfolio_df['日期'].dt.strftime('%Y-%m-%d') == selected_date].iloc[0]
-        holdings_str = date_data['持仓详情']
+        row_pos = int((portfolio_df['日期'].dt.strftime('%Y-%m-%d') == selected_date).to_numpy().argmax())
+        holdings_str = portfolio_df['持仓详情'].iloc[row_pos]
         
-        fig = create_holdings_pie_chart(holdings_str, selected_date)
+        fig = create_holdings_pie_chart_from_table(get_cached_holdings_table(portfolio_df), row_pos, selected_date)
         st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
         # 显示详细持仓信息
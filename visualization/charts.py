@@ -69,8 +69,8 @@ def create_volume_chart(df: pd.DataFrame, title: str = "成交量") -> go.Figure
         title: 图表标题
     """
     # 判断涨跌颜色
-    colors = ['red' if row['close'] >= row['open'] else 'green' 
-              for _, row in df.iterrows()]
+    colors = ['red' if close >= open_ else 'green' 
+              for close, open_ in df[['close', 'open']].itertuples(index=False, name=None)]
     
     fig = go.Figure()
     
@@ -370,8 +370,8 @@ def create_combined_chart(df: pd.DataFrame, symbol: str, name: str = "") -> go.F
             ), row=1, col=1)
     
     # 成交量
-    colors = ['red' if row['close'] >= row['open'] else 'green' 
-              for _, row in df.iterrows()]
+    colors = ['red' if close >= open_ else 'green' 
+              for close, open_ in df[['close', 'open']].itertuples(index=False, name=None)]
     fig.add_trace(go.Bar(
         x=df['date'],
         y=df['volume'],
@@ -13,6 +13,9 @@ from functools import lru_cache
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from src.stock_app.database import (
+    is_price_integer, is_trade_date_integer, price_sql, trade_date_sql, trade_date_to_int
+)
 
 
 class StockDataLoader:
@@ -21,11 +24,29 @@ class StockDataLoader:
     def __init__(self, db_path: str = config.DATABASE_PATH):
         self.db_path = db_path
         self._cache = {}  # 简单的内存缓存
-        
+        self._trade_date_is_int = None
+        self._price_is_int = None
+    
     def get_connection(self):
         """获取数据库连接（支持超时和只读优化）"""
         return sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
     
+    def _is_int_date(self, conn: sqlite3.Connection) -> bool:
+        """trade_date是否以整数YYYYMMDD存储（首次查询时检测一次）"""
+        if self._trade_date_is_int is None:
+            self._trade_date_is_int = is_trade_date_integer(conn)
+        return self._trade_date_is_int
+    
+    def _price(self, conn: sqlite3.Connection, expr: str) -> str:
+        """价格输出为“元”的SQL表达式（价格以整数“分”存储时换算）"""
+        if self._price_is_int is None:
+            self._price_is_int = is_price_integer(conn)
+        return price_sql(expr, self._price_is_int)
+    
+    def _date_param(self, conn: sqlite3.Connection, date: str):
+        """将查询日期转换为与trade_date存储格式一致的参数"""
+        return trade_date_to_int(date) if self._is_int_date(conn) else date
+    
     def get_all_stocks(self, limit: Optional[int] = None, offset: int = 0) -> pd.DataFrame:
         """
         获取所有股票列表（优化版本，支持分页）
@@ -37,17 +58,18 @@ class StockDataLoader:
         cache_key = f'all_stocks_{limit}_{offset}'
         if cache_key in self._cache:
             return self._cache[cache_key].copy()
-            
+        
         with self.get_connection() as conn:
+            is_int = self._is_int_date(conn)
             # 使用子查询优化性能
-            query = '''
+            query = f'''
                 SELECT 
                     si.symbol, 
                     si.name, 
                     si.market_type as market,
                     COALESCE(stats.data_count, 0) as data_count,
-                    stats.start_date,
-                    stats.end_date
+                    {trade_date_sql('stats.start_date', is_int)} as start_date,
+                    {trade_date_sql('stats.end_date', is_int)} as end_date
                 FROM stock_info si
                 LEFT JOIN (
                     SELECT 
@@ -77,13 +99,14 @@ class StockDataLoader:
         cache_key = f'info_{symbol}'
         if cache_key in self._cache:
             return self._cache[cache_key].copy()
-            
+        
         with self.get_connection() as conn:
-            query = '''
+            is_int = self._is_int_date(conn)
+            query = f'''
                 SELECT si.symbol, si.name, si.market_type as market,
                        COUNT(sd.id) as data_count,
-                       MIN(sd.trade_date) as start_date,
-                       MAX(sd.trade_date) as end_date,
+                       {trade_date_sql('MIN(sd.trade_date)', is_int)} as start_date,
+                       {trade_date_sql('MAX(sd.trade_date)', is_int)} as end_date,
                        AVG(sd.volume) as avg_volume,
                        AVG(sd.amount) as avg_amount
                 FROM stock_info si
@@ -125,15 +148,15 @@ class StockDataLoader:
         cache_key = f'daily_{symbol}_{start_date}_{end_date}'
         if cache_key in self._cache:
             return self._cache[cache_key].copy()
-            
+        
         with self.get_connection() as conn:
-            query = '''
+            query = f'''
                 SELECT 
-                    trade_date as date,
-                    open_price as open,
-                    high_price as high,
-                    low_price as low,
-                    close_price as close,
+                    {trade_date_sql('trade_date', self._is_int_date(conn))} as date,
+                    {self._price(conn, 'open_price')} as open,
+                    {self._price(conn, 'high_price')} as high,
+                    {self._price(conn, 'low_price')} as low,
+                    {self._price(conn, 'close_price')} as close,
                     volume,
                     amount,
                     return_with_dividend as pct_change
@@ -144,11 +167,11 @@ class StockDataLoader:
             
             if start_date:
                 query += ' AND trade_date >= ?'
-                params.append(start_date)
+                params.append(self._date_param(conn, start_date))
             
             if end_date:
                 query += ' AND trade_date <= ?'
-                params.append(end_date)
+                params.append(self._date_param(conn, end_date))
             
             query += ' ORDER BY trade_date'
             
@@ -164,8 +187,10 @@ class StockDataLoader:
     def get_latest_price(self, symbol: str) -> Optional[Dict]:
         """获取股票最新价格"""
         with self.get_connection() as conn:
-            query = '''
-                SELECT trade_date, open_price, close_price, high_price, low_price, 
+            query = f'''
+                SELECT {trade_date_sql('trade_date', self._is_int_date(conn))},
+                       {self._price(conn, 'open_price')}, {self._price(conn, 'close_price')},
+                       {self._price(conn, 'high_price')}, {self._price(conn, 'low_price')}, 
                        volume, return_with_dividend
                 FROM stock_daily
                 WHERE symbol = ?
@@ -209,11 +234,11 @@ class StockDataLoader:
             days: 统计天数
         """
         with self.get_connection() as conn:
-            query = '''
+            query = f'''
                 SELECT 
-                    AVG(close_price) as avg_close,
-                    MAX(high_price) as max_high,
-                    MIN(low_price) as min_low,
+                    {self._price(conn, 'AVG(close_price)')} as avg_close,
+                    {self._price(conn, 'MAX(high_price)')} as max_high,
+                    {self._price(conn, 'MIN(low_price)')} as min_low,
                     AVG(volume) as avg_volume,
                     SUM(volume) as total_volume,
                     AVG(return_with_dividend) as avg_pct_change,
@@ -254,7 +279,7 @@ class StockDataLoader:
         cache_key = f'search_{keyword}_{limit}'
         if cache_key in self._cache:
             return self._cache[cache_key].copy()
-            
+        
         with self.get_connection() as conn:
             # 优化搜索查询，使用子查询减少JOIN开销
             query = '''